@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+واجهة الترجمة غير المتزامنة
+Asyncio translation pipeline for embedding the translator in async services
+"""
+
+import asyncio
+import os
+import concurrent.futures
+from datetime import datetime
+
+from translate_subtitles import SubtitleTranslator
+from rate_limiter import get_rate_limiter, is_throttling_error
+from retry_policy import decorrelated_jitter, get_retry_after, get_retry_budget
+
+class AsyncTranslationEngine:
+    """واجهة محرك ترجمة غير متزامن
+    
+    Adapters implement translate() as a coroutine. A native async client can
+    subclass this directly; ThreadedEngineAdapter wraps the synchronous
+    deep_translator engines.
+    """
+    
+    name = 'async'
+    
+    async def translate(self, text, source_lang, target_lang):
+        """ترجمة نص واحد وإرجاع النتيجة"""
+        raise NotImplementedError
+    
+    async def close(self):
+        """تحرير الموارد المستخدمة"""
+        pass
+
+class ThreadedEngineAdapter(AsyncTranslationEngine):
+    """محول لمحركات deep_translator المتزامنة
+    
+    Blocking engine calls run on a fixed-size thread pool, so the thread count
+    stays at max_threads however many cues are in flight on the event loop.
+    """
+    
+    def __init__(self, translator, max_threads=8):
+        self.translator = translator
+        self.name = translator.current_engine
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_threads)
+    
+    def _translate_sync(self, text, source_lang, target_lang):
+        """ترجمة متزامنة بنسخة مستعارة من مجمع المحركات"""
+        with self.translator.engine_pool.lease(self.name, source_lang, target_lang) as engine:
+            return engine.translate(text)
+    
+    async def translate(self, text, source_lang, target_lang):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._translate_sync, text, source_lang, target_lang)
+    
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+class StubAsyncEngine(AsyncTranslationEngine):
+    """محول أصلي غير متزامن للمحرك الوهمي
+    
+    Simulated latency is awaited with asyncio.sleep, so load tests of the
+    async pipeline need no threads at all.
+    """
+    
+    name = 'stub'
+    
+    def __init__(self, stub):
+        self.stub = stub
+    
+    async def translate(self, text, source_lang, target_lang):
+        latency = self.stub.sample_latency()
+        if latency > 0:
+            await asyncio.sleep(latency)
+        self.stub.check_failure()
+        return self.stub.pseudo_translate(text, target_lang)
+
+class AsyncTranslationCache:
+    """وصول غير متزامن إلى ذاكرة الترجمة المؤقتة
+    
+    All SQLite work runs on one dedicated thread, so cache lookups never
+    block the event loop and never contend with each other for the file.
+    """
+    
+    def __init__(self, cache):
+        self.cache = cache
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    async def get_cached_translation(self, text, source_lang, target_lang):
+        return await self._run(self.cache.get_cached_translation, text, source_lang, target_lang)
+    
+    async def get_many(self, texts, source_lang, target_lang):
+        return await self._run(self.cache.get_many, texts, source_lang, target_lang)
+    
+    async def save_translation(self, original_text, translated_text, source_lang, target_lang, engine="google"):
+        return await self._run(self.cache.save_translation, original_text, translated_text,
+                               source_lang, target_lang, engine)
+    
+    async def get_cache_stats(self):
+        return await self._run(self.cache.get_cache_stats)
+    
+    async def close(self):
+        # الترجمات المؤجلة تُكتب على نفس خيط الذاكرة المؤقتة قبل إيقافه
+        await self._run(self.cache.flush)
+        self._executor.shutdown(wait=True)
+
+class AsyncSubtitleTranslator:
+    """مترجم ترجمات غير متزامن
+    
+    Wraps a SubtitleTranslator for its config, parsing, backups and session
+    statistics, and translates through an AsyncTranslationEngine so hundreds
+    of cues from many files can be in flight on one event loop.
+    """
+    
+    def __init__(self, translator=None, engine=None, max_concurrency=None):
+        self.translator = translator or SubtitleTranslator()
+        self.config = self.translator.config
+        
+        if max_concurrency is None:
+            max_concurrency = self.config.get('async_max_concurrency', 32)
+        self.max_concurrency = max(1, max_concurrency)
+        
+        if engine is None:
+            if self.translator.current_engine == 'stub':
+                engine = StubAsyncEngine(self.translator.translator)
+            else:
+                engine = ThreadedEngineAdapter(self.translator, self.max_concurrency)
+        self.engine = engine
+        self.cache = AsyncTranslationCache(self.translator.cache) if self.translator.cache else None
+        self.rate_limiter = get_rate_limiter(self.engine.name, self.config)
+        self._semaphore = None
+    
+    @property
+    def session_stats(self):
+        return self.translator.session_stats
+    
+    def _get_semaphore(self):
+        # إنشاء الإشارة داخل حلقة الأحداث الجارية
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def translate_text(self, text, target_lang=None, source_lang=None):
+        """ترجمة نص واحد مع دعم الذاكرة المؤقتة وإعادة المحاولة"""
+        if not text.strip():
+            return text
+        
+        if target_lang is None:
+            target_lang = self.config.get('default_target_language', 'ar')
+        if source_lang is None:
+            source_lang = self.config.get('default_source_language', 'en')
+        
+        # تخطي النصوص التي لا تحتاج إلى ترجمة، أو ترجمة الجزء القابل للترجمة فقط
+        prefix, body, suffix = self.translator.classifier.split(text)
+        if not body:
+            self.translator._increment_stat('skipped_cues')
+            return text
+        if prefix or suffix:
+            return f"{prefix}{await self.translate_text(body, target_lang, source_lang)}{suffix}"
+        
+        # البحث في الذاكرة المؤقتة أولاً
+        if self.cache:
+            cached_result = await self.cache.get_cached_translation(text, source_lang, target_lang)
+            if cached_result:
+                self.translator._increment_stat('cache_hits')
+                return cached_result
+        
+        max_retries = self.config.get('max_retries', 3)
+        retry_budget = get_retry_budget(self.config)
+        base_delay = self.config.get('retry_base_delay', 0.5)
+        max_delay = self.config.get('retry_max_delay', 30.0)
+        backoff = base_delay
+        result = None
+        
+        breaker = (self.translator._get_breaker(self.engine.name)
+                   if self.config.get('circuit_breaker_enabled', True) else None)
+        
+        retry_budget.record_request()
+        async with self._get_semaphore():
+            for attempt in range(max_retries):
+                # لا فائدة من إعادة المحاولة والدائرة مفتوحة
+                if breaker and not breaker.allow_request():
+                    self.translator._increment_stat('translation_errors')
+                    print(f"Translation failed for: '{text[:50]}...' (circuit open for {self.engine.name})")
+                    return text
+                
+                try:
+                    await self.rate_limiter.acquire_async()
+                    result = await self.engine.translate(text, source_lang, target_lang)
+                    self.rate_limiter.on_success()
+                    if breaker:
+                        breaker.record_success()
+                    break
+                except Exception as e:
+                    if breaker:
+                        breaker.record_failure()
+                    retry_after = get_retry_after(e, max_delay)
+                    if is_throttling_error(e):
+                        self.translator._increment_stat('throttled_requests')
+                        self.rate_limiter.on_throttle(retry_after)
+                    print(f"خطأ في المحاولة {attempt + 1}: {e}")
+                    
+                    can_retry = attempt < max_retries - 1
+                    if can_retry and not retry_budget.try_acquire_retry():
+                        self.translator._increment_stat('retry_budget_exhausted')
+                        can_retry = False
+                    
+                    if not can_retry:
+                        self.translator._increment_stat('translation_errors')
+                        print(f"Translation failed for: '{text[:50]}...'")
+                        return text
+                    
+                    backoff = decorrelated_jitter(backoff, base_delay, max_delay)
+                    await asyncio.sleep(max(backoff, retry_after or 0))
+                    self.translator._increment_stat('retries')
+        
+        if self.cache and result:
+            await self.cache.save_translation(text, result, source_lang, target_lang, self.engine.name)
+        
+        return result if result else text
+    
+    async def translate_many(self, texts, target_lang=None, source_lang=None):
+        """ترجمة قائمة من النصوص بشكل متزامن مع الحفاظ على ترتيبها
+        
+        Planned like SubtitleTranslator.translate_many: each unique
+        classifier body is translated once, untranslatable texts pass
+        through, and hits for the whole list come from one get_many on the
+        cache thread before any engine request.
+        """
+        if target_lang is None:
+            target_lang = self.config.get('default_target_language', 'ar')
+        if source_lang is None:
+            source_lang = self.config.get('default_source_language', 'en')
+        
+        texts, layouts = self.translator._segment_cues(texts)
+        
+        # كل نص فريد يُترجم مرة واحدة، ودون اسم المتحدث أو علامات الموسيقى
+        unique_texts, slots = self.translator._plan_unique_texts(texts)
+        bodies, plan = self.translator._plan_bodies(unique_texts)
+        results = list(bodies)
+        
+        skipped = sum(1 for slot in slots if plan[slot] is None and unique_texts[slot].strip())
+        if skipped:
+            self.translator._increment_stat('skipped_cues', skipped)
+        translatable = sum(1 for slot in slots if plan[slot] is not None)
+        self.translator._increment_stat('unique_texts', len(bodies))
+        self.translator._increment_stat('duplicate_cues', translatable - len(bodies))
+        
+        pending = list(range(len(bodies)))
+        if self.cache and pending:
+            cached = await self.cache.get_many(bodies, source_lang, target_lang)
+            if cached:
+                self.translator._increment_stat('cache_hits', len(cached))
+                remaining = []
+                for i in pending:
+                    if bodies[i] in cached:
+                        results[i] = cached[bodies[i]]
+                    else:
+                        remaining.append(i)
+                pending = remaining
+        
+        translated = await asyncio.gather(
+            *(self.translate_text(bodies[i], target_lang, source_lang) for i in pending))
+        for i, translated_text in zip(pending, translated):
+            results[i] = translated_text
+        
+        translated_texts = [text if parts is None else f"{parts[0]}{results[parts[1]]}{parts[2]}"
+                            for text, parts in zip(unique_texts, plan)]
+        return self.translator._join_cues([translated_texts[slot] for slot in slots], layouts)
+    
+    async def translate_file(self, input_path, output_path=None, target_lang=None, source_lang=None):
+        """ترجمة ملف SRT وإرجاع مسار الملف المترجم"""
+        loop = asyncio.get_running_loop()
+        
+        if not os.path.exists(input_path):
+            print(f"خطأ: الملف '{input_path}' غير موجود")
+            return None
+        
+        is_valid, validation_message = await loop.run_in_executor(
+            None, self.translator.validate_srt_file, input_path)
+        if not is_valid:
+            print(f"File validation error: {validation_message}")
+            return None
+        
+        await loop.run_in_executor(None, self.translator.create_backup, input_path)
+        
+        if output_path is None:
+            base_name = os.path.splitext(input_path)[0]
+            suffix = self.config.get('output_suffix', '_arabic')
+            output_path = f"{base_name}{suffix}.srt"
+        
+        subtitles = await loop.run_in_executor(None, self.translator.parse_srt_file, input_path)
+        
+        start_time = datetime.now()
+        translated_texts = await self.translate_many(
+            [subtitle['text'] for subtitle in subtitles], target_lang, source_lang)
+        duration = (datetime.now() - start_time).total_seconds()
+        
+        translated_subtitles = []
+        for subtitle, translated_text in zip(subtitles, translated_texts):
+            translated_subtitles.append({
+                'number': subtitle['number'],
+                'timestamp': subtitle['timestamp'],
+                'text': translated_text
+            })
+        
+        await loop.run_in_executor(None, self.translator.save_srt_file, translated_subtitles, output_path)
+        
+        self.translator._increment_stat('files_processed')
+        self.translator._increment_stat('subtitles_translated', len(subtitles))
+        print(f"⏱️  {os.path.basename(input_path)}: {len(subtitles)} ترجمة في {duration:.1f} ثانية")
+        
+        return output_path
+    
+    async def translate_files(self, input_paths, target_lang=None, source_lang=None):
+        """ترجمة عدة ملفات في نفس الوقت"""
+        return list(await asyncio.gather(
+            *(self.translate_file(path, target_lang=target_lang, source_lang=source_lang)
+              for path in input_paths)))
+    
+    async def close(self):
+        """إغلاق المحرك والذاكرة المؤقتة"""
+        await self.engine.close()
+        if self.cache:
+            await self.cache.close()
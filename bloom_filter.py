@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مرشح Bloom لاستبعاد النصوص غير المحفوظة دون البحث في قاعدة البيانات
+Bloom filters over cache keys, one per language pair
+"""
+
+import json
+import math
+import os
+import struct
+
+SIDECAR_MAGIC = b'BLM1'
+
+class BloomFilter:
+    """مرشح Bloom فوق مفاتيح الذاكرة المؤقتة (ملخص md5 من 16 بايت)
+    
+    A negative answer is definite; a positive one is wrong with roughly
+    error_rate probability while no more than capacity keys were added.
+    Bit positions come from double hashing the two halves of the digest,
+    so no extra hashing is needed per lookup.
+    """
+    
+    def __init__(self, capacity=10000, error_rate=0.01, bits=None, count=0):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+    
+    def _positions(self, key):
+        h1 = int.from_bytes(key[:8], 'little')
+        h2 = int.from_bytes(key[8:16], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+    
+    def add(self, key):
+        """إضافة مفتاح، ويرجع True إذا كان جديداً على المرشح"""
+        bits = self.bits
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+    
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+    
+    def is_full(self):
+        return self.count > self.capacity
+
+class PairBloomFilters:
+    """مرشح Bloom لكل زوج لغات (المصدر، الهدف) مع حفظه في ملف جانبي"""
+    
+    def __init__(self, error_rate=0.01, min_capacity=10000):
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.filters = {}
+    
+    def reset(self, pair, expected=0):
+        """إنشاء مرشح فارغ للزوج بسعة تكفي ضعف العدد المتوقع"""
+        bloom = BloomFilter(max(self.min_capacity, expected * 2), self.error_rate)
+        self.filters[pair] = bloom
+        return bloom
+    
+    def add(self, pair, key):
+        bloom = self.filters.get(pair)
+        if bloom is None:
+            bloom = self.reset(pair)
+        bloom.add(key)
+        return bloom
+    
+    def might_contain(self, pair, key):
+        bloom = self.filters.get(pair)
+        return bloom is not None and key in bloom
+    
+    def clear(self):
+        self.filters = {}
+    
+    def save(self, path, signature):
+        """حفظ المرشحات مع توقيع قاعدة البيانات التي بُنيت منها"""
+        header = {
+            'signature': signature,
+            'error_rate': self.error_rate,
+            'filters': [{'source_lang': source_lang, 'target_lang': target_lang,
+                         'capacity': bloom.capacity, 'count': bloom.count, 'bytes': len(bloom.bits)}
+                        for (source_lang, target_lang), bloom in self.filters.items()]
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(SIDECAR_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for bloom in self.filters.values():
+                f.write(bloom.bits)
+        os.replace(temp_path, path)
+    
+    def load(self, path, signature):
+        """تحميل المرشحات إذا كانت مبنية من نفس حالة قاعدة البيانات، ويرجع True عند النجاح"""
+        try:
+            with open(path, 'rb') as f:
+                if f.read(4) != SIDECAR_MAGIC:
+                    return False
+                header_length = struct.unpack('<I', f.read(4))[0]
+                header = json.loads(f.read(header_length).decode('utf-8'))
+                if header['signature'] != signature or header['error_rate'] != self.error_rate:
+                    return False
+                
+                filters = {}
+                for entry in header['filters']:
+                    bits = bytearray(f.read(entry['bytes']))
+                    bloom = BloomFilter(entry['capacity'], self.error_rate, bits, entry['count'])
+                    if len(bits) != (bloom.size + 7) // 8:
+                        return False
+                    filters[(entry['source_lang'], entry['target_lang'])] = bloom
+        except (OSError, ValueError, KeyError, struct.error):
+            return False
+        
+        self.filters = filters
+        return True
@@ -8,143 +8,1079 @@ Translation caching system
 import sqlite3
 import hashlib
 import os
+import io
 import json
+import gzip
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
+from text_normalizer import canonicalize, make_template, restore
+from bloom_filter import PairBloomFilters
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class MemoryLRU:
+    """ذاكرة مؤقتة في الذاكرة بسياسة الأقل استخداماً مؤخراً
+    
+    Bounded by entry count and by the approximate size in bytes of the
+    stored translations; the least recently used entries are evicted first.
+    """
+    
+    def __init__(self, max_entries=10000, max_bytes=32 * 1024 * 1024, stats_callback=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats_callback = stats_callback
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _count(self, key, amount=1):
+        if self.stats_callback and amount:
+            self.stats_callback(key, amount)
+    
+    def _entry_size(self, key, value):
+        return len(key) + len(value.encode('utf-8'))
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        self._count('memory_cache_hits' if value is not None else 'memory_cache_misses')
+        return value
+    
+    def put(self, key, value):
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        
+        evicted = 0
+        with self._lock:
+            old_value = self._entries.pop(key, None)
+            if old_value is not None:
+                self._bytes -= self._entry_size(key, old_value)
+            self._entries[key] = value
+            self._bytes += size
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(old_key, old_value)
+                evicted += 1
+            self.evictions += evicted
+        self._count('memory_cache_evictions', evicted)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def get_stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_mb': round(self._bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+# إصدار مخطط قاعدة البيانات (PRAGMA user_version)
+# 1: جدول مضغوط بمفتاح ثنائي، 2: جدول إحصائيات تحدثه المشغلات، 3: عداد أجيال الكتابة،
+# 4: جدول منفصل لقوالب النصوص الموحدة
+SCHEMA_VERSION = 4
+AUTO_VACUUM_INCREMENTAL = 2
+
+# ترتيب الإزالة: الأقدم استخداماً أولاً، أو الأقل استخداماً أولاً
+EVICTION_ORDER = {
+    'lru': 'last_used, usage_count',
+    'lfu': 'usage_count, last_used'
+}
+
+CREATE_TRANSLATIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        text_hash BLOB PRIMARY KEY,
+        original_text TEXT NOT NULL,
+        translated_text TEXT NOT NULL,
+        source_lang TEXT NOT NULL,
+        target_lang TEXT NOT NULL,
+        engine TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        usage_count INTEGER DEFAULT 1
+    ) WITHOUT ROWID
+'''
+
+# أعمدة سجلات التصدير (JSONL)
+EXPORT_FIELDS = ('original_text', 'translated_text', 'source_lang', 'target_lang',
+                 'engine', 'created_at', 'last_used', 'usage_count')
+
+def parse_export_line(line):
+    """قراءة سطر من ملف التصدير، أو None إذا لم يكن JSON صالحاً"""
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+def open_archive(path, mode):
+    """فتح ملف تصدير نصي حسب امتداده: ‎.gz أو ‎.zst أو بدون ضغط"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ValueError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+# عدادات لكل لغة هدف تحدثها المشغلات، فتكلفة الإحصائيات ثابتة مهما كبر الجدول
+CREATE_STATS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cache_stats (
+        target_lang TEXT PRIMARY KEY,
+        entries INTEGER NOT NULL DEFAULT 0,
+        usage INTEGER NOT NULL DEFAULT 0
+    );
+    
+    CREATE TRIGGER IF NOT EXISTS trg_stats_insert AFTER INSERT ON translations BEGIN
+        INSERT INTO cache_stats (target_lang, entries, usage) VALUES (NEW.target_lang, 1, NEW.usage_count)
+        ON CONFLICT(target_lang) DO UPDATE SET entries = entries + 1, usage = usage + NEW.usage_count;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_stats_delete AFTER DELETE ON translations BEGIN
+        UPDATE cache_stats SET entries = entries - 1, usage = usage - OLD.usage_count
+        WHERE target_lang = OLD.target_lang;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_stats_usage AFTER UPDATE OF usage_count ON translations BEGIN
+        UPDATE cache_stats SET usage = usage + NEW.usage_count - OLD.usage_count
+        WHERE target_lang = NEW.target_lang;
+    END;
+'''
+
+# عداد يزيد مع كل إدراج أو حذف من أي عملية، فيُعرف منه إن كانت مرشحات Bloom تطابق الجدول
+CREATE_GENERATION_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cache_generation (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        generation INTEGER NOT NULL
+    );
+    
+    INSERT OR IGNORE INTO cache_generation (id, generation) VALUES (0, 0);
+    
+    CREATE TRIGGER IF NOT EXISTS trg_generation_insert AFTER INSERT ON translations BEGIN
+        UPDATE cache_generation SET generation = generation + 1 WHERE id = 0;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS trg_generation_delete AFTER DELETE ON translations BEGIN
+        UPDATE cache_generation SET generation = generation + 1 WHERE id = 0;
+    END;
+'''
+
+# قوالب النصوص الموحدة منفصلة عن الترجمات، فلا تطغى على ترجمة مطابقة ولا تدخل الإحصائيات أو التصدير
+CREATE_TEMPLATES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS translation_templates (
+        text_hash BLOB PRIMARY KEY,
+        key_text TEXT NOT NULL,
+        template TEXT NOT NULL,
+        source_lang TEXT NOT NULL,
+        target_lang TEXT NOT NULL,
+        last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) WITHOUT ROWID;
+    
+    CREATE INDEX IF NOT EXISTS idx_templates_last_used ON translation_templates (last_used);
+'''
+
+# بادئة مفاتيح القوالب، فلا يتطابق مفتاح قالب مع مفتاح ترجمة (16 بايت) في ذاكرة الجلسة
+TEMPLATE_KEY_PREFIX = b'T'
+
 class TranslationCache:
-    """نظام تخزين مؤقت للترجمات لتجنب إعادة الترجمة"""
+    """نظام تخزين مؤقت للترجمات لتجنب إعادة الترجمة
+    
+    Each thread keeps one long-lived connection in WAL mode, so readers are
+    never blocked by a writer and a commit does not wait for an fsync.
+    
+    New translations are buffered (write-behind) and written with one
+    executemany transaction every write_batch_size entries or every
+    flush_interval_ms, whichever comes first. Lookups see buffered entries
+    immediately. The buffer is flushed by flush(), close() and at exit;
+    write_batch_size=1 writes every translation straight through.
+    
+    A MemoryLRU tier keyed by the same hash sits in front of SQLite, so
+    phrases looked up again in the same session never touch the disk.
     
-    def __init__(self, db_path="translation_cache.db"):
+    Hits are read-only: usage_count/last_used changes are aggregated in
+    memory and applied in one batched UPDATE every usage_flush_interval_ms,
+    and always before stats or cleanup read them.
+    
+    With normalize=True, a miss is retried by canonical text (wrapping tags
+    stripped, whitespace collapsed, numbers as placeholders; see
+    text_normalizer) and the stored template is filled back in. Templates
+    live in their own table (translation_templates), so they never replace
+    an exact translation and are left out of stats, export and eviction
+    order; they are trimmed by age alongside the translations.
+    
+    With max_size_mb set, a background thread keeps the live data under the
+    cap by evicting the least recently used (policy 'lru') or least used
+    (policy 'lfu') rows in bounded chunks, and hands the freed pages back
+    to the file system with incremental vacuum. The policy's sort order is
+    kept in an index, created when the cap is set, so choosing victims
+    never sorts the whole table.
+    
+    With bloom_filter=True, a Bloom filter per (source, target) pair holds
+    every stored key, so a definite miss skips SQLite entirely. Triggers
+    bump a generation counter on every insert or delete, from any process,
+    and a miss is only trusted while the counter still matches the filters.
+    When another process has written, lookups fall through to SQLite until
+    the filters are rebuilt in the background (on the side, then swapped
+    in). The filters are saved next to the database (<db_path>.bloom) with
+    their generation and reloaded on start only if it is still current.
+    """
+    
+    def __init__(self, db_path="translation_cache.db", page_cache_mb=16, mmap_size_mb=64, busy_timeout_ms=5000,
+                 write_batch_size=50, flush_interval_ms=500, memory_entries=10000, memory_mb=32,
+                 usage_flush_interval_ms=5000, normalize=False, max_size_mb=0, eviction_policy='lru',
+                 eviction_interval=60, bloom_filter=True, bloom_error_rate=0.01, stats_callback=None):
         self.db_path = db_path
+        self.page_cache_mb = page_cache_mb
+        self.mmap_size_mb = mmap_size_mb
+        self.busy_timeout_ms = busy_timeout_ms
+        self.write_batch_size = max(1, int(write_batch_size))
+        self.flush_interval = max(0.01, flush_interval_ms / 1000.0)
+        self.usage_flush_interval = max(self.flush_interval, usage_flush_interval_ms / 1000.0)
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        
+        # مخزن الكتابة المؤجلة: text_hash -> صف جاهز للإدراج (والقوالب بمفاتيحها)
+        self._pending = {}
+        self._pending_templates = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._flush_event = threading.Event()
+        self._flusher = None
+        self._closed = False
+        
+        # استخدامات مؤجلة: text_hash -> [عدد مرات الاستخدام، آخر استخدام]
+        self._usage = {}
+        self._last_usage_flush = time.monotonic()
+        
+        self.normalize = normalize
+        self.stats_callback = stats_callback
+        self.memory = MemoryLRU(memory_entries, int(memory_mb * 1024 * 1024), stats_callback)
+        
+        # حد حجم قاعدة البيانات وسياسة الإزالة
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.eviction_policy = eviction_policy if eviction_policy in EVICTION_ORDER else 'lru'
+        self.eviction_interval = eviction_interval
+        self._evictor = None
+        self._stop_event = threading.Event()
+        
+        # مرشحات Bloom لكل زوج لغات
+        self.bloom = PairBloomFilters(bloom_error_rate) if bloom_filter else None
+        self.bloom_path = f"{db_path}.bloom"
+        self._bloom_lock = threading.Lock()
+        self._generation_lock = threading.Lock()
+        self._bloom_generation = None
+        self._bloom_stale = False
+        self._bloom_dirty = False
+        self._bloom_overflow = False
+        self._bloom_rebuilder = None
+        
         self.init_database()
+        self._init_bloom()
+        atexit.register(self._flush_at_exit)
+        
+        if self.max_size_bytes > 0:
+            self._evictor = threading.Thread(target=self._eviction_loop, name="cache-evictor", daemon=True)
+            self._evictor.start()
+    
+    def _connect(self):
+        """اتصال الخيط الحالي بقاعدة البيانات (يُنشأ مرة واحدة لكل خيط)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA cache_size={-int(self.page_cache_mb * 1024)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size_mb * 1024 * 1024)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        
+        with self._connections_lock:
+            # إغلاق اتصالات الخيوط المنتهية (مثل خيوط مجمعات العمل السابقة)
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+        
+        self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """كتابة الترجمات المؤجلة ثم إغلاق كل اتصالات قاعدة البيانات"""
+        self._closed = True
+        self._flush_event.set()
+        self._stop_event.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        if self._evictor is not None:
+            self._evictor.join()
+            self._evictor = None
+        if self._bloom_rebuilder is not None:
+            self._bloom_rebuilder.join()
+            self._bloom_rebuilder = None
+        self.flush()
+        self.save_bloom_filter()
+        
+        with self._connections_lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def _rollback(self):
+        """التراجع عن معاملة فاشلة حتى لا يبقى قفل الكتابة محجوزاً"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
     
     def init_database(self):
-        """إنشاء قاعدة البيانات والجداول"""
+        """إنشاء قاعدة البيانات والجداول، وترحيل المخطط القديم إن وجد"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS translations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    text_hash TEXT UNIQUE NOT NULL,
-                    original_text TEXT NOT NULL,
-                    translated_text TEXT NOT NULL,
-                    source_lang TEXT NOT NULL,
-                    target_lang TEXT NOT NULL,
-                    engine TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    usage_count INTEGER DEFAULT 1
-                )
-            ''')
+            # auto_vacuum التدريجي يسمح بتقليص الملف بعد الإزالة دون VACUUM كامل.
+            # لا يسري إلا بعد VACUUM، حتى على ملف جديد (ترويسة WAL كُتبت عند الاتصال).
+            has_tables = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table'").fetchone()
+            needs_vacuum = False
+            if cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                needs_vacuum = True
             
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_text_hash ON translations(text_hash)
-            ''')
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if version < 1:
+                tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                if 'translations' in tables or 'translations_v1' in tables:
+                    # الترحيل ينتهي بـ VACUUM
+                    self._migrate_legacy_schema(conn)
+                    needs_vacuum = False
+                else:
+                    cursor.execute(CREATE_TRANSLATIONS_TABLE.format(table='translations'))
+                    cursor.execute('PRAGMA user_version = 1')
+                    conn.commit()
             
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_languages ON translations(source_lang, target_lang)
-            ''')
+            if version < 2:
+                self._create_stats_table(conn)
             
-            conn.commit()
-            conn.close()
+            if version < 3:
+                cursor.executescript(CREATE_GENERATION_SCHEMA)
+            
+            if version < 4:
+                cursor.executescript(CREATE_TEMPLATES_SCHEMA)
+            
+            if version < SCHEMA_VERSION:
+                cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                conn.commit()
+            
+            # فهرس ترتيب الإزالة يُنشأ فقط عند تحديد حد للحجم، فلا تتحمل الكتابات كلفته دون حاجة
+            if self.max_size_bytes > 0:
+                cursor.execute(f'''
+                    CREATE INDEX IF NOT EXISTS idx_translations_{self.eviction_policy}
+                    ON translations ({EVICTION_ORDER[self.eviction_policy]})
+                ''')
+                conn.commit()
+            
+            if needs_vacuum:
+                if has_tables:
+                    print("🔧 تفعيل التقليص التدريجي لملف الذاكرة المؤقتة...")
+                cursor.execute('VACUUM')
             
         except Exception as e:
+            self._rollback()
             print(f"خطأ في إنشاء قاعدة البيانات: {e}")
     
+    def _migrate_legacy_schema(self, conn, chunk_size=5000):
+        """ترحيل جدول الترجمات القديم إلى المخطط المضغوط
+        
+        Rows are copied in id order, chunk by chunk, into a WITHOUT ROWID
+        table keyed by the binary digest (the old hex hash decoded). The copy
+        is idempotent, so an interrupted copy simply runs again on the next
+        start. Dropping the old table, renaming the new one and bumping
+        user_version happen in one transaction; a file left with only
+        translations_v1 by an older, non-atomic run is picked up from there.
+        """
+        cursor = conn.cursor()
+        tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        legacy = 'id' in {row[1] for row in cursor.execute('PRAGMA table_info(translations)')}
+        if legacy:
+            total = cursor.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+            print(f"🔧 ترحيل الذاكرة المؤقتة إلى المخطط الجديد ({total} ترجمة)...")
+            cursor.execute(CREATE_TRANSLATIONS_TABLE.format(table='translations_v1'))
+            conn.commit()
+            self._copy_legacy_rows(conn, chunk_size)
+        elif 'translations_v1' in tables:
+            print("🔧 استكمال ترحيل الذاكرة المؤقتة...")
+        
+        cursor.execute('BEGIN')
+        if legacy:
+            cursor.execute('DROP TABLE translations')
+        if legacy or 'translations' not in tables:
+            cursor.execute('ALTER TABLE translations_v1 RENAME TO translations')
+        cursor.execute('PRAGMA user_version = 1')
+        conn.commit()
+        
+        # استعادة المساحة التي كان يشغلها الجدول القديم وفهارسه
+        cursor.execute('VACUUM')
+        print("✅ اكتمل ترحيل الذاكرة المؤقتة")
+    
+    def _copy_legacy_rows(self, conn, chunk_size=5000):
+        """نسخ صفوف الجدول القديم إلى translations_v1 على دفعات"""
+        cursor = conn.cursor()
+        last_id = 0
+        while True:
+            rows = cursor.execute('''
+                SELECT id, text_hash, original_text, translated_text, source_lang, target_lang,
+                       engine, created_at, last_used, usage_count
+                FROM translations WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            
+            cursor.executemany('''
+                INSERT INTO translations_v1
+                (text_hash, original_text, translated_text, source_lang, target_lang,
+                 engine, created_at, last_used, usage_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(text_hash) DO NOTHING
+            ''', [(bytes.fromhex(row[1]), *row[2:]) for row in rows])
+            conn.commit()
+            last_id = rows[-1][0]
+    
+    def _create_stats_table(self, conn):
+        """إنشاء جدول الإحصائيات ومشغلاته وحساب قيمه الأولية مرة واحدة"""
+        cursor = conn.cursor()
+        cursor.executescript(CREATE_STATS_SCHEMA)
+        cursor.execute('DELETE FROM cache_stats')
+        cursor.execute('''
+            INSERT INTO cache_stats (target_lang, entries, usage)
+            SELECT target_lang, COUNT(*), COALESCE(SUM(usage_count), 0)
+            FROM translations GROUP BY target_lang
+        ''')
+        cursor.execute('PRAGMA user_version = 2')
+        conn.commit()
+    
+    def _flush_at_exit(self):
+        self.flush()
+        self.save_bloom_filter()
+    
+    def _read_generation(self, cursor):
+        return cursor.execute('SELECT generation FROM cache_generation WHERE id = 0').fetchone()[0]
+    
+    @contextmanager
+    def _write_transaction(self):
+        """معاملة كتابة تُبقي جيل مرشحات Bloom مطابقاً لقاعدة البيانات
+        
+        The write lock is taken up front (BEGIN IMMEDIATE), so a generation
+        that moved since our last commit can only mean another process
+        wrote; the filters are then marked stale. Our own inserts are
+        already in the filters, so the generation read just before commit
+        becomes the one they match.
+        """
+        with self._flush_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if self.bloom is not None and self._read_generation(cursor) != self._bloom_generation:
+                    self._mark_bloom_stale()
+                yield cursor
+                # القفل يمنع القراء من رؤية الجيل الجديد قبل تسجيله
+                with self._generation_lock:
+                    generation = self._read_generation(cursor) if self.bloom is not None else None
+                    conn.commit()
+                    if generation is not None and not self._bloom_stale:
+                        self._bloom_generation = generation
+            except BaseException:
+                conn.rollback()
+                raise
+    
+    def _init_bloom(self):
+        """تحميل مرشحات Bloom من الملف الجانبي أو بناؤها من قاعدة البيانات"""
+        if self.bloom is None:
+            return
+        try:
+            generation = self._read_generation(self._connect().cursor())
+            if self.bloom.load(self.bloom_path, generation):
+                self._bloom_generation = generation
+            else:
+                self.rebuild_bloom_filter()
+        except Exception as e:
+            # بدون مرشح تُبحث كل النصوص في قاعدة البيانات
+            self._rollback()
+            print(f"خطأ في بناء مرشح Bloom: {e}")
+            self.bloom = None
+    
+    def rebuild_bloom_filter(self, chunk_size=10000):
+        """إعادة بناء مرشحات Bloom بقراءة عمود المفاتيح فقط ثم استبدالها دفعة واحدة
+        
+        The new filters are filled on the side from one read snapshot, so
+        lookups keep using the current ones until the swap. Each pair gets
+        room for twice its current key count.
+        """
+        if self.bloom is None:
+            return False
+        
+        # قفل الكتابة يمنع كتابات هذه العملية أثناء البناء
+        with self._flush_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            filters = PairBloomFilters(self.bloom.error_rate)
+            try:
+                cursor.execute('BEGIN')
+                generation = self._read_generation(cursor)
+                counts = cursor.execute('''
+                    SELECT source_lang, target_lang, COUNT(*) FROM translations
+                    GROUP BY source_lang, target_lang
+                ''').fetchall()
+                for source_lang, target_lang, count in counts:
+                    filters.reset((source_lang, target_lang), count)
+                
+                cursor.execute('SELECT text_hash, source_lang, target_lang FROM translations')
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    for text_hash, source_lang, target_lang in rows:
+                        filters.add((source_lang, target_lang), text_hash)
+            finally:
+                conn.rollback()
+            
+            # ترجمات لم تُكتب بعد إلى قاعدة البيانات، ثم الاستبدال قبل أي إضافة جديدة
+            with self._bloom_lock:
+                with self._pending_lock:
+                    for row in self._pending.values():
+                        filters.add((row[3], row[4]), row[0])
+                with self._generation_lock:
+                    self.bloom = filters
+                    self._bloom_generation = generation
+                    self._bloom_stale = False
+                self._bloom_overflow = False
+                self._bloom_dirty = True
+        return True
+    
+    def _mark_bloom_stale(self):
+        """التوقف عن الوثوق بنتائج المرشح السلبية وإعادة بنائه في الخلفية"""
+        self._bloom_stale = True
+        if self._closed or (self._bloom_rebuilder is not None and self._bloom_rebuilder.is_alive()):
+            return
+        self._bloom_rebuilder = threading.Thread(target=self._rebuild_in_background,
+                                                 name="cache-bloom-rebuild", daemon=True)
+        self._bloom_rebuilder.start()
+    
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild_bloom_filter()
+        except Exception as e:
+            self._rollback()
+            print(f"خطأ في بناء مرشح Bloom: {e}")
+    
+    def _bloom_is_current(self):
+        """هل يطابق المرشح قاعدة البيانات؟ يُقرأ الجيل فقط بعد كتابة من اتصال آخر"""
+        if self._bloom_stale:
+            return False
+        conn = self._connect()
+        # data_version يتغير عندما تكتب اتصالات أخرى (من هذه العملية أو غيرها)
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == getattr(self._local, 'data_version', None):
+            return True
+        
+        with self._generation_lock:
+            current = self._read_generation(conn.cursor()) == self._bloom_generation
+        if not current:
+            self._mark_bloom_stale()
+            return False
+        self._local.data_version = data_version
+        return True
+    
+    def _bloom_add(self, pair, text_hash):
+        with self._bloom_lock:
+            if self.bloom.add(pair, text_hash).is_full():
+                self._bloom_overflow = True
+            self._bloom_dirty = True
+    
+    def _bloom_excludes(self, text_hash, source_lang, target_lang):
+        """هل النص غير محفوظ بالتأكيد؟"""
+        bloom = self.bloom
+        if bloom is None or bloom.might_contain((source_lang, target_lang), text_hash):
+            return False
+        try:
+            if not self._bloom_is_current():
+                return False
+        except sqlite3.Error:
+            return False
+        if self.stats_callback:
+            self.stats_callback('bloom_skipped_lookups')
+        return True
+    
+    def save_bloom_filter(self):
+        """حفظ مرشحات Bloom في الملف الجانبي مع جيلها إذا تغيرت"""
+        if self.bloom is None or not self._bloom_dirty or self._bloom_stale:
+            return False
+        try:
+            with self._bloom_lock:
+                self.bloom.save(self.bloom_path, self._bloom_generation)
+                self._bloom_dirty = False
+            return True
+        except Exception as e:
+            print(f"خطأ في حفظ مرشح Bloom: {e}")
+            return False
+    
     def _generate_hash(self, text, source_lang, target_lang):
-        """إنشاء hash فريد للنص واللغات"""
+        """إنشاء hash فريد للنص واللغات (16 بايت)"""
         content = f"{text.strip()}|{source_lang}|{target_lang}"
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
+        return hashlib.md5(content.encode('utf-8')).digest()
+    
+    def _template_key(self, key_text, source_lang, target_lang):
+        """مفتاح قالب النص الموحد في جدول القوالب وذاكرة الجلسة"""
+        return TEMPLATE_KEY_PREFIX + self._generate_hash(key_text, source_lang, target_lang)
+    
+    def _record_hits(self, text_hashes):
+        """تسجيل استخدام الترجمات في الذاكرة لتحديثها لاحقاً دفعة واحدة"""
+        if not text_hashes:
+            return
+        
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        with self._pending_lock:
+            for text_hash in text_hashes:
+                usage = self._usage.get(text_hash)
+                if usage is None:
+                    self._usage[text_hash] = [1, now]
+                else:
+                    usage[0] += 1
+                    usage[1] = now
+        self._start_flusher()
     
     def get_cached_translation(self, text, source_lang, target_lang):
         """البحث عن ترجمة محفوظة"""
         if not text.strip():
             return None
-            
+        
+        result = self._get_exact(text, source_lang, target_lang)
+        if result is None and self.normalize:
+            canonical = canonicalize(text)
+            if canonical:
+                template = self._get_templates([canonical.key_text], source_lang, target_lang).get(canonical.key_text)
+                result = self._restore(template, canonical, text, source_lang, target_lang)
+        return result
+    
+    def _restore(self, template, canonical, text, source_lang, target_lang):
+        """استعادة ترجمة النص من قالب النص الموحد"""
+        if template is None:
+            return None
+        result = restore(template, canonical)
+        if result is not None:
+            self.memory.put(self._generate_hash(text, source_lang, target_lang), result)
+            if self.stats_callback:
+                self.stats_callback('normalized_cache_hits')
+        return result
+    
+    def _get_exact(self, text, source_lang, target_lang):
+        """البحث عن ترجمة النص كما هو في الذاكرة ثم المخزن المؤجل ثم قاعدة البيانات"""
         text_hash = self._generate_hash(text, source_lang, target_lang)
         
+        cached = self.memory.get(text_hash)
+        if cached is not None:
+            self._record_hits([text_hash])
+            return cached
+        
+        # ترجمة لم تُكتب بعد إلى قاعدة البيانات
+        with self._pending_lock:
+            pending = self._pending.get(text_hash)
+        if pending:
+            self._record_hits([text_hash])
+            return pending[2]
+        
+        if self._bloom_excludes(text_hash, source_lang, target_lang):
+            return None
+        
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT translated_text FROM translations 
-                WHERE text_hash = ? AND source_lang = ? AND target_lang = ?
-            ''', (text_hash, source_lang, target_lang))
+                SELECT translated_text FROM translations WHERE text_hash = ?
+            ''', (text_hash,))
             
             result = cursor.fetchone()
             
             if result:
-                # تحديث آخر استخدام وعداد الاستخدام
-                cursor.execute('''
-                    UPDATE translations 
-                    SET last_used = CURRENT_TIMESTAMP, usage_count = usage_count + 1
-                    WHERE text_hash = ?
-                ''', (text_hash,))
-                conn.commit()
-                
-                conn.close()
+                self._record_hits([text_hash])
+                self.memory.put(text_hash, result[0])
                 return result[0]
             
-            conn.close()
             return None
             
         except Exception as e:
             print(f"خطأ في البحث في الذاكرة المؤقتة: {e}")
             return None
     
+    def get_many(self, texts, source_lang, target_lang, chunk_size=500):
+        """البحث عن ترجمات عدة نصوص دفعة واحدة
+        
+        Looks texts up with chunked IN queries instead of one SELECT per cue
+        and returns a dict {text: translation} holding only the hits. With
+        normalization on, misses get a second bulk lookup by canonical text.
+        """
+        found = self._get_many_exact(texts, source_lang, target_lang, chunk_size)
+        if not self.normalize:
+            return found
+        
+        canonicals = {}
+        for text in texts:
+            if text not in found and text not in canonicals and text.strip():
+                canonical = canonicalize(text)
+                if canonical:
+                    canonicals[text] = canonical
+        
+        if canonicals:
+            templates = self._get_templates([c.key_text for c in canonicals.values()],
+                                            source_lang, target_lang, chunk_size)
+            for text, canonical in canonicals.items():
+                result = self._restore(templates.get(canonical.key_text), canonical,
+                                       text, source_lang, target_lang)
+                if result is not None:
+                    found[text] = result
+        return found
+    
+    def _get_many_exact(self, texts, source_lang, target_lang, chunk_size=500):
+        hashes = {}
+        for text in texts:
+            if text.strip():
+                hashes.setdefault(self._generate_hash(text, source_lang, target_lang), []).append(text)
+        
+        if not hashes:
+            return {}
+        
+        found = {}
+        for text_hash in hashes:
+            cached = self.memory.get(text_hash)
+            if cached is not None:
+                found[text_hash] = cached
+        with self._pending_lock:
+            for text_hash in hashes:
+                if text_hash not in found and text_hash in self._pending:
+                    found[text_hash] = self._pending[text_hash][2]
+        
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            keys = [text_hash for text_hash in hashes
+                    if text_hash not in found and not self._bloom_excludes(text_hash, source_lang, target_lang)]
+            for start in range(0, len(keys), chunk_size):
+                chunk = keys[start:start + chunk_size]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT text_hash, translated_text FROM translations
+                    WHERE text_hash IN ({placeholders})
+                ''', chunk)
+                for text_hash, translated_text in cursor.fetchall():
+                    found[text_hash] = translated_text
+                    self.memory.put(text_hash, translated_text)
+            
+        except Exception as e:
+            print(f"خطأ في البحث في الذاكرة المؤقتة: {e}")
+        
+        # كل نص مكرر في القائمة يُحتسب استخداماً
+        self._record_hits([text_hash for text_hash in found for _ in hashes[text_hash]])
+        return {text: translated_text
+                for text_hash, translated_text in found.items()
+                for text in hashes[text_hash]}
+    
+    def _get_templates(self, key_texts, source_lang, target_lang, chunk_size=500):
+        """البحث عن قوالب النصوص الموحدة في الذاكرة ثم المخزن المؤجل ثم جدول القوالب"""
+        keys = {self._template_key(key_text, source_lang, target_lang): key_text for key_text in key_texts}
+        
+        found = {}
+        for key in keys:
+            cached = self.memory.get(key)
+            if cached is not None:
+                found[key] = cached
+        with self._pending_lock:
+            for key in keys:
+                if key not in found and key in self._pending_templates:
+                    found[key] = self._pending_templates[key][2]
+        
+        try:
+            cursor = self._connect().cursor()
+            missing = [key for key in keys if key not in found]
+            for start in range(0, len(missing), chunk_size):
+                chunk = missing[start:start + chunk_size]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT text_hash, template FROM translation_templates
+                    WHERE text_hash IN ({placeholders})
+                ''', chunk)
+                for key, template in cursor.fetchall():
+                    found[key] = template
+                    self.memory.put(key, template)
+        
+        except Exception as e:
+            print(f"خطأ في البحث في الذاكرة المؤقتة: {e}")
+        
+        return {keys[key]: template for key, template in found.items()}
+    
     def save_translation(self, original_text, translated_text, source_lang, target_lang, engine="google"):
         """حفظ ترجمة جديدة في الذاكرة المؤقتة"""
         if not original_text.strip() or not translated_text.strip():
             return False
             
         text_hash = self._generate_hash(original_text, source_lang, target_lang)
+        row = (text_hash, original_text, translated_text, source_lang, target_lang, engine)
+        
+        self.memory.put(text_hash, translated_text)
+        with self._pending_lock:
+            self._pending[text_hash] = row
+            
+            # حفظ قالب للنص الموحد ليستفيد منه ما يختلف فقط في الوسوم والمسافات والأرقام
+            if self.normalize:
+                canonical = canonicalize(original_text)
+                template = make_template(translated_text, canonical) if canonical else None
+                if template:
+                    key = self._template_key(canonical.key_text, source_lang, target_lang)
+                    self._pending_templates[key] = (key, canonical.key_text, template, source_lang, target_lang)
+                    self.memory.put(key, template)
+            pending_count = len(self._pending)
+        
+        if self.bloom is not None:
+            self._bloom_add((source_lang, target_lang), text_hash)
+        
+        if pending_count >= self.write_batch_size or self._closed:
+            return self.flush()
+        
+        self._start_flusher()
+        return True
+    
+    def _start_flusher(self):
+        """تشغيل خيط الكتابة الدورية عند أول ترجمة مؤجلة"""
+        if self._flusher is not None:
+            return
+        with self._pending_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="cache-flusher", daemon=True)
+                self._flusher.start()
+    
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            usage_due = time.monotonic() - self._last_usage_flush >= self.usage_flush_interval
+            self.flush(include_usage=usage_due)
+    
+    def flush(self, include_usage=True):
+        """كتابة كل الترجمات المؤجلة (والاستخدامات المجمعة) في معاملة واحدة
+        
+        Entries stay visible in the buffer until their transaction commits;
+        on failure they are kept and retried on the next flush.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                rows = list(self._pending.values())
+                templates = list(self._pending_templates.values())
+                usage = {}
+                if include_usage:
+                    usage, self._usage = self._usage, {}
+            if include_usage:
+                self._last_usage_flush = time.monotonic()
+            if not rows and not templates and not usage:
+                return True
+            
+            try:
+                with self._write_transaction() as cursor:
+                    # UPSERT: تحديث الترجمة مع الاحتفاظ بعداد الاستخدام وتاريخ الإنشاء
+                    cursor.executemany('''
+                        INSERT INTO translations 
+                        (text_hash, original_text, translated_text, source_lang, target_lang, engine)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(text_hash) DO UPDATE SET
+                            translated_text = excluded.translated_text,
+                            engine = excluded.engine,
+                            last_used = CURRENT_TIMESTAMP
+                    ''', rows)
+                    
+                    cursor.executemany('''
+                        INSERT INTO translation_templates
+                        (text_hash, key_text, template, source_lang, target_lang)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(text_hash) DO UPDATE SET
+                            template = excluded.template,
+                            last_used = CURRENT_TIMESTAMP
+                    ''', templates)
+                    
+                    cursor.executemany('''
+                        UPDATE translations 
+                        SET usage_count = usage_count + ?, last_used = ?
+                        WHERE text_hash = ?
+                    ''', [(count, last_used, text_hash) for text_hash, (count, last_used) in usage.items()])
+                
+            except Exception as e:
+                self._rollback()
+                print(f"خطأ في حفظ الترجمة: {e}")
+                # إعادة الاستخدامات غير المكتوبة لتُكتب في المرة القادمة
+                with self._pending_lock:
+                    for text_hash, (count, last_used) in usage.items():
+                        current = self._usage.setdefault(text_hash, [0, last_used])
+                        current[0] += count
+                return False
+            
+            with self._pending_lock:
+                for row in rows:
+                    if self._pending.get(row[0]) == row:
+                        del self._pending[row[0]]
+                for row in templates:
+                    if self._pending_templates.get(row[0]) == row:
+                        del self._pending_templates[row[0]]
+            
+            # توسيع المرشحات التي تجاوزت سعتها (ارتفع معدل الإيجابيات الكاذبة)
+            if self._bloom_overflow:
+                self.rebuild_bloom_filter()
+            return True
+    
+    def _eviction_loop(self):
+        while not self._closed:
+            self.enforce_size_limit()
+            self._stop_event.wait(self.eviction_interval)
+    
+    def _live_size(self, cursor):
+        """حجم البيانات الفعلية بالبايت (دون الصفحات الفارغة)"""
+        page_size = cursor.execute('PRAGMA page_size').fetchone()[0]
+        page_count = cursor.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+        return page_size * (page_count - free_pages)
+    
+    def _incremental_vacuum(self, cursor):
+        """إرجاع الصفحات الفارغة إلى نظام الملفات"""
+        # executescript ينفذ العبارة حتى النهاية، أما execute فيحرر صفحة واحدة فقط
+        cursor.executescript('PRAGMA incremental_vacuum;')
+    
+    def enforce_size_limit(self, chunk_size=1000, target_ratio=0.9):
+        """إزالة الترجمات حتى يصبح الحجم دون الحد الأقصى
         
+        Victims are chosen in one ordered pass over the policy's index
+        (enough rows to get down to target_ratio of the cap, estimated from
+        the average row size) and
+        deleted chunk_size rows per transaction, so writers are never locked
+        out for long. Returns the number of rows removed.
+        """
+        if self.max_size_bytes <= 0:
+            return 0
+        
+        self.flush()
+        removed = 0
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT OR REPLACE INTO translations 
-                (text_hash, original_text, translated_text, source_lang, target_lang, engine)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (text_hash, original_text, translated_text, source_lang, target_lang, engine))
+            live_size = self._live_size(cursor)
+            if live_size <= self.max_size_bytes:
+                return 0
             
-            conn.commit()
-            conn.close()
-            return True
+            total_rows = cursor.execute('SELECT COALESCE(SUM(entries), 0) FROM cache_stats').fetchone()[0]
+            if not total_rows:
+                return 0
+            
+            excess = live_size - self.max_size_bytes * target_ratio
+            victim_count = min(total_rows, int(excess / (live_size / total_rows)) + 1)
+            order = EVICTION_ORDER[self.eviction_policy]
+            victims = cursor.execute(
+                f'SELECT text_hash, last_used FROM translations ORDER BY {order} LIMIT ?', (victim_count,)).fetchall()
+            
+            for start in range(0, len(victims), chunk_size):
+                if self._closed:
+                    break
+                chunk = [row[0] for row in victims[start:start + chunk_size]]
+                placeholders = ','.join('?' * len(chunk))
+                with self._write_transaction() as write_cursor:
+                    write_cursor.execute(f'DELETE FROM translations WHERE text_hash IN ({placeholders})', chunk)
+                removed += len(chunk)
+                self._incremental_vacuum(cursor)
+            
+            # القوالب التي لم تُستخدم منذ آخر ترجمة أُزيلت
+            cutoff = max((row[1] for row in victims if row[1] is not None), default=None)
+            if cutoff is not None and not self._closed:
+                self._delete_templates(cursor, cutoff, chunk_size)
             
         except Exception as e:
-            print(f"خطأ في حفظ الترجمة: {e}")
-            return False
+            self._rollback()
+            print(f"خطأ في تقليص الذاكرة المؤقتة: {e}")
+        
+        if removed:
+            self._bloom_dirty = True
+            print(f"🧹 تمت إزالة {removed} ترجمة للبقاء ضمن حد الذاكرة المؤقتة")
+            if self.stats_callback:
+                self.stats_callback('cache_evictions', removed)
+        return removed
+    
+    def _delete_templates(self, cursor, cutoff, chunk_size=1000):
+        """حذف القوالب التي لم تُحفظ منذ cutoff على دفعات"""
+        while True:
+            with self._write_transaction() as write_cursor:
+                write_cursor.execute('''
+                    DELETE FROM translation_templates WHERE text_hash IN (
+                        SELECT text_hash FROM translation_templates WHERE last_used <= ? LIMIT ?
+                    )
+                ''', (cutoff, chunk_size))
+                deleted = write_cursor.rowcount
+            self._incremental_vacuum(cursor)
+            if deleted < chunk_size or self._closed:
+                break
     
     def get_cache_stats(self):
         """إحصائيات الذاكرة المؤقتة"""
+        self.flush()
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT COUNT(*) FROM translations')
-            total_translations = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT SUM(usage_count) FROM translations')
-            total_usage = cursor.fetchone()[0] or 0
-            
+            # عدادات جدول cache_stats (صف لكل لغة هدف) بدلاً من المرور على كل الترجمات
             cursor.execute('''
-                SELECT target_lang, COUNT(*) 
-                FROM translations 
-                GROUP BY target_lang 
-                ORDER BY COUNT(*) DESC
+                SELECT target_lang, entries, usage
+                FROM cache_stats
+                WHERE entries > 0
+                ORDER BY entries DESC
             ''')
-            language_stats = cursor.fetchall()
+            rows = cursor.fetchall()
+            total_translations = sum(row[1] for row in rows)
+            total_usage = sum(row[2] for row in rows)
+            language_stats = [(row[0], row[1]) for row in rows]
             
             # حساب حجم قاعدة البيانات
             db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
             
-            conn.close()
-            
             return {
                 'total_translations': total_translations,
                 'total_usage': total_usage,
@@ -157,41 +1093,272 @@ class TranslationCache:
             print(f"خطأ في حساب الإحصائيات: {e}")
             return {}
     
+    def export_entries(self, path, source_lang=None, target_lang=None, since=None, chunk_size=5000):
+        """تصدير الترجمات إلى ملف JSONL مضغوط
+        
+        Streams rows (optionally only one language pair, or only entries
+        used on or after since, 'YYYY-MM-DD') without loading the table into
+        memory. Returns a summary with the row count and throughput.
+        """
+        self.flush()
+        conditions, params = self._export_conditions(source_lang, target_lang, since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        start = time.monotonic()
+        count = 0
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(EXPORT_FIELDS)} FROM translations {where}", params)
+        with open_archive(path, 'w') as archive:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                archive.writelines(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+                                   for row in rows)
+                count += len(rows)
+        
+        return self._transfer_summary(path, count, time.monotonic() - start)
+    
+    def _export_conditions(self, source_lang=None, target_lang=None, since=None):
+        conditions = []
+        params = []
+        if source_lang:
+            conditions.append('source_lang = ?')
+            params.append(source_lang)
+        if target_lang:
+            conditions.append('target_lang = ?')
+            params.append(target_lang)
+        if since:
+            conditions.append('last_used >= ?')
+            params.append(since)
+        return conditions, params
+    
+    def export_page(self, after=None, limit=5000, source_lang=None, target_lang=None, since=None):
+        """صفحة من سجلات التصدير مرتبة بالمفتاح، مع مفتاح آخر سجل للصفحة التالية
+        
+        Lets a client page through the table with repeated calls (keyset
+        pagination on text_hash) instead of the server writing a file.
+        Returns (entries, last_key); last_key is None on the last page.
+        """
+        if after is None:
+            self.flush()
+        conditions, params = self._export_conditions(source_lang, target_lang, since)
+        if after is not None:
+            conditions.append('text_hash > ?')
+            params.append(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        cursor = self._connect().cursor()
+        rows = cursor.execute(f'''
+            SELECT text_hash, {', '.join(EXPORT_FIELDS)} FROM translations {where}
+            ORDER BY text_hash LIMIT ?
+        ''', params + [limit]).fetchall()
+        entries = [dict(zip(EXPORT_FIELDS, row[1:])) for row in rows]
+        return entries, (rows[-1][0] if len(rows) == limit else None)
+    
+    def import_entries(self, path, batch_size=5000):
+        """دمج ترجمات من ملف تصدير في قاعدة البيانات
+        
+        Rows are merged batch_size at a time (see import_records). Returns
+        a summary with the row count and throughput.
+        """
+        start = time.monotonic()
+        with open_archive(path, 'r') as archive:
+            count, skipped = self.import_records((parse_export_line(line) for line in archive if line.strip()),
+                                                 batch_size)
+        return self._transfer_summary(path, count, time.monotonic() - start, skipped)
+    
+    def import_records(self, entries, batch_size=5000):
+        """دمج سجلات تصدير (قواميس) في قاعدة البيانات، ويرجع عدد المدمج والمتجاهل
+        
+        Conflicts resolve the same way whatever the import order: the most
+        recently used translation wins (ties go to the greater text),
+        usage_count and last_used keep the larger value and created_at the
+        earlier one. A missing value never wins over a present one; new
+        rows without timestamps get the current time. Malformed records
+        (see _import_row) are skipped and counted instead of failing the
+        batch.
+        """
+        self.flush()
+        count = 0
+        skipped = 0
+        
+        def write(batch):
+            with self._write_transaction() as cursor:
+                # الإضافة إلى المرشح داخل المعاملة حتى لا تفوتها إعادة بناء متزامنة
+                if self.bloom is not None:
+                    for row in batch:
+                        self._bloom_add((row[3], row[4]), row[0])
+                cursor.executemany('''
+                    INSERT INTO translations
+                    (text_hash, original_text, translated_text, source_lang, target_lang,
+                     engine, created_at, last_used, usage_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(text_hash) DO UPDATE SET
+                        translated_text = CASE WHEN (COALESCE(excluded.last_used, ''), excluded.translated_text)
+                                                    > (COALESCE(translations.last_used, ''), translations.translated_text)
+                                               THEN excluded.translated_text ELSE translations.translated_text END,
+                        engine = CASE WHEN (COALESCE(excluded.last_used, ''), excluded.translated_text)
+                                           > (COALESCE(translations.last_used, ''), translations.translated_text)
+                                      THEN excluded.engine ELSE translations.engine END,
+                        created_at = COALESCE(MIN(translations.created_at, excluded.created_at),
+                                              translations.created_at, excluded.created_at),
+                        last_used = COALESCE(MAX(translations.last_used, excluded.last_used),
+                                             translations.last_used, excluded.last_used),
+                        usage_count = COALESCE(MAX(translations.usage_count, excluded.usage_count),
+                                               translations.usage_count, excluded.usage_count)
+                ''', batch)
+                # الصفوف الجديدة بلا توقيت تأخذ الوقت الحالي، دون أن يتغلب ذلك على قيمة محفوظة
+                cursor.executemany('''
+                    UPDATE translations
+                    SET created_at = COALESCE(created_at, CURRENT_TIMESTAMP),
+                        last_used = COALESCE(last_used, CURRENT_TIMESTAMP)
+                    WHERE text_hash = ? AND (created_at IS NULL OR last_used IS NULL)
+                ''', [(row[0],) for row in batch if row[6] is None or row[7] is None])
+        
+        try:
+            batch = []
+            for entry in entries:
+                row = self._import_row(entry)
+                if row is None:
+                    skipped += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    write(batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                write(batch)
+                count += len(batch)
+        except Exception:
+            self._rollback()
+            raise
+        finally:
+            # قد تكون الترجمات المستوردة أحدث مما في ذاكرة الجلسة
+            self.memory.clear()
+        
+        if skipped:
+            print(f"⚠️ Skipped {skipped} malformed cache records")
+        return count, skipped
+    
+    def _import_row(self, entry):
+        """تحويل سجل تصدير إلى صف إدراج، أو None إذا كان تالفاً
+        
+        The key fields and engine must be non-empty strings, the
+        timestamps strings or missing, and usage_count a positive integer
+        or missing.
+        """
+        if not isinstance(entry, dict):
+            return None
+        if not all(isinstance(entry.get(field), str) and entry[field] for field in EXPORT_FIELDS[:5]):
+            return None
+        if not all(isinstance(entry.get(field), (str, type(None))) for field in EXPORT_FIELDS[5:7]):
+            return None
+        usage_count = entry.get('usage_count') or 1
+        if not isinstance(usage_count, int) or isinstance(usage_count, bool) or usage_count < 1:
+            return None
+        
+        text_hash = self._generate_hash(entry['original_text'], entry['source_lang'], entry['target_lang'])
+        return (text_hash, *(entry.get(field) for field in EXPORT_FIELDS[:5]),
+                entry.get('created_at') or entry.get('last_used'), entry.get('last_used'), usage_count)
+    
+    def _transfer_summary(self, path, count, seconds, skipped=0):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        return {
+            'entries': count,
+            'skipped': skipped,
+            'seconds': round(seconds, 2),
+            'entries_per_second': round(count / seconds) if seconds > 0 else count,
+            'file_size_mb': round(size / (1024 * 1024), 2)
+        }
+    
     def clean_old_entries(self, days_old=30):
         """تنظيف الترجمات القديمة"""
+        self.flush()
+        self.memory.clear()
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cutoff_date = datetime.now() - timedelta(days=days_old)
             
-            cursor.execute('''
-                DELETE FROM translations 
-                WHERE last_used < ? AND usage_count = 1
-            ''', (cutoff_date,))
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
+            with self._write_transaction():
+                cursor.execute('''
+                    DELETE FROM translations 
+                    WHERE last_used < ? AND usage_count = 1
+                ''', (cutoff_date,))
+                deleted_count = cursor.rowcount
+                cursor.execute('DELETE FROM translation_templates WHERE last_used < ?', (cutoff_date,))
             
+            self._bloom_dirty = True
+            self._incremental_vacuum(cursor)
             return deleted_count
             
         except Exception as e:
+            self._rollback()
             print(f"خطأ في تنظيف الذاكرة المؤقتة: {e}")
             return 0
     
     def clear_cache(self):
-        """مسح جميع الترجمات المحفوظة"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM translations')
-            conn.commit()
-            conn.close()
-            
-            return True
-            
-        except Exception as e:
-            print(f"خطأ في مسح الذاكرة المؤقتة: {e}")
-            return False
+        """مسح جميع الترجمات المحفوظة
+        
+        The table is dropped and recreated with its triggers and indexes in
+        one write transaction; the counters are reset and the generation
+        bumped once, instead of once per deleted row.
+        """
+        # قفل الكتابة يمنع خيط الكتابة المؤجلة من إعادة إدراج ما مُسح
+        with self._flush_lock:
+            with self._pending_lock:
+                self._pending.clear()
+                self._pending_templates.clear()
+            self.memory.clear()
+            try:
+                conn = self._connect()
+                cursor = conn.cursor()
+                
+                with self._write_transaction():
+                    # إعادة إنشاء الجدول بدلاً من DELETE، فلا تعمل المشغلات مرة لكل صف
+                    dependents = [row[0] for row in cursor.execute('''
+                        SELECT sql FROM sqlite_master
+                        WHERE tbl_name = 'translations' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+                    ''').fetchall()]
+                    cursor.execute('DROP TABLE translations')
+                    cursor.execute(CREATE_TRANSLATIONS_TABLE.format(table='translations'))
+                    for sql in dependents:
+                        cursor.execute(sql)
+                    cursor.execute('DELETE FROM cache_stats')
+                    cursor.execute('UPDATE cache_generation SET generation = generation + 1 WHERE id = 0')
+                    cursor.execute('DELETE FROM translation_templates')
+                if self.bloom is not None:
+                    with self._bloom_lock:
+                        self.bloom.clear()
+                        self._bloom_dirty = True
+                self._incremental_vacuum(cursor)
+                return True
+                
+            except Exception as e:
+                self._rollback()
+                print(f"خطأ في مسح الذاكرة المؤقتة: {e}")
+                return False
+
+def create_cache_from_config(config, db_path="translation_cache.db", stats_callback=None):
+    """إنشاء ذاكرة مؤقتة محلية من إعدادات البرنامج"""
+    return TranslationCache(
+        db_path=db_path,
+        page_cache_mb=config.get('cache_page_cache_mb', 16),
+        mmap_size_mb=config.get('cache_mmap_mb', 64),
+        write_batch_size=config.get('cache_write_batch_size', 50),
+        flush_interval_ms=config.get('cache_flush_interval_ms', 500),
+        memory_entries=config.get('cache_memory_entries', 10000),
+        memory_mb=config.get('cache_memory_mb', 32),
+        usage_flush_interval_ms=config.get('cache_usage_flush_interval_ms', 5000),
+        normalize=config.get('cache_normalization', False),
+        max_size_mb=config.get('cache_max_size_mb', 0),
+        eviction_policy=config.get('cache_eviction_policy', 'lru'),
+        eviction_interval=config.get('cache_eviction_interval', 60),
+        bloom_filter=config.get('cache_bloom_filter', True),
+        bloom_error_rate=config.get('cache_bloom_error_rate', 0.01),
+        stats_callback=stats_callback
+    )
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خادم الذاكرة المؤقتة المشتركة
+Shared cache daemon: one process owns translation_cache.db and serves many clients
+"""
+
+import argparse
+import hmac
+import ipaddress
+import itertools
+import json
+import queue
+import socket
+import socketserver
+import time
+
+from cache import MemoryLRU, TranslationCache, create_cache_from_config, open_archive, parse_export_line
+from config import Config
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# أقصى طول لسطر طلب واحد (دفعة استيراد كاملة تبقى أصغر منه بكثير)
+MAX_LINE = 8 * 1024 * 1024
+
+# عمليات تحذف ترجمات، مقبولة فقط من نفس الجهاز
+LOCAL_ONLY_OPS = ('clear', 'clean_old_entries')
+
+def is_loopback(client_address):
+    """هل الطلب من نفس الجهاز؟"""
+    try:
+        if client_address[0] == 'localhost':
+            return True
+        return ipaddress.ip_address(client_address[0]).is_loopback
+    except (ValueError, TypeError, IndexError):
+        return False
+
+class CacheRequestHandler(socketserver.StreamRequestHandler):
+    """معالجة طلبات عميل واحد: طلب JSON في كل سطر ورد JSON في كل سطر"""
+    
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_LINE + 1)
+            if not line:
+                break
+            if len(line) > MAX_LINE:
+                # لا يمكن معرفة بداية الطلب التالي - إغلاق الاتصال
+                self._respond({'ok': False, 'error': f"request line longer than {MAX_LINE} bytes"})
+                break
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                response = {'ok': True, 'result': self.server.dispatch(request, self.client_address)}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            self._respond(response)
+    
+    def _respond(self, response):
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+class CacheServer(socketserver.ThreadingTCPServer):
+    """خادم يملك ملف SQLite ويخدم عدة عمليات ترجمة
+    
+    Every client talks to the same TranslationCache, so writes from the
+    whole farm go through one write-behind buffer and one SQLite writer
+    instead of many processes contending for the file lock.
+    
+    The protocol never takes file paths: export and import records travel
+    over the socket, and operations that delete translations are refused
+    unless the client is on the same host. With a token set, every request
+    must carry it; without one the server only listens on loopback.
+    """
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, cache, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        if not token and not is_loopback((host,)):
+            raise ValueError(f"Refusing to listen on {host} without cache_server_token; "
+                             f"set a token or use {DEFAULT_HOST}")
+        self.cache = cache
+        self.token = token or None
+        super().__init__((host, port), CacheRequestHandler)
+    
+    def dispatch(self, request, client_address=None):
+        op = request.get('op')
+        cache = self.cache
+        if self.token and not hmac.compare_digest(str(request.get('token', '')).encode('utf-8'),
+                                                  self.token.encode('utf-8')):
+            raise PermissionError("Invalid or missing cache server token")
+        if op in LOCAL_ONLY_OPS and client_address is not None and not is_loopback(client_address):
+            raise PermissionError(f"Cache operation '{op}' is only allowed from the server host")
+        if op == 'get':
+            return cache.get_cached_translation(request['text'], request['source_lang'], request['target_lang'])
+        if op == 'get_many':
+            return cache.get_many(request['texts'], request['source_lang'], request['target_lang'])
+        if op == 'save':
+            return cache.save_translation(request['original_text'], request['translated_text'],
+                                          request['source_lang'], request['target_lang'],
+                                          request.get('engine', 'google'))
+        if op == 'stats':
+            return cache.get_cache_stats()
+        if op == 'flush':
+            return cache.flush()
+        if op == 'clean_old_entries':
+            return cache.clean_old_entries(request.get('days_old', 30))
+        if op == 'clear':
+            return cache.clear_cache()
+        if op == 'export_page':
+            after = request.get('after')
+            entries, last_key = cache.export_page(bytes.fromhex(after) if after else None,
+                                                  min(int(request.get('limit', 1000)), 5000),
+                                                  request.get('source_lang'), request.get('target_lang'),
+                                                  request.get('since'))
+            return {'entries': entries, 'next': last_key.hex() if last_key else None}
+        if op == 'import_records':
+            return cache.import_records(request['entries'])
+        if op == 'ping':
+            return 'pong'
+        raise ValueError(f"Unknown cache operation: {op}")
+
+class RemoteTranslationCache:
+    """عميل لخادم الذاكرة المؤقتة بنفس واجهة TranslationCache
+    
+    Requests go over a small pool of persistent connections. A local
+    MemoryLRU answers repeated lookups without a round trip. Export and
+    import files are read and written on the client side; the records are
+    streamed over the connection in pages.
+    """
+    
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, pool_size=8, timeout=10.0,
+                 memory_entries=10000, memory_mb=32, stats_callback=None, token=None):
+        self.host = host
+        self.port = port
+        self.token = token or None
+        self.timeout = timeout
+        self.stats_callback = stats_callback
+        self.memory = MemoryLRU(memory_entries, int(memory_mb * 1024 * 1024), stats_callback)
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        
+        # فشل مبكر إذا لم يكن الخادم متاحاً
+        self._call({'op': 'ping'})
+    
+    def _open(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile('rb')
+    
+    def _call(self, request):
+        """إرسال طلب واحد عبر اتصال من المجمع، مع إعادة المحاولة مرة على اتصال جديد"""
+        if self.token:
+            request = dict(request, token=self.token)
+        payload = json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n'
+        for attempt in range(2):
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                connection = None
+            
+            try:
+                if connection is None:
+                    connection = self._open()
+                sock, reader = connection
+                sock.sendall(payload)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("cache server closed the connection")
+            except OSError:
+                if connection is not None:
+                    connection[0].close()
+                # اتصال قديم أغلقه الخادم - المحاولة مرة أخرى باتصال جديد
+                if attempt == 0:
+                    continue
+                raise
+            
+            try:
+                self._pool.put_nowait(connection)
+            except queue.Full:
+                connection[0].close()
+            
+            response = json.loads(line)
+            if not response.get('ok'):
+                raise RuntimeError(response.get('error', 'cache server error'))
+            return response.get('result')
+    
+    # نفس مفتاح وملخص الذاكرة المؤقتة المحلية
+    _generate_hash = TranslationCache._generate_hash
+    _transfer_summary = TranslationCache._transfer_summary
+    
+    def get_cached_translation(self, text, source_lang, target_lang):
+        """البحث عن ترجمة محفوظة"""
+        if not text.strip():
+            return None
+        
+        text_hash = self._generate_hash(text, source_lang, target_lang)
+        cached = self.memory.get(text_hash)
+        if cached is not None:
+            return cached
+        
+        try:
+            result = self._call({'op': 'get', 'text': text,
+                                 'source_lang': source_lang, 'target_lang': target_lang})
+        except Exception as e:
+            print(f"خطأ في البحث في الذاكرة المؤقتة: {e}")
+            return None
+        
+        if result is not None:
+            self.memory.put(text_hash, result)
+        return result
+    
+    def get_many(self, texts, source_lang, target_lang):
+        """البحث عن ترجمات عدة نصوص بطلب واحد إلى الخادم"""
+        found = {}
+        missing = []
+        for text in texts:
+            if not text.strip() or text in found:
+                continue
+            cached = self.memory.get(self._generate_hash(text, source_lang, target_lang))
+            if cached is not None:
+                found[text] = cached
+            else:
+                missing.append(text)
+        
+        if missing:
+            try:
+                result = self._call({'op': 'get_many', 'texts': missing,
+                                     'source_lang': source_lang, 'target_lang': target_lang})
+            except Exception as e:
+                print(f"خطأ في البحث في الذاكرة المؤقتة: {e}")
+                result = {}
+            for text, translated_text in result.items():
+                self.memory.put(self._generate_hash(text, source_lang, target_lang), translated_text)
+                found[text] = translated_text
+        return found
+    
+    def save_translation(self, original_text, translated_text, source_lang, target_lang, engine="google"):
+        """حفظ ترجمة جديدة في الذاكرة المؤقتة"""
+        if not original_text.strip() or not translated_text.strip():
+            return False
+        
+        self.memory.put(self._generate_hash(original_text, source_lang, target_lang), translated_text)
+        try:
+            return self._call({'op': 'save', 'original_text': original_text, 'translated_text': translated_text,
+                               'source_lang': source_lang, 'target_lang': target_lang, 'engine': engine})
+        except Exception as e:
+            print(f"خطأ في حفظ الترجمة: {e}")
+            return False
+    
+    def get_cache_stats(self):
+        """إحصائيات الذاكرة المؤقتة"""
+        try:
+            return self._call({'op': 'stats'})
+        except Exception as e:
+            print(f"خطأ في حساب الإحصائيات: {e}")
+            return {}
+    
+    def flush(self):
+        try:
+            return self._call({'op': 'flush'})
+        except Exception as e:
+            print(f"خطأ في حفظ الترجمة: {e}")
+            return False
+    
+    def clean_old_entries(self, days_old=30):
+        """تنظيف الترجمات القديمة"""
+        self.memory.clear()
+        try:
+            return self._call({'op': 'clean_old_entries', 'days_old': days_old})
+        except Exception as e:
+            print(f"خطأ في تنظيف الذاكرة المؤقتة: {e}")
+            return 0
+    
+    def clear_cache(self):
+        """مسح جميع الترجمات المحفوظة"""
+        self.memory.clear()
+        try:
+            return self._call({'op': 'clear'})
+        except Exception as e:
+            print(f"خطأ في مسح الذاكرة المؤقتة: {e}")
+            return False
+    
+    def export_entries(self, path, source_lang=None, target_lang=None, since=None, page_size=1000):
+        """تصدير ترجمات الخادم إلى ملف محلي صفحة بعد صفحة"""
+        start = time.monotonic()
+        count = 0
+        after = None
+        with open_archive(path, 'w') as archive:
+            while True:
+                page = self._call({'op': 'export_page', 'after': after, 'limit': page_size,
+                                   'source_lang': source_lang, 'target_lang': target_lang, 'since': since})
+                archive.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in page['entries'])
+                count += len(page['entries'])
+                after = page['next']
+                if after is None:
+                    break
+        return self._transfer_summary(path, count, time.monotonic() - start)
+    
+    def import_entries(self, path, batch_size=1000):
+        """إرسال ترجمات ملف تصدير محلي إلى الخادم على دفعات"""
+        self.memory.clear()
+        start = time.monotonic()
+        count = 0
+        skipped = 0
+        with open_archive(path, 'r') as archive:
+            entries = (parse_export_line(line) for line in archive if line.strip())
+            while True:
+                batch = list(itertools.islice(entries, batch_size))
+                if not batch:
+                    break
+                imported, rejected = self._call({'op': 'import_records', 'entries': batch})
+                count += imported
+                skipped += rejected
+        return self._transfer_summary(path, count, time.monotonic() - start, skipped)
+    
+    def close(self):
+        """إغلاق اتصالات المجمع"""
+        while True:
+            try:
+                sock, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared translation cache server')
+    parser.add_argument('--host', help=f'Address to listen on (default: cache_server_host from config, {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, help=f'Port to listen on (default: cache_server_port from config, {DEFAULT_PORT})')
+    parser.add_argument('--db', default='translation_cache.db', help='SQLite cache file owned by the server')
+    parser.add_argument('--config', default='config.json', help='Config file for cache settings')
+    parser.add_argument('--token', help='Shared secret clients must send (default: cache_server_token from config)')
+    args = parser.parse_args()
+    
+    config = Config(args.config)
+    host = args.host or config.get('cache_server_host', DEFAULT_HOST)
+    port = args.port or config.get('cache_server_port', DEFAULT_PORT)
+    token = args.token or config.get('cache_server_token') or None
+    if not token and not is_loopback((host,)):
+        parser.error(f"refusing to listen on {host} without a token (--token or cache_server_token)")
+    cache = create_cache_from_config(config, db_path=args.db)
+    
+    server = CacheServer(cache, host, port, token)
+    print(f"🗄️  Cache server listening on {host}:{port} ({args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping cache server...")
+    finally:
+        server.server_close()
+        cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -15,13 +15,70 @@ class Config:
         "default_target_language": "ar",
         "default_source_language": "en", 
         "translation_engine": "google",
+        "secondary_engine": None,
+        "hedging_enabled": False,
+        "hedge_percentile": 95,
+        "hedge_min_samples": 20,
+        "hedge_min_delay_ms": 50,
+        "circuit_breaker_enabled": True,
+        "breaker_failure_threshold": 5,
+        "breaker_cooldown": 30,
+        "stub_engine": {
+            "latency_ms": 50,
+            "latency_jitter_ms": 0,
+            "latency_distribution": "uniform",
+            "latency_sigma": 0.5,
+            "throttle_rate": 0.0,
+            "error_rate": 0.0,
+            "max_batch_size": 0,
+            "retry_after": 1.0,
+            "seed": 42
+        },
         "batch_size": 10,
+        "batch_translation": False,
+        "max_batch_chars": 4500,
+        "max_workers": 1,
+        "max_parallel_files": 1,
+        "async_max_concurrency": 32,
         "delay_between_requests": 0.1,
+        "adaptive_rate_limit": True,
+        "rate_limit_min": 0.5,
+        "rate_limit_max": 20.0,
         "cache_enabled": True,
+        "cache_page_cache_mb": 16,
+        "cache_mmap_mb": 64,
+        "cache_write_batch_size": 50,
+        "cache_flush_interval_ms": 500,
+        "cache_memory_entries": 10000,
+        "cache_memory_mb": 32,
+        "cache_usage_flush_interval_ms": 5000,
+        "cache_normalization": False,
+        "cache_granularity": "cue",
+        "stream_chunk_size": 500,
+        "stream_dedupe_entries": 20000,
+        "skip_untranslatable": True,
+        "untranslatable_categories": ["timestamps", "numbers", "urls", "symbols", "speaker_tags", "music"],
+        "untranslatable_patterns": [],
+        "cache_max_size_mb": 0,
+        "cache_eviction_policy": "lru",
+        "cache_eviction_interval": 60,
+        "cache_bloom_filter": True,
+        "cache_bloom_error_rate": 0.01,
+        "cache_backend": "sqlite",
+        "cache_server_host": "127.0.0.1",
+        "cache_server_port": 8765,
+        "cache_server_pool_size": 8,
+        "cache_server_token": "",
+        "stats_refresh_interval_ms": 2000,
         "auto_detect_encoding": True,
         "preserve_formatting": True,
         "create_backup": True,
         "max_retries": 3,
+        "retry_base_delay": 0.5,
+        "retry_max_delay": 30.0,
+        "retry_budget_ratio": 0.1,
+        "retry_budget_window": 60,
+        "retry_budget_min_retries": 10,
         "supported_formats": [".srt", ".ass", ".vtt"],
         "output_suffix": "_arabic",
         "ui_language": "en"  # Changed default to English
@@ -93,6 +150,13 @@ class Config:
             "total_translations": "Total Translations",
             "cache_hits": "Cache Hits",
             "translation_errors": "Translation Errors",
+            "duplicate_cues": "Duplicate Entries Reused",
+            "memory_cache_hits": "Memory Cache Hits",
+            "normalized_cache_hits": "Hits After Normalization",
+            "bloom_skipped_lookups": "Lookups Skipped by Bloom Filter",
+            "cue_segments": "Sentence Segments",
+            "skipped_cues": "Cues Passed Through Untranslated",
+            "cache_evictions": "Entries Evicted (size limit)",
             "cache_size": "Cache Size",
             "cache_hit_rate": "Cache Hit Rate",
             "help_title": "Subtitle Translator v2.2.2 Help",
@@ -165,6 +229,13 @@ class Config:
             "total_translations": "إجمالي الترجمات", 
             "cache_hits": "استخدام الذاكرة المؤقتة",
             "translation_errors": "أخطاء الترجمة",
+            "duplicate_cues": "الترجمات المكررة المعاد استخدامها",
+            "memory_cache_hits": "نتائج من ذاكرة الجلسة",
+            "normalized_cache_hits": "نتائج بعد توحيد النص",
+            "bloom_skipped_lookups": "عمليات بحث تجاوزها مرشح Bloom",
+            "cue_segments": "الجمل المترجمة منفصلة",
+            "skipped_cues": "نصوص لم تحتج إلى ترجمة",
+            "cache_evictions": "ترجمات أزيلت (حد الحجم)",
             "cache_size": "حجم الذاكرة المؤقتة",
             "cache_hit_rate": "معدل الاستفادة من الذاكرة",
             "help_title": "مساعدة مترجم الترجمات v2.2.2",
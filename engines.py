@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+طبقة محركات الترجمة
+Translation engine layer: instance pooling, latency tracking, hedged requests and circuit breakers
+"""
+
+import threading
+import time
+import concurrent.futures
+from collections import deque
+from contextlib import contextmanager
+
+class EnginePool:
+    """مجمع نسخ محركات الترجمة لكل محرك وزوج لغات
+    
+    deep_translator engines keep per-request state on the instance, so each
+    instance is leased to one caller at a time. Released instances are kept
+    per (engine, source, target) key, up to max_idle of them, and handed to
+    the next caller instead of building a new engine for every request.
+    """
+    
+    def __init__(self, factory, max_idle=16):
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle = {}
+        self._created = 0
+        self._leased = 0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def lease(self, engine, source_lang, target_lang):
+        """استعارة نسخة من المحرك لطلب واحد ثم إعادتها إلى المجمع"""
+        key = (engine, source_lang, target_lang)
+        with self._lock:
+            idle = self._idle.get(key)
+            instance = idle.pop() if idle else None
+            self._leased += 1
+        
+        if instance is None:
+            instance = self.factory(engine, source_lang, target_lang)
+            with self._lock:
+                self._created += 1
+        
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(instance)
+    
+    def clear(self):
+        """إزالة كل النسخ المحفوظة (مثلاً بعد تغيير إعدادات المحرك)"""
+        with self._lock:
+            self._idle.clear()
+    
+    def get_stats(self):
+        with self._lock:
+            return {
+                'created': self._created,
+                'leased': self._leased,
+                'idle': sum(len(idle) for idle in self._idle.values()),
+                'keys': len(self._idle)
+            }
+
+class LatencyTracker:
+    """تتبع أزمنة استجابة المحرك في نافذة متحركة"""
+    
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, pct):
+        """زمن الاستجابة عند النسبة المئوية المطلوبة، أو None إذا لم توجد عينات"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100.0))
+        return samples[index]
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+class RequestHedger:
+    """إرسال طلبات احتياطية لتقليل زمن الاستجابة الأقصى
+    
+    The request goes to the primary engine first. If it has not answered
+    within the hedge_percentile of its observed latency, the same request is
+    sent to the secondary engine and whichever answers first wins. Until
+    min_samples latencies have been seen no hedging happens, and no hedge is
+    sent while allow_secondary (e.g. the secondary's breaker) refuses it.
+    Callers report latencies with record_latency, timing only the engine
+    request itself, so local rate limiting never looks like a slow engine.
+    """
+    
+    def __init__(self, hedge_percentile=95, min_samples=20, min_delay=0.05,
+                 max_workers=16, stats_callback=None):
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.stats_callback = stats_callback
+        self.trackers = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    
+    def _tracker(self, engine):
+        with self._lock:
+            if engine not in self.trackers:
+                self.trackers[engine] = LatencyTracker()
+            return self.trackers[engine]
+    
+    def _count(self, key):
+        if self.stats_callback:
+            self.stats_callback(key)
+    
+    def record_latency(self, engine, seconds):
+        """تسجيل زمن استجابة المحرك نفسه، دون أي انتظار محلي قبل الطلب"""
+        self._tracker(engine).record(seconds)
+    
+    def hedge_delay(self, engine):
+        """المهلة قبل إرسال الطلب الاحتياطي، أو None قبل جمع عينات كافية"""
+        tracker = self._tracker(engine)
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.hedge_percentile))
+    
+    def translate(self, primary, primary_call, secondary, secondary_call, allow_secondary=None):
+        """تنفيذ الطلب مع التحوط وإرجاع (النتيجة، اسم المحرك الفائز)"""
+        delay = self.hedge_delay(primary)
+        if delay is None:
+            return primary_call(), primary
+        
+        primary_future = self._executor.submit(primary_call)
+        done, _ = concurrent.futures.wait([primary_future], timeout=delay)
+        if done or (allow_secondary is not None and not allow_secondary()):
+            return primary_future.result(), primary
+        
+        self._count('hedged_requests')
+        secondary_future = self._executor.submit(secondary_call)
+        pending = {primary_future: primary, secondary_future: secondary}
+        
+        errors = []
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                engine = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                
+                if engine == secondary:
+                    self._count('hedge_wins')
+                return result, engine
+        
+        # فشل المحركان - إرجاع أول خطأ
+        raise errors[0]
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+class CircuitOpenError(Exception):
+    """رفض الطلب لأن قاطع الدائرة مفتوح لكل المحركات المتاحة"""
+    pass
+
+class CircuitBreaker:
+    """قاطع دائرة لمحرك ترجمة واحد
+    
+    Closed: requests flow and consecutive failures are counted. After
+    failure_threshold failures the breaker opens and rejects requests for
+    cooldown seconds. It then goes half-open and lets a single probe
+    through; the probe's outcome closes or re-opens it.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name, failure_threshold=5, cooldown=30.0, on_state_change=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.on_state_change = on_state_change
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+    
+    def _set_state(self, state):
+        # يُستدعى مع الاحتفاظ بالقفل
+        old_state = self._state
+        self._state = state
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if old_state != state and self.on_state_change:
+            self.on_state_change(self.name, old_state, state)
+    
+    def allow_request(self):
+        """هل يُسمح بإرسال طلب إلى هذا المحرك الآن؟"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self._set_state(self.HALF_OPEN)
+            
+            # نصف مفتوح: طلب اختبار واحد فقط في كل مرة
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._set_state(self.CLOSED)
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN:
+                self._set_state(self.OPEN)
+            elif self._state == self.CLOSED and self._failures >= self.failure_threshold:
+                self._set_state(self.OPEN)
@@ -9,6 +9,8 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import os
 import threading
+import concurrent.futures
+import itertools
 from datetime import datetime
 import queue
 from pathlib import Path
@@ -342,6 +344,18 @@ class SubtitleTranslatorGUI:
         retry_spin = tk.Spinbox(perf_settings, from_=1, to=10, textvariable=self.retries_var, width=10)
         retry_spin.grid(row=1, column=1, sticky='w', padx=10, pady=2)
         
+        # Concurrent workers
+        ttk.Label(perf_settings, text=self.localization.get('max_workers')).grid(row=2, column=0, sticky='w', pady=2)
+        self.workers_var = tk.IntVar(value=self.config.get('max_workers', 1))
+        workers_spin = tk.Spinbox(perf_settings, from_=1, to=32, textvariable=self.workers_var, width=10)
+        workers_spin.grid(row=2, column=1, sticky='w', padx=10, pady=2)
+        
+        # Files translated at the same time in batch mode
+        ttk.Label(perf_settings, text=self.localization.get('max_parallel_files')).grid(row=3, column=0, sticky='w', pady=2)
+        self.parallel_files_var = tk.IntVar(value=self.config.get('max_parallel_files', 1))
+        parallel_spin = tk.Spinbox(perf_settings, from_=1, to=16, textvariable=self.parallel_files_var, width=10)
+        parallel_spin.grid(row=3, column=1, sticky='w', padx=10, pady=2)
+        
         # File settings
         file_settings = ttk.LabelFrame(scrollable_frame, text=self.localization.get('file_settings'), padding=10)
         file_settings.pack(fill='x', padx=10, pady=5)
@@ -854,42 +868,33 @@ class SubtitleTranslatorGUI:
                 print(f"🆕 Created new session {session_id}")
             
             # Translate subtitles
-            translated_subtitles = []
-            for i, subtitle in enumerate(subtitles):
-                if not self.is_translating:
-                    print("⏹ Translation stopped by user")
-                    # Cancel the session
-                    if session_id:
-                        self.progress_saver.cancel_session()
-                    break
+            max_workers = self.config.get('max_workers', 1)
+            self.translator.config.set('max_workers', max_workers)
+            if max_workers > 1:
+                translated_subtitles = self.translate_subtitles_concurrently(
+                    subtitles, target_lang, start_index, session_id)
+            else:
+                translated_subtitles = []
+                for i, subtitle in enumerate(subtitles):
+                    if not self.is_translating:
+                        print("⏹ Translation stopped by user")
+                        # Cancel the session
+                        if session_id:
+                            self.progress_saver.cancel_session()
+                        break
+                        
+                    progress = 20 + (i / total_subtitles) * 70
+                    self.update_progress(progress, f"Translating subtitle {i+1}/{total_subtitles}...")
                     
-                progress = 20 + (i / total_subtitles) * 70
-                self.update_progress(progress, f"Translating subtitle {i+1}/{total_subtitles}...")
-                
-                # If resuming, skip already completed subtitles
-                if i < start_index:
-                    translated_subtitles.append(subtitle)
-                    continue
-                
-                text = subtitle.get('text', '')
-                if text.strip():
-                    translated_text = self.translator.translate_text(text, target_lang)
-                    subtitle['text'] = translated_text
-                    print(f"✅ Translated: '{text[:50]}...' → '{translated_text[:50]}...'")
+                    # If resuming, skip already completed subtitles
+                    if i < start_index:
+                        translated_subtitles.append(subtitle)
+                        continue
                     
-                    # Save progress with translated item
-                    translated_item = {
-                        'original': text,
-                        'translated': translated_text,
-                        'start_time': subtitle.get('start', ''),
-                        'end_time': subtitle.get('end', '')
-                    }
-                    self.progress_saver.save_progress(i + 1, translated_item)
-                else:
-                    # Save progress even for empty/skipped items
-                    self.progress_saver.save_progress(i + 1)
-                
-                translated_subtitles.append(subtitle)
+                    text = subtitle.get('text', '')
+                    translated_text = self.translator.translate_text(text, target_lang) if text.strip() else text
+                    self.record_translated_subtitle(i, subtitle, text, translated_text)
+                    translated_subtitles.append(subtitle)
             
             if self.is_translating:
                 # Write output file
@@ -938,6 +943,50 @@ class SubtitleTranslatorGUI:
             # Re-enable controls
             self.root.after(0, lambda: self.set_translation_controls(True))
     
+    def translate_subtitles_concurrently(self, subtitles, target_lang, start_index, session_id):
+        """Translate subtitles in chunks on the translator's worker pool"""
+        total_subtitles = len(subtitles)
+        chunk_size = self.config.get('max_workers', 1) * 4
+        translated_subtitles = list(subtitles[:start_index])
+        
+        for chunk_start in range(start_index, total_subtitles, chunk_size):
+            if not self.is_translating:
+                print("⏹ Translation stopped by user")
+                if session_id:
+                    self.progress_saver.cancel_session()
+                break
+            
+            chunk = subtitles[chunk_start:chunk_start + chunk_size]
+            progress = 20 + (chunk_start / total_subtitles) * 70
+            self.update_progress(progress, f"Translating subtitle {chunk_start+1}/{total_subtitles}...")
+            
+            texts = [subtitle.get('text', '') for subtitle in chunk]
+            translated_texts = self.translator.translate_many(texts, target_lang)
+            
+            for offset, (subtitle, text, translated_text) in enumerate(zip(chunk, texts, translated_texts)):
+                self.record_translated_subtitle(chunk_start + offset, subtitle, text, translated_text)
+                translated_subtitles.append(subtitle)
+        
+        return translated_subtitles
+    
+    def record_translated_subtitle(self, index, subtitle, text, translated_text):
+        """Store a translated subtitle and save session progress"""
+        if text.strip():
+            subtitle['text'] = translated_text
+            print(f"✅ Translated: '{text[:50]}...' → '{translated_text[:50]}...'")
+            
+            # Save progress with translated item
+            translated_item = {
+                'original': text,
+                'translated': translated_text,
+                'start_time': subtitle.get('start', ''),
+                'end_time': subtitle.get('end', '')
+            }
+            self.progress_saver.save_progress(index + 1, translated_item)
+        else:
+            # Save progress even for empty/skipped items
+            self.progress_saver.save_progress(index + 1)
+    
     def stop_translation(self):
         """Stop ongoing translation"""
         self.is_translating = False
@@ -1049,71 +1098,34 @@ class SubtitleTranslatorGUI:
             return
         
         # Start batch translation in separate thread
+        self.is_translating = True
         self.batch_thread = threading.Thread(target=self.batch_translation_worker)
         self.batch_thread.daemon = True
         self.batch_thread.start()
     
     def batch_translation_worker(self):
-        """Worker thread for batch translation"""
+        """Worker thread for batch translation
+        
+        Up to max_parallel_files files run at once. Each file passes its own
+        source and target language down to the translator, so files in
+        different languages can be translated side by side.
+        """
         items = self.file_tree.get_children()
         total_files = len(items)
         
         try:
-            for i, item in enumerate(items):
-                if not self.is_translating:
-                    break
-                
-                # Get file info
-                values = self.file_tree.item(item, 'values')
-                filename = values[0]
-                source_lang = values[2]
-                target_lang = values[3]
-                
-                # Get full path from tags
-                file_path = self.file_tree.item(item, 'tags')[0]
-                
-                # Update status
-                self.root.after(0, lambda i=item: self.file_tree.item(
-                    i, values=(*values[:4], 'Translating...')))
-                
-                progress = (i / total_files) * 100
-                self.root.after(0, lambda p=progress: self.batch_progress_var.set(p))
-                self.root.after(0, lambda f=filename: self.batch_progress_label.config(
-                    text=f"Translating: {f}"))
-                
-                try:
-                    # Generate output path
-                    input_path = Path(file_path)
-                    suffix = self.config.get('output_suffix', '_translated')
-                    output_ext = self.output_format_var.get()
-                    output_name = f"{input_path.stem}{suffix}{output_ext}"
-                    output_path = input_path.parent / output_name
-                    
-                    # Translate file
-                    subtitles = self.format_handler.read_subtitles(file_path)
-                    
-                    if source_lang == 'auto':
-                        sample_text = " ".join([sub.get('text', '') for sub in subtitles[:5]])
-                        detected_lang = self.language_detector.detect_language(sample_text)
-                        source_lang = detected_lang if detected_lang != 'unknown' else 'en'
-                    
-                    for subtitle in subtitles:
-                        text = subtitle.get('text', '')
-                        if text.strip():
-                            translated_text = self.translator.translate_text(text, source_lang, target_lang)
-                            subtitle['text'] = translated_text
-                    
-                    # Write output
-                    self.format_handler.write_subtitles(subtitles, str(output_path), output_ext)
-                    
-                    # Update status to completed
-                    self.root.after(0, lambda i=item: self.file_tree.item(
-                        i, values=(*values[:4], 'Completed')))
-                    
-                except Exception as e:
-                    print(f"Error translating {filename}: {e}")
-                    self.root.after(0, lambda i=item: self.file_tree.item(
-                        i, values=(*values[:4], 'Failed')))
+            self.translator.config.set('max_workers', self.config.get('max_workers', 1))
+            max_parallel = max(1, int(self.config.get('max_parallel_files', 1)))
+            output_ext = self.output_format_var.get()
+            completed = 0
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                futures = [executor.submit(self.translate_batch_item, item, output_ext) for item in items]
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+                    completed += 1
+                    progress = (completed / total_files) * 100
+                    self.root.after(0, lambda p=progress: self.batch_progress_var.set(p))
             
             if self.is_translating:
                 self.root.after(0, lambda: self.batch_progress_var.set(100))
@@ -1127,6 +1139,51 @@ class SubtitleTranslatorGUI:
         finally:
             self.is_translating = False
     
+    def translate_batch_item(self, item, output_ext):
+        """Translate one file from the batch list and update its status"""
+        if not self.is_translating:
+            return
+        
+        # Get file info
+        values = self.file_tree.item(item, 'values')
+        filename = values[0]
+        source_lang = values[2]
+        target_lang = values[3]
+        
+        # Get full path from tags
+        file_path = self.file_tree.item(item, 'tags')[0]
+        
+        # Update status
+        self.root.after(0, lambda: self.file_tree.item(item, values=(*values[:4], 'Translating...')))
+        self.root.after(0, lambda: self.batch_progress_label.config(text=f"Translating: {filename}"))
+        
+        try:
+            # Generate output path
+            input_path = Path(file_path)
+            suffix = self.config.get('output_suffix', '_translated')
+            output_name = f"{input_path.stem}{suffix}{output_ext}"
+            output_path = input_path.parent / output_name
+            
+            # Translate file while it is being read, writing each chunk as it is done
+            subtitles = self.format_handler.iter_file(file_path)
+            
+            if source_lang == 'auto':
+                sample = list(itertools.islice(subtitles, 5))
+                sample_text = " ".join([sub.get('text', '') for sub in sample])
+                detected_lang = self.language_detector.detect_language(sample_text)
+                source_lang = detected_lang if detected_lang != 'unknown' else 'en'
+                subtitles = itertools.chain(sample, subtitles)
+            
+            self.translator.translate_subtitle_stream(subtitles, str(output_path), target_lang,
+                                                      source_lang, output_ext)
+            
+            # Update status to completed
+            self.root.after(0, lambda: self.file_tree.item(item, values=(*values[:4], 'Completed')))
+            
+        except Exception as e:
+            print(f"Error translating {filename}: {e}")
+            self.root.after(0, lambda: self.file_tree.item(item, values=(*values[:4], 'Failed')))
+    
     def update_file_count(self):
         """Update file count in status bar"""
         count = len(self.file_tree.get_children())
@@ -1201,6 +1258,8 @@ class SubtitleTranslatorGUI:
             self.config.set('translation_engine', self.default_engine_var.get())
             self.config.set('delay_between_requests', self.delay_var.get())
             self.config.set('max_retries', self.retries_var.get())
+            self.config.set('max_workers', self.workers_var.get())
+            self.config.set('max_parallel_files', self.parallel_files_var.get())
             self.config.set('create_backup', self.backup_setting_var.get())
             self.config.set('cache_enabled', self.cache_setting_var.get())
             self.config.set('output_suffix', self.suffix_var.get())
@@ -1272,6 +1331,8 @@ class SubtitleTranslatorGUI:
         self.default_engine_var.set(self.config.get('translation_engine', 'google'))
         self.delay_var.set(self.config.get('delay_between_requests', 0.1))
         self.retries_var.set(self.config.get('max_retries', 3))
+        self.workers_var.set(self.config.get('max_workers', 1))
+        self.parallel_files_var.set(self.config.get('max_parallel_files', 1))
         self.backup_setting_var.set(self.config.get('create_backup', True))
         self.cache_setting_var.set(self.config.get('cache_enabled', True))
         self.suffix_var.set(self.config.get('output_suffix', '_translated'))
@@ -1289,28 +1350,23 @@ class SubtitleTranslatorGUI:
     def refresh_stats(self):
         """Refresh statistics display"""
         try:
+            stats = self.translator.session_stats
+            duration = datetime.now() - stats['start_time']
+            minutes, seconds = divmod(int(duration.total_seconds()), 60)
+            
             # Session stats
             session_stats = f"""Session Statistics:
 ─────────────────────
-Files Translated: 0
-Total Characters: 0
-Average Time per File: 0s
-Session Duration: 0m
-Last Translation: None
-
-Translation Engines Used:
-• Google Translate: 0 files
-• Microsoft Translator: 0 files
+Files Translated: {stats['files_processed']}
+Subtitles Translated: {stats['subtitles_translated']}
+Cache Hits: {stats['cache_hits']}
+Duplicate Entries Reused: {stats['duplicate_cues']}
+Translation Errors: {stats['translation_errors']}
+Session Duration: {minutes}m {seconds}s
 
-Supported Formats:
-• SRT: Yes
-• ASS: Yes  
-• VTT: Yes
-
-Language Pairs:
-• Auto-detect → Arabic
-• English → Arabic
-• French → Arabic
+Translation Engine: {self.translator.current_engine}
+Throttled Requests: {stats['throttled_requests']}
+Retries: {stats['retries']}
 """
             
             self.stats_text.config(state='normal')
@@ -1319,17 +1375,22 @@ Language Pairs:
             self.stats_text.config(state='disabled')
             
             # Cache stats
+            cache = self.translator.cache
+            cache_info = cache.get_cache_stats() if cache else {}
+            memory_info = cache.memory.get_stats() if cache else {}
+            languages = ", ".join(f"{lang}: {count}" for lang, count in cache_info.get('language_stats', [])[:5])
             cache_stats = f"""Cache Statistics:
 ─────────────────
-Cache Status: {"Enabled" if self.config.get('cache_enabled', True) else "Disabled"}
-Total Entries: 0
-Cache Size: 0 KB
-Hit Rate: 0%
-Last Updated: Never
+Cache Status: {"Enabled" if cache else "Disabled"}
+Total Entries: {cache_info.get('total_translations', 0)}
+Cache Size: {cache_info.get('database_size_mb', 0)} MB
+Hit Rate: {cache_info.get('cache_hit_potential', 0)}%
+Languages: {languages or "None"}
+Last Updated: {datetime.now().strftime('%H:%M:%S')}
 
 Cache Performance:
-• Fast Lookups: 0ms avg
-• Memory Usage: Low
+• Memory Tier: {memory_info.get('entries', 0)} entries, {memory_info.get('size_mb', 0)} MB
+• Memory Hits: {stats['memory_cache_hits']} ({stats['memory_cache_evictions']} evictions)
 • Storage: SQLite Database
 """
             
@@ -1341,6 +1402,21 @@ Cache Performance:
         except Exception as e:
             print(f"Error refreshing stats: {e}")
     
+    def schedule_stats_refresh(self):
+        """Refresh the statistics tab periodically while it is visible
+        
+        Cache statistics come from maintained counters, so a refresh costs
+        the same however large the cache is.
+        """
+        try:
+            if self.notebook.select() == str(self.stats_frame):
+                self.refresh_stats()
+        except tk.TclError:
+            return
+        
+        interval = self.config.get('stats_refresh_interval_ms', 2000)
+        self.root.after(interval, self.schedule_stats_refresh)
+    
     def clear_cache(self):
         """Clear translation cache"""
         result = messagebox.askyesno("Confirm", "Clear all cached translations?")
@@ -1389,6 +1465,7 @@ Cache Performance:
         """Start the GUI application"""
         # Initialize display
         self.refresh_stats()
+        self.schedule_stats_refresh()
         self.load_settings_to_gui()
         
         # Check for incomplete sessions on startup
@@ -88,6 +88,8 @@ class LocalizationManager:
                 'performance_settings': 'إعدادات الأداء',
                 'delay_between_requests': 'التأخير بين الطلبات (ثانية):',
                 'maximum_retries': 'الحد الأقصى للمحاولات:',
+                'max_workers': 'عدد خيوط الترجمة المتزامنة:',
+                'max_parallel_files': 'عدد الملفات المترجمة في وقت واحد:',
                 'file_settings': 'إعدادات الملف',
                 'create_backup_auto': 'إنشاء ملفات احتياطية تلقائياً',
                 'enable_translation_cache': 'تفعيل تخزين الترجمة مؤقتاً',
@@ -208,6 +210,8 @@ class LocalizationManager:
                 'performance_settings': 'Performance Settings',
                 'delay_between_requests': 'Delay between requests (seconds):',
                 'maximum_retries': 'Maximum retries:',
+                'max_workers': 'Concurrent translation workers:',
+                'max_parallel_files': 'Files translated in parallel:',
                 'file_settings': 'File Settings',
                 'create_backup_auto': 'Create backup files automatically',
                 'enable_translation_cache': 'Enable translation cache',
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+محدد معدل الطلبات لمحركات الترجمة
+Adaptive token-bucket rate limiter shared per translation engine
+"""
+
+import asyncio
+import threading
+import time
+
+class TokenBucketRateLimiter:
+    """دلو رموز مع تعديل تكيفي للمعدل (AIMD)
+    
+    Every real engine request takes one token. While requests succeed the
+    rate grows by increase_step requests/second once per second (additive
+    increase); a throttling response multiplies it by decrease_factor
+    (multiplicative decrease) and honours any Retry-After hint.
+    """
+    
+    def __init__(self, rate=10.0, min_rate=0.5, max_rate=20.0, burst=None,
+                 increase_step=0.5, decrease_factor=0.5, adaptive=True):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = burst
+        self.capacity = burst if burst is not None else max(1.0, self.rate)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.adaptive = adaptive
+        
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._last_increase = self._last_refill
+        self._last_decrease = 0.0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def configure(self, rate, min_rate, max_rate, adaptive=True):
+        """تطبيق إعدادات جديدة على المحدد المشترك دون فقد حالة الرموز"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.min_rate = min_rate
+            self.max_rate = max(max_rate, min_rate)
+            self.rate = min(max(rate, self.min_rate), self.max_rate)
+            self.adaptive = adaptive
+            if self.burst is None:
+                self.capacity = max(1.0, self.rate)
+            self._tokens = min(self._tokens, self.capacity)
+    
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+    
+    def reserve(self):
+        """حجز رمز وإرجاع زمن الانتظار المطلوب بالثواني"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+    
+    def acquire(self):
+        """انتظار حتى يتوفر رمز"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """انتظار حتى يتوفر رمز دون حجب حلقة الأحداث"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    def on_success(self):
+        """زيادة المعدل تدريجياً بعد الطلبات الناجحة"""
+        if not self.adaptive:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_increase >= 1.0:
+                self._last_increase = now
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+    
+    def on_throttle(self, retry_after=None):
+        """خفض المعدل عند رفض المحرك للطلبات"""
+        with self._lock:
+            now = time.monotonic()
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            
+            if not self.adaptive:
+                return
+            
+            # تجاهل الرفض المتزامن من عدة خيوط لنفس الموجة
+            if now - self._last_decrease < 1.0:
+                return
+            self._last_decrease = now
+            self._last_increase = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+    
+    def get_stats(self):
+        """إحصائيات المحدد الحالية"""
+        with self._lock:
+            return {
+                'rate': round(self.rate, 2),
+                'min_rate': self.min_rate,
+                'max_rate': self.max_rate,
+                'adaptive': self.adaptive
+            }
+
+def is_throttling_error(error):
+    """التحقق مما إذا كان الخطأ ناتجاً عن تجاوز حد الطلبات (429)"""
+    if type(error).__name__ in ('TooManyRequests', 'TooManyRequestsError'):
+        return True
+    message = str(error).lower()
+    return '429' in message or 'too many requests' in message or 'rate limit' in message
+
+# محرك -> (المحدد، الإعدادات التي طُبقت عليه)
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(engine, config):
+    """الحصول على محدد المعدل المشترك لمحرك الترجمة
+    
+    One limiter is shared by every translator and thread in the process that
+    talks to the same engine. The starting rate comes from
+    delay_between_requests (1 / delay requests per second). A config with
+    different rate settings is applied to the shared limiter in place.
+    """
+    delay = config.get('delay_between_requests', 0.1)
+    max_rate = config.get('rate_limit_max', 20.0)
+    settings = (1.0 / delay if delay > 0 else max_rate,
+                config.get('rate_limit_min', 0.5),
+                max_rate,
+                config.get('adaptive_rate_limit', True))
+    with _limiters_lock:
+        limiter, applied = _limiters.get(engine, (None, None))
+        if limiter is None:
+            limiter = TokenBucketRateLimiter(*settings)
+        elif settings != applied:
+            limiter.configure(*settings)
+        _limiters[engine] = (limiter, settings)
+        return limiter
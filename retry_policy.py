@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سياسة إعادة المحاولة لطلبات الترجمة
+Retry policy: decorrelated-jitter backoff, Retry-After hints and a global retry budget
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+def decorrelated_jitter(previous, base=0.5, cap=30.0):
+    """زمن الانتظار التالي بأسلوب decorrelated jitter
+    
+    sleep = min(cap, uniform(base, previous * 3)). Concurrent workers that
+    failed together spread their retries out instead of retrying in step.
+    """
+    return min(cap, random.uniform(base, max(base, previous) * 3))
+
+def get_retry_after(error, max_delay=None):
+    """استخراج تلميح Retry-After من الخطأ بالثواني إن وجد
+    
+    With max_delay set the hint is capped, so one bogus header cannot
+    stall a worker for longer than the configured retry_max_delay.
+    """
+    seconds = _parse_retry_after(error)
+    if seconds is None or max_delay is None:
+        return seconds
+    return min(seconds, max_delay)
+
+def _parse_retry_after(error):
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('Retry-After')
+    
+    if retry_after is None:
+        return None
+    
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        pass
+    
+    # Retry-After قد يكون تاريخ HTTP
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class RetryBudget:
+    """ميزانية عامة لإعادة المحاولة
+    
+    Retries may not exceed ratio of the requests seen over the last window
+    seconds (with min_retries always allowed, so a quiet period can still
+    retry). One outage therefore cannot multiply the load on the provider.
+    """
+    
+    def __init__(self, ratio=0.1, window=60.0, min_retries=10):
+        self.ratio = ratio
+        self.window = window
+        self.min_retries = min_retries
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+    
+    def configure(self, ratio, window, min_retries):
+        """تطبيق إعدادات جديدة مع الاحتفاظ بالطلبات المسجلة"""
+        with self._lock:
+            self.ratio = ratio
+            self.window = window
+            self.min_retries = min_retries
+    
+    def _prune(self, now):
+        cutoff = now - self.window
+        while self._requests and self._requests[0] < cutoff:
+            self._requests.popleft()
+        while self._retries and self._retries[0] < cutoff:
+            self._retries.popleft()
+    
+    def record_request(self):
+        """تسجيل طلب أصلي (ليس إعادة محاولة)"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._requests.append(now)
+    
+    def try_acquire_retry(self):
+        """حجز إعادة محاولة من الميزانية، ويرجع False إذا نفدت"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            allowed = max(self.min_retries, self.ratio * len(self._requests))
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+_budget = None
+_budget_settings = None
+_budget_lock = threading.Lock()
+
+def get_retry_budget(config):
+    """ميزانية إعادة المحاولة المشتركة في العملية
+    
+    The budget is shared process-wide; when a translator brings different
+    retry_budget_* settings (a changed config, a second config file) they
+    are applied to it in place.
+    """
+    global _budget, _budget_settings
+    settings = (config.get('retry_budget_ratio', 0.1),
+                config.get('retry_budget_window', 60),
+                config.get('retry_budget_min_retries', 10))
+    with _budget_lock:
+        if _budget is None:
+            _budget = RetryBudget(*settings)
+        elif settings != _budget_settings:
+            _budget.configure(*settings)
+        _budget_settings = settings
+        return _budget
@@ -40,10 +40,19 @@ setup(
     py_modules=[
         'gui_translator',
         'translate_subtitles', 
+        'async_translator',
         'config',
         'subtitle_formats',
         'language_detector',
         'cache',
+        'rate_limiter',
+        'stub_engine',
+        'engines',
+        'retry_policy',
+        'text_normalizer',
+        'cache_server',
+        'bloom_filter',
+        'text_classifier',
         'run_gui',
         'start_gui'
     ],
@@ -70,6 +79,7 @@ setup(
         'console_scripts': [
             'subtitle-translator=translate_subtitles:main',
             'subtitle-translator-gui=run_gui:main',
+            'subtitle-translator-cache-server=cache_server:main',
         ],
         'gui_scripts': [
             'subtitle-translator-gui=run_gui:main',
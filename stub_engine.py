@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+محرك ترجمة وهمي للاختبار وقياس الأداء دون اتصال
+Offline stub translation engine for benchmarks and load tests
+"""
+
+import random
+import re
+import time
+
+class StubThrottledError(Exception):
+    """رفض الطلب بسبب تجاوز الحد (يحاكي HTTP 429)"""
+    
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests (stub engine)")
+        self.retry_after = retry_after
+
+class StubEngineError(Exception):
+    """خطأ عشوائي من المحرك الوهمي (يحاكي HTTP 5xx)"""
+    
+    def __init__(self):
+        super().__init__("503 Service Unavailable (stub engine)")
+
+class StubTranslator:
+    """محرك ترجمة وهمي بنتائج ثابتة
+    
+    Returns a deterministic pseudo-translation (target code prefix, letters
+    of each word reversed) after a simulated latency, and can inject
+    429-style throttling and random errors. Lines without letters, such as
+    the batch separator, are returned unchanged. When a request packs more
+    than max_batch_size segments, the extra segments are merged into the
+    last one, the way real engines sometimes swallow separators.
+    """
+    
+    def __init__(self, source='auto', target='en', latency_ms=50, latency_jitter_ms=0,
+                 latency_distribution='uniform', latency_sigma=0.5, throttle_rate=0.0,
+                 error_rate=0.0, max_batch_size=0, retry_after=1.0, seed=None,
+                 batch_separator=None):
+        self.source = source
+        self.target = target
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.max_batch_size = max_batch_size
+        self.retry_after = retry_after
+        self.batch_separator = batch_separator
+        self._random = random.Random(seed)
+        
+        # عدادات لقياس الأداء
+        self.requests = 0
+        self.characters = 0
+    
+    def sample_latency(self):
+        """زمن استجابة عشوائي بالثواني حسب التوزيع المحدد"""
+        if self.latency_distribution == 'fixed':
+            latency = self.latency_ms
+        elif self.latency_distribution == 'lognormal':
+            # latency_ms هو الوسيط، وlatency_sigma يتحكم في طول الذيل
+            latency = self.latency_ms * self._random.lognormvariate(0, self.latency_sigma)
+        else:
+            latency = self.latency_ms + self._random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        return max(0.0, latency) / 1000.0
+    
+    def check_failure(self):
+        """رفع خطأ محاكى حسب معدلات الرفض والأخطاء"""
+        draw = self._random.random()
+        if draw < self.throttle_rate:
+            raise StubThrottledError(self.retry_after)
+        if draw < self.throttle_rate + self.error_rate:
+            raise StubEngineError()
+    
+    def pseudo_translate(self, text, target=None):
+        """ترجمة وهمية ثابتة للنص"""
+        target = target or self.target
+        self.requests += 1
+        self.characters += len(text)
+        
+        if self.batch_separator and self.max_batch_size > 0:
+            segments = text.split(self.batch_separator)
+            if len(segments) > self.max_batch_size:
+                head = segments[:self.max_batch_size - 1]
+                segments = head + ['\n'.join(segments[self.max_batch_size - 1:])]
+            text = self.batch_separator.join(segments)
+        
+        lines = []
+        for line in text.split('\n'):
+            if re.search(r'[^\W\d_]', line):
+                line = f"[{target}] " + re.sub(r'[^\W\d_]+', lambda m: m.group(0)[::-1], line)
+            lines.append(line)
+        return '\n'.join(lines)
+    
+    def translate(self, text, **kwargs):
+        latency = self.sample_latency()
+        if latency > 0:
+            time.sleep(latency)
+        self.check_failure()
+        return self.pseudo_translate(text)
+
+def create_stub_translator(source, target, settings=None, batch_separator=None):
+    """إنشاء محرك وهمي من إعداد stub_engine"""
+    settings = settings or {}
+    return StubTranslator(
+        source=source,
+        target=target,
+        latency_ms=settings.get('latency_ms', 50),
+        latency_jitter_ms=settings.get('latency_jitter_ms', 0),
+        latency_distribution=settings.get('latency_distribution', 'uniform'),
+        latency_sigma=settings.get('latency_sigma', 0.5),
+        throttle_rate=settings.get('throttle_rate', 0.0),
+        error_rate=settings.get('error_rate', 0.0),
+        max_batch_size=settings.get('max_batch_size', 0),
+        retry_after=settings.get('retry_after', 1.0),
+        seed=settings.get('seed'),
+        batch_separator=batch_separator
+    )
@@ -10,6 +10,65 @@ import re
 import os
 from datetime import timedelta
 
+ASS_HEADER = """[Script Info]
+Title: Translated Subtitles
+ScriptType: v4.00+
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,0,2,10,10,10,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+class SubtitleWriter:
+    """كاتب ترجمات متدفق يكتب كل ترجمة فور وصولها
+    
+    Writes the format header on open and one cue per write() call, so a
+    file of any size is written without holding its cues in memory.
+    """
+    
+    def __init__(self, handler, output_path, format_type):
+        self.handler = handler
+        self.format_type = format_type
+        self.count = 0
+        self.file = open(output_path, 'w', encoding='utf-8')
+        if format_type == '.ass':
+            self.file.write(ASS_HEADER)
+        elif format_type == '.vtt':
+            self.file.write("WEBVTT\n\n")
+    
+    def write(self, subtitle):
+        """Write one subtitle entry"""
+        if self.format_type == '.srt':
+            self.file.write(f"{subtitle['number']}\n{subtitle['timestamp']}\n{subtitle['text']}\n\n")
+        elif self.format_type == '.ass':
+            # Convert SRT timestamp to ASS format
+            start, end = subtitle['timestamp'].split(' --> ')
+            start_ass = self.handler.srt_time_to_ass(start)
+            end_ass = self.handler.srt_time_to_ass(end)
+            self.file.write(f"Dialogue: 0,{start_ass},{end_ass},Default,,0,0,0,,{subtitle['text']}\n")
+        else:
+            # Convert SRT timestamp to VTT format
+            timestamp = self.handler.srt_time_to_vtt(subtitle['timestamp'])
+            self.file.write(f"{timestamp}\n{subtitle['text']}\n\n")
+        self.count += 1
+    
+    def write_all(self, subtitles):
+        """Write every entry of an iterable of subtitles"""
+        for subtitle in subtitles:
+            self.write(subtitle)
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
 class SubtitleFormatHandler:
     """Handler for multiple subtitle formats"""
     
@@ -42,184 +101,165 @@ class SubtitleFormatHandler:
     
     def parse_file(self, file_path):
         """Parse subtitle file based on its format"""
+        return list(self.iter_file(file_path))
+    
+    def iter_file(self, file_path):
+        """Parse subtitle file based on its format, yielding one entry at a time"""
         format_type = self.detect_format(file_path)
         
         if format_type == '.srt':
-            return self.parse_srt(file_path)
+            return self.iter_srt(file_path)
         elif format_type == '.ass':
-            return self.parse_ass(file_path)
+            return self.iter_ass(file_path)
         elif format_type == '.vtt':
-            return self.parse_vtt(file_path)
+            return self.iter_vtt(file_path)
         else:
             raise ValueError(f"Unsupported format: {format_type}")
     
+    def _iter_blocks(self, file):
+        """قراءة الملف سطراً بسطر وإرجاع كل كتلة أسطر مفصولة بسطر فارغ"""
+        block = []
+        for line in file:
+            line = line.rstrip('\n')
+            if line.strip():
+                block.append(line)
+            elif block:
+                yield block
+                block = []
+        if block:
+            yield block
+    
     def parse_srt(self, file_path):
         """Parse SRT subtitle file"""
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        blocks = re.split(r'\n\s*\n', content.strip())
-        subtitles = []
+        return list(self.iter_srt(file_path))
+    
+    def iter_srt(self, file_path):
+        """Parse SRT subtitle file line by line, yielding one entry at a time
         
-        for block in blocks:
-            lines = block.strip().split('\n')
-            if len(lines) >= 3:
+        Memory stays flat however large the file is, so huge or
+        concatenated dumps can be translated while they are being read.
+        """
+        with open(file_path, 'r', encoding='utf-8-sig') as file:
+            for lines in self._iter_blocks(file):
+                if len(lines) < 3:
+                    continue
                 try:
                     number = int(lines[0])
-                    timestamp = lines[1]
-                    text = '\n'.join(lines[2:])
-                    
-                    subtitles.append({
-                        'number': number,
-                        'timestamp': timestamp,
-                        'text': text,
-                        'format': 'srt'
-                    })
                 except ValueError:
                     continue
-        
-        return subtitles
+                
+                yield {
+                    'number': number,
+                    'timestamp': lines[1],
+                    'text': '\n'.join(lines[2:]).rstrip(),
+                    'format': 'srt'
+                }
     
     def parse_ass(self, file_path):
         """Parse ASS/SSA subtitle file"""
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        lines = content.split('\n')
-        subtitles = []
+        return list(self.iter_ass(file_path))
+    
+    def iter_ass(self, file_path):
+        """Parse ASS/SSA subtitle file line by line, yielding one entry at a time"""
         dialogue_started = False
         number = 1
         
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('[Events]'):
-                dialogue_started = True
-                continue
-            
-            if dialogue_started and line.startswith('Dialogue:'):
-                # Parse ASS dialogue line
-                # Format: Dialogue: Layer,Start,End,Style,Name,MarginL,MarginR,MarginV,Effect,Text
-                parts = line.split(',', 9)
-                if len(parts) >= 10:
-                    start_time = parts[1]
-                    end_time = parts[2]
-                    text = parts[9]
-                    
-                    # Convert ASS time format to SRT format
-                    timestamp = f"{self.ass_time_to_srt(start_time)} --> {self.ass_time_to_srt(end_time)}"
-                    
-                    # Clean ASS formatting tags
-                    text = self.clean_ass_tags(text)
-                    
-                    subtitles.append({
-                        'number': number,
-                        'timestamp': timestamp,
-                        'text': text,
-                        'format': 'ass'
-                    })
-                    number += 1
-        
-        return subtitles
+        with open(file_path, 'r', encoding='utf-8-sig') as file:
+            for line in file:
+                line = line.strip()
+                
+                if line.startswith('[Events]'):
+                    dialogue_started = True
+                    continue
+                
+                if dialogue_started and line.startswith('Dialogue:'):
+                    # Parse ASS dialogue line
+                    # Format: Dialogue: Layer,Start,End,Style,Name,MarginL,MarginR,MarginV,Effect,Text
+                    parts = line.split(',', 9)
+                    if len(parts) >= 10:
+                        start_time = parts[1]
+                        end_time = parts[2]
+                        text = parts[9]
+                        
+                        # Convert ASS time format to SRT format
+                        timestamp = f"{self.ass_time_to_srt(start_time)} --> {self.ass_time_to_srt(end_time)}"
+                        
+                        # Clean ASS formatting tags
+                        text = self.clean_ass_tags(text)
+                        
+                        yield {
+                            'number': number,
+                            'timestamp': timestamp,
+                            'text': text,
+                            'format': 'ass'
+                        }
+                        number += 1
     
     def parse_vtt(self, file_path):
         """Parse WebVTT subtitle file"""
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Remove WEBVTT header
-        content = re.sub(r'^WEBVTT\n\n?', '', content)
-        
-        blocks = re.split(r'\n\s*\n', content.strip())
-        subtitles = []
+        return list(self.iter_vtt(file_path))
+    
+    def iter_vtt(self, file_path):
+        """Parse WebVTT subtitle file line by line, yielding one entry at a time"""
         number = 1
+        first_block = True
         
-        for block in blocks:
-            lines = block.strip().split('\n')
-            if len(lines) >= 2:
+        with open(file_path, 'r', encoding='utf-8-sig') as file:
+            for lines in self._iter_blocks(file):
+                # Remove WEBVTT header
+                if first_block and lines[0].startswith('WEBVTT'):
+                    lines = lines[1:]
+                first_block = False
+                
+                if len(lines) < 2:
+                    continue
+                
                 # Skip cue identifiers if present
                 start_idx = 0
                 if '-->' not in lines[0]:
                     start_idx = 1
                 
-                if start_idx < len(lines) and '-->' in lines[start_idx]:
-                    timestamp = lines[start_idx]
-                    text = '\n'.join(lines[start_idx + 1:])
-                    
+                if '-->' in lines[start_idx]:
                     # Convert VTT time format to SRT format
-                    timestamp = self.vtt_time_to_srt(timestamp)
+                    timestamp = self.vtt_time_to_srt(lines[start_idx].strip())
                     
                     # Clean VTT formatting tags
-                    text = self.clean_vtt_tags(text)
+                    text = self.clean_vtt_tags('\n'.join(lines[start_idx + 1:]))
                     
-                    subtitles.append({
+                    yield {
                         'number': number,
                         'timestamp': timestamp,
                         'text': text,
                         'format': 'vtt'
-                    })
+                    }
                     number += 1
-        
-        return subtitles
     
-    def save_file(self, subtitles, output_path, format_type=None):
-        """Save subtitles in specified format"""
+    def open_writer(self, output_path, format_type=None):
+        """Open a streaming writer for the output format (SubtitleWriter)"""
         if format_type is None:
             _, ext = os.path.splitext(output_path.lower())
             format_type = ext
         
-        if format_type == '.srt':
-            self.save_srt(subtitles, output_path)
-        elif format_type == '.ass':
-            self.save_ass(subtitles, output_path)
-        elif format_type == '.vtt':
-            self.save_vtt(subtitles, output_path)
-        else:
+        if format_type not in self.supported_formats:
             raise ValueError(f"Unsupported output format: {format_type}")
+        return SubtitleWriter(self, output_path, format_type)
+    
+    def save_file(self, subtitles, output_path, format_type=None):
+        """Save subtitles in specified format"""
+        with self.open_writer(output_path, format_type) as writer:
+            writer.write_all(subtitles)
     
     def save_srt(self, subtitles, output_path):
         """Save subtitles in SRT format"""
-        with open(output_path, 'w', encoding='utf-8') as file:
-            for subtitle in subtitles:
-                file.write(f"{subtitle['number']}\n")
-                file.write(f"{subtitle['timestamp']}\n")
-                file.write(f"{subtitle['text']}\n\n")
+        self.save_file(subtitles, output_path, '.srt')
     
     def save_ass(self, subtitles, output_path):
         """Save subtitles in ASS format"""
-        ass_header = """[Script Info]
-Title: Translated Subtitles
-ScriptType: v4.00+
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,0,2,10,10,10,1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-        
-        with open(output_path, 'w', encoding='utf-8') as file:
-            file.write(ass_header)
-            
-            for subtitle in subtitles:
-                # Convert SRT timestamp to ASS format
-                start, end = subtitle['timestamp'].split(' --> ')
-                start_ass = self.srt_time_to_ass(start)
-                end_ass = self.srt_time_to_ass(end)
-                
-                file.write(f"Dialogue: 0,{start_ass},{end_ass},Default,,0,0,0,,{subtitle['text']}\n")
+        self.save_file(subtitles, output_path, '.ass')
     
     def save_vtt(self, subtitles, output_path):
         """Save subtitles in WebVTT format"""
-        with open(output_path, 'w', encoding='utf-8') as file:
-            file.write("WEBVTT\n\n")
-            
-            for subtitle in subtitles:
-                # Convert SRT timestamp to VTT format
-                timestamp = self.srt_time_to_vtt(subtitle['timestamp'])
-                file.write(f"{timestamp}\n")
-                file.write(f"{subtitle['text']}\n\n")
+        self.save_file(subtitles, output_path, '.vtt')
     
     # Helper methods for time format conversion
     def ass_time_to_srt(self, ass_time):
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات مرشحات Bloom
+Tests for the Bloom filters over cache keys
+"""
+
+import hashlib
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bloom_filter import BloomFilter, PairBloomFilters
+
+def key(i):
+    return hashlib.md5(f"key {i}".encode('utf-8')).digest()
+
+def test_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(key(i))
+    
+    assert all(key(i) in bloom for i in range(5000))
+    false_positives = sum(1 for i in range(5000, 25000) if key(i) in bloom)
+    assert false_positives / 20000 < 0.03
+    assert not bloom.is_full()
+    
+    for i in range(25000, 26000):
+        bloom.add(key(i))
+    assert bloom.is_full()
+
+def test_pairs_are_kept_apart():
+    filters = PairBloomFilters(min_capacity=100)
+    filters.add(("en", "ar"), key(1))
+    assert filters.might_contain(("en", "ar"), key(1))
+    assert not filters.might_contain(("en", "fr"), key(1))
+    
+    filters.clear()
+    assert not filters.might_contain(("en", "ar"), key(1))
+
+def test_sidecar_loads_only_for_the_same_signature(tmp_path):
+    path = str(tmp_path / "cache.db.bloom")
+    filters = PairBloomFilters(min_capacity=100)
+    for i in range(50):
+        filters.add(("en", "ar"), key(i))
+    filters.add(("en", "fr"), key(99))
+    filters.save(path, 7)
+    
+    loaded = PairBloomFilters(min_capacity=100)
+    assert not loaded.load(path, 8)
+    assert not PairBloomFilters(error_rate=0.05).load(path, 7)
+    assert loaded.load(path, 7)
+    assert all(loaded.might_contain(("en", "ar"), key(i)) for i in range(50))
+    assert loaded.might_contain(("en", "fr"), key(99))
+    
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)
+    assert not PairBloomFilters(min_capacity=100).load(path, 7)
+    assert not PairBloomFilters().load(str(tmp_path / "missing.bloom"), 7)
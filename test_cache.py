@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات الذاكرة المؤقتة
+Tests for the SQLite translation cache
+"""
+
+import hashlib
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cache as cache_module
+import cache_server
+from cache import TranslationCache
+from cache_server import CacheServer, RemoteTranslationCache
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.db")
+
+def copy_baseline_db(tmp_path):
+    """Private copy of the shipped pre-migration cache file, its row count and first row"""
+    conn = sqlite3.connect(BASELINE_DB)
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] != 0:
+            pytest.skip("translation_cache.db has already been migrated in this checkout")
+        count = conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        first = conn.execute('''
+            SELECT original_text, translated_text, source_lang, target_lang FROM translations ORDER BY id LIMIT 1
+        ''').fetchone()
+    finally:
+        conn.close()
+    
+    db_path = str(tmp_path / "cache.db")
+    shutil.copyfile(BASELINE_DB, db_path)
+    return db_path, count, first
+
+def make_cache(tmp_path, **settings):
+    """TranslationCache on a private file that writes every translation straight through"""
+    settings.setdefault('write_batch_size', 1)
+    return TranslationCache(str(tmp_path / "cache.db"), **settings)
+
+def test_bloom_sees_writes_from_other_instance(tmp_path):
+    """A miss must not be trusted after another process wrote to the file"""
+    first = make_cache(tmp_path)
+    assert first.get_cached_translation("Hello", "en", "ar") is None
+    
+    second = make_cache(tmp_path)
+    assert second.save_translation("Hello", "مرحبا", "en", "ar")
+    second.close()
+    
+    assert first.get_cached_translation("Hello", "en", "ar") == "مرحبا"
+    assert first.get_many(["Hello"], "en", "ar") == {"Hello": "مرحبا"}
+    first.close()
+    
+    # الملف الجانبي المحفوظ يجب أن يطابق قاعدة البيانات عند إعادة الفتح
+    reopened = make_cache(tmp_path)
+    assert reopened.get_cached_translation("Hello", "en", "ar") == "مرحبا"
+    reopened.close()
+
+def test_stale_sidecar_is_not_loaded(tmp_path):
+    """A sidecar saved before another writer's insert must be rebuilt on start"""
+    first = make_cache(tmp_path)
+    first.save_translation("One", "واحد", "en", "ar")
+    second = make_cache(tmp_path)
+    first.close()
+    
+    # نفس عدد الترجمات لكل لغة، لكن بمفتاح مختلف
+    second.clear_cache()
+    second.save_translation("Two", "اثنان", "en", "ar")
+    # كأن العملية الثانية توقفت دون حفظ مرشحاتها
+    second._bloom_dirty = False
+    second.close()
+    
+    reopened = make_cache(tmp_path)
+    assert reopened.get_cached_translation("Two", "en", "ar") == "اثنان"
+    assert reopened.get_cached_translation("One", "en", "ar") is None
+    reopened.close()
+
+def test_rebuild_keeps_existing_keys_visible(tmp_path, monkeypatch):
+    """Lookups during a rebuild still use the complete filters"""
+    cache = make_cache(tmp_path, memory_entries=0)
+    cache.save_translation("Hello", "مرحبا", "en", "ar")
+    
+    results = []
+    original_add = cache_module.PairBloomFilters.add
+    
+    def add(filters, pair, key):
+        if not results:
+            lookup = threading.Thread(
+                target=lambda: results.append(cache.get_cached_translation("Hello", "en", "ar")))
+            lookup.start()
+            lookup.join()
+        return original_add(filters, pair, key)
+    
+    monkeypatch.setattr(cache_module.PairBloomFilters, 'add', add)
+    assert cache.rebuild_bloom_filter()
+    assert results == ["مرحبا"]
+    assert cache.get_cached_translation("Hello", "en", "ar") == "مرحبا"
+    cache.close()
+
+def test_server_streams_export_and_import(tmp_path):
+    """Export and import files stay on the client; deletes need a local peer"""
+    server = CacheServer(make_cache(tmp_path), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = RemoteTranslationCache(*server.server_address)
+        for i in range(5):
+            client.save_translation(f"Line {i}", f"سطر {i}", "en", "ar")
+        
+        export_path = str(tmp_path / "export.jsonl")
+        assert client.export_entries(export_path, page_size=2)['entries'] == 5
+        assert client.clear_cache()
+        assert client.import_entries(export_path, batch_size=2)['entries'] == 5
+        assert client.get_many([f"Line {i}" for i in range(5)], "en", "ar")["Line 4"] == "سطر 4"
+        client.close()
+        
+        with pytest.raises(PermissionError):
+            server.dispatch({'op': 'clear'}, ('192.0.2.10', 50000))
+        assert server.cache.get_cache_stats()['total_translations'] == 5
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.cache.close()
+
+def test_import_conflicts_keep_present_values(tmp_path):
+    """Records without timestamps must not erase the stored ones"""
+    cache = make_cache(tmp_path)
+    cache.import_records([{'original_text': "Hello", 'translated_text': "مرحبا", 'source_lang': "en",
+                           'target_lang': "ar", 'engine': "google", 'created_at': "2024-01-01 00:00:00",
+                           'last_used': "2024-02-01 00:00:00", 'usage_count': 3}])
+    cache.import_records([{'original_text': "Hello", 'translated_text': "أهلاً", 'source_lang': "en",
+                           'target_lang': "ar", 'engine': "stub"}])
+    cache.import_records([{'original_text': "Hello", 'translated_text': "سلام", 'source_lang': "en",
+                           'target_lang': "ar", 'engine': "microsoft", 'created_at': "2023-06-01 00:00:00",
+                           'last_used': "2024-03-01 00:00:00", 'usage_count': 2}])
+    
+    row = cache._connect().execute('''
+        SELECT translated_text, engine, created_at, last_used, usage_count FROM translations
+    ''').fetchone()
+    assert row == ("سلام", "microsoft", "2023-06-01 00:00:00", "2024-03-01 00:00:00", 3)
+    cache.close()
+
+def test_migrates_baseline_cache(tmp_path):
+    db_path, count, (original, translated, source_lang, target_lang) = copy_baseline_db(tmp_path)
+    
+    cache = TranslationCache(db_path)
+    assert cache.get_cache_stats()['total_translations'] == count
+    assert cache.get_cached_translation(original, source_lang, target_lang) == translated
+    cache.close()
+    
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == cache_module.SCHEMA_VERSION
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'translations_v1'").fetchone() is None
+    conn.close()
+
+def test_migration_resumes_after_drop(tmp_path):
+    """A run that stopped between DROP and RENAME must not lose the copied rows"""
+    db_path, count, (original, translated, source_lang, target_lang) = copy_baseline_db(tmp_path)
+    
+    conn = sqlite3.connect(db_path)
+    conn.execute(cache_module.CREATE_TRANSLATIONS_TABLE.format(table='translations_v1'))
+    rows = conn.execute('''
+        SELECT text_hash, original_text, translated_text, source_lang, target_lang,
+               engine, created_at, last_used, usage_count
+        FROM translations
+    ''').fetchall()
+    conn.executemany('INSERT INTO translations_v1 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     [(bytes.fromhex(row[0]), *row[1:]) for row in rows])
+    conn.execute('DROP TABLE translations')
+    conn.commit()
+    conn.close()
+    
+    cache = TranslationCache(db_path)
+    assert cache.get_cache_stats()['total_translations'] == count
+    assert cache.get_cached_translation(original, source_lang, target_lang) == translated
+    cache.close()
+
+def test_server_requires_token_off_loopback(tmp_path):
+    """Every request must carry the configured token"""
+    with pytest.raises(ValueError):
+        CacheServer(None, '0.0.0.0', 0)
+    
+    server = CacheServer(make_cache(tmp_path), port=0, token="secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(PermissionError):
+            server.dispatch({'op': 'ping'}, ('127.0.0.1', 50000))
+        with pytest.raises(RuntimeError):
+            RemoteTranslationCache(*server.server_address, token="wrong")
+        
+        client = RemoteTranslationCache(*server.server_address, token="secret")
+        assert client.save_translation("Hello", "مرحبا", "en", "ar")
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.cache.close()
+
+def test_server_rejects_oversized_request(tmp_path, monkeypatch):
+    """An over-long request line gets an error and the connection is closed"""
+    monkeypatch.setattr(cache_server, 'MAX_LINE', 64)
+    server = CacheServer(make_cache(tmp_path), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.create_connection(server.server_address, timeout=5) as sock:
+            sock.sendall(b'{"op": "ping", "padding": "' + b'x' * 200 + b'"}\n')
+            reader = sock.makefile('rb')
+            assert b'longer than' in reader.readline()
+            assert reader.readline() == b''
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.cache.close()
+
+def test_import_fills_timestamps_and_skips_malformed(tmp_path):
+    """New rows without timestamps get the current time; bad records are counted, not fatal"""
+    cache = make_cache(tmp_path)
+    assert cache.import_records([
+        {'original_text': "Hi", 'translated_text': "مرحبا", 'source_lang': "en", 'target_lang': "ar",
+         'engine': "google"},
+        {'original_text': "Bye", 'source_lang': "en", 'target_lang': "ar", 'engine': "google"},
+        {'original_text': "Yes", 'translated_text': "نعم", 'source_lang': "en", 'target_lang': "ar",
+         'engine': "google", 'usage_count': "many"},
+        None,
+    ]) == (1, 3)
+    
+    created_at, last_used, usage_count = cache._connect().execute('''
+        SELECT created_at, last_used, usage_count FROM translations
+    ''').fetchone()
+    assert created_at and last_used and usage_count == 1
+    assert cache.clean_old_entries(days_old=1) == 0
+    cache.close()
+    
+    export_path = tmp_path / "export.jsonl"
+    export_path.write_text('{"original_text": "No", "translated_text": "لا", "source_lang": "en", '
+                           '"target_lang": "ar", "engine": "google"}\nnot json\n', encoding='utf-8')
+    cache = make_cache(tmp_path)
+    summary = cache.import_entries(str(export_path))
+    assert (summary['entries'], summary['skipped']) == (1, 1)
+    cache.close()
+
+def test_templates_never_replace_exact_rows(tmp_path):
+    """A normalized template is kept apart from the translation of its key text"""
+    cache = make_cache(tmp_path, normalize=True)
+    cache.save_translation("Hi", "أهلاً", "en", "ar")
+    cache.save_translation("<i>Hi</i>", "<i>مرحبا</i>", "en", "ar")
+    cache.close()
+    
+    cache = make_cache(tmp_path, normalize=True)
+    assert cache.get_cached_translation("Hi", "en", "ar") == "أهلاً"
+    assert cache.get_cached_translation("<b>Hi</b>", "en", "ar") == "<b>مرحبا</b>"
+    assert cache.get_many(["<u>Hi</u>"], "en", "ar") == {"<u>Hi</u>": "<u>مرحبا</u>"}
+    assert cache.get_cache_stats()['total_translations'] == 2
+    entries, _ = cache.export_page(None, 10)
+    assert sorted(entry['original_text'] for entry in entries) == ["<i>Hi</i>", "Hi"]
+    cache.close()
+
+def test_eviction_removes_least_recently_used_first(tmp_path):
+    """Victims come off the policy index in last_used order"""
+    cache = make_cache(tmp_path, max_size_mb=1024, eviction_interval=3600)
+    cache.import_records([{'original_text': f"Line {i:04d} " + "x" * 200, 'translated_text': f"سطر {i}",
+                           'source_lang': "en", 'target_lang': "ar", 'engine': "stub",
+                           'last_used': f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}"}
+                          for i in range(2000)])
+    
+    conn = cache._connect()
+    plan = ' '.join(row[-1] for row in conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT text_hash, last_used FROM translations "
+        f"ORDER BY {cache_module.EVICTION_ORDER['lru']} LIMIT 10"))
+    assert 'TEMP B-TREE' not in plan
+    
+    cache.max_size_bytes = cache._live_size(conn.cursor()) // 2
+    removed = cache.enforce_size_limit()
+    assert 0 < removed < 2000
+    
+    survivors = [row[0] for row in conn.execute('SELECT last_used FROM translations')]
+    assert len(survivors) == 2000 - removed
+    assert min(survivors) == f"2024-01-01 00:{removed // 60 % 60:02d}:{removed % 60:02d}"
+    cache.close()
+
+def test_stats_counters_follow_insert_delete_and_clear(tmp_path):
+    """Trigger-maintained counters match the table, and clear bumps the generation once"""
+    cache = make_cache(tmp_path, max_size_mb=1024, eviction_interval=3600)
+    for text in ("One", "Two", "Three"):
+        cache.save_translation(text, f"[{text}]", "en", "ar")
+    cache.import_records([{'original_text': "Old", 'translated_text': "قديم", 'source_lang': "en",
+                           'target_lang': "fr", 'engine': "stub", 'last_used': "2000-01-01 00:00:00"}])
+    cache.get_many(["One", "Two"], "en", "ar")
+    
+    stats = cache.get_cache_stats()
+    assert (stats['total_translations'], stats['total_usage']) == (4, 6)
+    assert stats['language_stats'] == [("ar", 3), ("fr", 1)]
+    
+    assert cache.clean_old_entries(days_old=30) == 1
+    assert cache.get_cache_stats()['language_stats'] == [("ar", 3)]
+    
+    conn = cache._connect()
+    generation = cache._read_generation(conn.cursor())
+    dependents = conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'translations' ORDER BY name").fetchall()
+    assert cache.clear_cache()
+    assert cache._read_generation(conn.cursor()) == generation + 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'translations' ORDER BY name").fetchall() \
+        == dependents
+    assert cache.get_cache_stats()['total_translations'] == 0
+    
+    cache.save_translation("Four", "أربعة", "en", "ar")
+    assert cache.get_cache_stats()['language_stats'] == [("ar", 1)]
+    assert cache.get_cached_translation("One", "en", "ar") is None
+    cache.close()
+
+def test_one_wal_connection_per_thread(tmp_path):
+    """Each thread keeps its own long-lived connection; close releases them all"""
+    cache = make_cache(tmp_path)
+    conn = cache._connect()
+    assert cache._connect() is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    
+    others = []
+    worker = threading.Thread(target=lambda: others.append(cache._connect()))
+    worker.start()
+    worker.join()
+    assert others[0] is not conn
+    
+    # اتصال الخيط المنتهي يُغلق عند فتح اتصال جديد
+    worker = threading.Thread(target=cache._connect)
+    worker.start()
+    worker.join()
+    assert others[0] not in cache._connections.values()
+    
+    cache.close()
+    assert cache._connections == {}
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+
+def test_get_many_returns_hits_across_chunks(tmp_path):
+    """Bulk lookup spans several IN chunks, skips misses and counts every repeat as a use"""
+    cache = make_cache(tmp_path, memory_entries=0)
+    for i in range(5):
+        cache.save_translation(f"Line {i}", f"سطر {i}", "en", "ar")
+    
+    texts = ["Line 0", "Line 3", "Missing", "Line 0", "  ", "Line 4"]
+    assert cache.get_many(texts, "en", "ar", chunk_size=2) == {"Line 0": "سطر 0", "Line 3": "سطر 3",
+                                                               "Line 4": "سطر 4"}
+    assert cache.get_many(["Line 1"], "en", "fr") == {}
+    
+    assert cache.get_cache_stats()['total_usage'] == 5 + 4
+    cache.close()
+
+def test_write_behind_buffers_until_batch_is_full(tmp_path):
+    """Buffered translations are visible at once and written in one batch"""
+    cache = make_cache(tmp_path, write_batch_size=3, flush_interval_ms=60000)
+    db = sqlite3.connect(str(tmp_path / "cache.db"))
+    
+    def stored():
+        return db.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+    
+    cache.save_translation("One", "واحد", "en", "ar")
+    cache.save_translation("Two", "اثنان", "en", "ar")
+    assert stored() == 0
+    cache.memory.clear()
+    assert cache.get_many(["One", "Two"], "en", "ar") == {"One": "واحد", "Two": "اثنان"}
+    
+    cache.save_translation("Three", "ثلاثة", "en", "ar")
+    assert stored() == 3 and cache._pending == {}
+    
+    cache.save_translation("Four", "أربعة", "en", "ar")
+    cache.close()
+    assert stored() == 4
+    db.close()
+
+def test_memory_lru_evicts_by_count_and_size():
+    """The least recently used entries go first, by entry count and by bytes"""
+    counted = Counter()
+    memory = cache_module.MemoryLRU(max_entries=2, max_bytes=100,
+                                    stats_callback=lambda key, amount=1: counted.update({key: amount}))
+    memory.put(b"a", "1")
+    memory.put(b"b", "2")
+    assert memory.get(b"a") == "1"
+    memory.put(b"c", "3")
+    assert memory.get(b"b") is None and memory.get(b"a") == "1"
+    
+    memory.put(b"d", "x" * 98)
+    assert memory.get(b"a") is None and memory.get(b"c") is None
+    memory.put(b"e", "y" * 200)
+    assert memory.get(b"e") is None and memory.get(b"d") == "x" * 98
+    
+    assert memory.get_stats()['entries'] == 1
+    assert counted == {'memory_cache_hits': 3, 'memory_cache_misses': 4, 'memory_cache_evictions': 3}
+
+def test_memory_tier_answers_without_sqlite(tmp_path):
+    """A phrase seen in this session is served from memory, not the file"""
+    cache = make_cache(tmp_path)
+    cache.save_translation("Hello", "مرحبا", "en", "ar")
+    
+    db = sqlite3.connect(str(tmp_path / "cache.db"))
+    db.execute('DELETE FROM translations')
+    db.commit()
+    db.close()
+    assert cache.get_cached_translation("Hello", "en", "ar") == "مرحبا"
+    cache.close()
+
+def test_usage_is_aggregated_until_flush(tmp_path):
+    """Hits only touch memory; one flush applies their sum"""
+    cache = make_cache(tmp_path, usage_flush_interval_ms=60000, flush_interval_ms=60000)
+    cache.save_translation("Hello", "مرحبا", "en", "ar")
+    for _ in range(3):
+        assert cache.get_cached_translation("Hello", "en", "ar") == "مرحبا"
+    
+    db = sqlite3.connect(str(tmp_path / "cache.db"))
+    assert db.execute('SELECT usage_count FROM translations').fetchone()[0] == 1
+    assert cache.flush()
+    assert db.execute('SELECT usage_count FROM translations').fetchone()[0] == 4
+    assert cache._usage == {}
+    db.close()
+    cache.close()
+
+def test_upgrades_v1_schema_in_place(tmp_path):
+    """A compact v1 file gains counters, the generation table and templates without a copy"""
+    db_path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(cache_module.CREATE_TRANSLATIONS_TABLE.format(table='translations'))
+    conn.executemany('''
+        INSERT INTO translations (text_hash, original_text, translated_text, source_lang, target_lang,
+                                  engine, usage_count)
+        VALUES (?, ?, ?, ?, ?, 'google', ?)
+    ''', [(hashlib.md5(f"{text}|en|{lang}".encode('utf-8')).digest(), text, f"[{lang}] {text}",
+           "en", lang, usage) for text, lang, usage in [("One", "ar", 2), ("Two", "ar", 1), ("One", "fr", 5)]])
+    conn.execute('PRAGMA user_version = 1')
+    conn.commit()
+    conn.close()
+    
+    cache = TranslationCache(db_path, write_batch_size=1)
+    stats = cache.get_cache_stats()
+    assert (stats['total_translations'], stats['total_usage']) == (3, 8)
+    assert stats['language_stats'] == [("ar", 2), ("fr", 1)]
+    assert cache.get_cached_translation("One", "en", "fr") == "[fr] One"
+    cache.save_translation("Three", "[ar] Three", "en", "ar")
+    assert cache.get_cache_stats()['total_translations'] == 4
+    cache.close()
+    
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == cache_module.SCHEMA_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'translations', 'cache_stats', 'cache_generation', 'translation_templates'} <= tables
+    assert conn.execute('SELECT generation FROM cache_generation').fetchone()[0] == 1
+    conn.close()
+
+def test_bloom_has_no_false_negatives_across_generation_bump(tmp_path):
+    """Keys written by another instance are found before and after the background rebuild"""
+    reader = make_cache(tmp_path, memory_entries=0)
+    assert reader.get_cached_translation("Line 0", "en", "ar") is None
+    
+    writer = make_cache(tmp_path, write_batch_size=500)
+    for i in range(300):
+        writer.save_translation(f"Line {i}", f"سطر {i}", "en", "ar")
+    writer.close()
+    
+    texts = [f"Line {i}" for i in range(300)]
+    assert len(reader.get_many(texts, "en", "ar")) == 300
+    if reader._bloom_rebuilder is not None:
+        reader._bloom_rebuilder.join()
+    assert reader._bloom_is_current()
+    assert all(reader.get_cached_translation(text, "en", "ar") for text in texts)
+    assert reader.get_cached_translation("Line 300", "en", "ar") is None
+    reader.close()
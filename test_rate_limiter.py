@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات محدد معدل الطلبات
+Tests for the adaptive token-bucket rate limiter
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rate_limiter
+from rate_limiter import TokenBucketRateLimiter, get_rate_limiter, is_throttling_error
+
+def test_shared_limiter_follows_config_changes(monkeypatch):
+    monkeypatch.setattr(rate_limiter, '_limiters', {})
+    first = get_rate_limiter('stub', {'delay_between_requests': 0.5, 'rate_limit_max': 20.0})
+    assert first.rate == 2.0
+    
+    second = get_rate_limiter('stub', {'delay_between_requests': 0.1, 'rate_limit_max': 5.0,
+                                       'adaptive_rate_limit': False})
+    assert second is first
+    assert (second.rate, second.max_rate, second.adaptive) == (5.0, 5.0, False)
+    assert get_rate_limiter('google', {}) is not first
+
+def test_throttle_halves_rate_down_to_floor():
+    limiter = TokenBucketRateLimiter(rate=8.0, min_rate=1.5, max_rate=10.0)
+    limiter.on_throttle()
+    assert limiter.rate == 4.0
+    
+    # رفض متزامن من نفس الموجة لا يخفض المعدل مرة أخرى
+    limiter.on_throttle()
+    assert limiter.rate == 4.0
+    
+    for _ in range(3):
+        limiter._last_decrease -= 1.0
+        limiter.on_throttle()
+    assert limiter.rate == 1.5
+
+def test_success_recovers_rate_once_per_second_up_to_cap():
+    limiter = TokenBucketRateLimiter(rate=2.0, max_rate=3.0, increase_step=0.5)
+    limiter.on_success()
+    assert limiter.rate == 2.0
+    
+    for _ in range(4):
+        limiter._last_increase -= 1.0
+        limiter.on_success()
+    assert limiter.rate == 3.0
+
+def test_fixed_rate_ignores_feedback_but_honours_retry_after():
+    limiter = TokenBucketRateLimiter(rate=5.0, adaptive=False)
+    limiter.on_throttle(retry_after=30)
+    limiter._last_increase -= 1.0
+    limiter.on_success()
+    assert limiter.rate == 5.0
+    assert limiter.reserve() > 29
+
+def test_reserve_waits_once_the_burst_is_spent():
+    limiter = TokenBucketRateLimiter(rate=2.0, burst=2)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    assert 0.4 < limiter.reserve() <= 0.5
+
+def test_throttling_errors_are_recognised():
+    class TooManyRequests(Exception):
+        pass
+    
+    assert is_throttling_error(TooManyRequests())
+    assert is_throttling_error(RuntimeError("HTTP 429 from server"))
+    assert not is_throttling_error(RuntimeError("connection reset"))
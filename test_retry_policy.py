@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات سياسة إعادة المحاولة
+Tests for backoff jitter, Retry-After hints and the retry budget
+"""
+
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import retry_policy
+from retry_policy import RetryBudget, decorrelated_jitter, get_retry_after, get_retry_budget
+
+def test_jitter_stays_between_base_and_cap():
+    random.seed(7)
+    backoff = 0.5
+    for _ in range(200):
+        backoff = decorrelated_jitter(backoff, 0.5, 4.0)
+        assert 0.5 <= backoff <= 4.0
+
+def test_retry_after_from_attribute_and_headers():
+    assert get_retry_after(SimpleNamespace(retry_after=3)) == 3.0
+    response = SimpleNamespace(headers={'Retry-After': "12"})
+    assert get_retry_after(SimpleNamespace(response=response)) == 12.0
+    assert get_retry_after(SimpleNamespace(retry_after="soon")) is None
+    assert get_retry_after(ValueError("boom")) is None
+
+def test_retry_after_is_capped():
+    error = SimpleNamespace(retry_after=86400)
+    assert get_retry_after(error, max_delay=30.0) == 30.0
+    assert get_retry_after(SimpleNamespace(retry_after=2), max_delay=30.0) == 2.0
+
+def test_budget_is_exhausted_then_scales_with_requests():
+    budget = RetryBudget(ratio=0.5, window=60, min_retries=2)
+    assert budget.try_acquire_retry()
+    assert budget.try_acquire_retry()
+    assert not budget.try_acquire_retry()
+    
+    for _ in range(6):
+        budget.record_request()
+    assert budget.try_acquire_retry()
+    assert not budget.try_acquire_retry()
+
+def test_shared_budget_follows_config_changes(monkeypatch):
+    monkeypatch.setattr(retry_policy, '_budget', None)
+    first = get_retry_budget({'retry_budget_min_retries': 1})
+    assert first.try_acquire_retry()
+    assert not first.try_acquire_retry()
+    
+    second = get_retry_budget({'retry_budget_min_retries': 3})
+    assert second is first and second.min_retries == 3
+    assert second.try_acquire_retry()
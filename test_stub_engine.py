@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات المحرك الوهمي ومسارات الترجمة دون اتصال
+Offline tests for the stub engine and the translation pipeline
+"""
+
+import json
+import os
+import sys
+import time
+
+import pytest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_engine import StubTranslator, StubThrottledError, StubEngineError
+
+def make_translator(tmp_path, **settings):
+    """SubtitleTranslator on the stub engine with a private config file"""
+    pytest.importorskip("deep_translator")
+    from translate_subtitles import SubtitleTranslator
+    
+    stub_settings = {"latency_ms": 0, "seed": 1}
+    stub_settings.update(settings.pop('stub_engine', {}))
+    config = {
+        "translation_engine": "stub",
+        "cache_enabled": False,
+        "create_backup": False,
+        "delay_between_requests": 0,
+        "rate_limit_max": 10000,
+        "stub_engine": stub_settings
+    }
+    config.update(settings)
+    
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps(config), encoding='utf-8')
+    return SubtitleTranslator(str(config_file))
+
+def test_stub_is_deterministic():
+    stub = StubTranslator(target='ar', latency_ms=0)
+    assert stub.translate("Hello world") == "[ar] olleH dlrow"
+    assert stub.translate("Hello world") == stub.translate("Hello world")
+    assert stub.translate("123 ...") == "123 ..."
+    assert stub.requests == 4
+
+def test_stub_failure_injection():
+    stub = StubTranslator(latency_ms=0, throttle_rate=1.0, retry_after=2.5)
+    with pytest.raises(StubThrottledError) as error:
+        stub.translate("Hello")
+    assert error.value.retry_after == 2.5
+    
+    stub = StubTranslator(latency_ms=0, error_rate=1.0)
+    with pytest.raises(StubEngineError):
+        stub.translate("Hello")
+
+def test_stub_max_batch_size_merges_segments():
+    stub = StubTranslator(latency_ms=0, max_batch_size=2, batch_separator="\n|||\n")
+    result = stub.translate("one\n|||\ntwo\n|||\nthree")
+    assert result.count("|||") == 1
+
+def test_translate_many_keeps_order(tmp_path):
+    translator = make_translator(tmp_path, max_workers=4)
+    texts = [f"Line {i}" for i in range(50)] + ["Line 0"]
+    results = translator.translate_many(texts, 'ar')
+    assert results == [f"[ar] eniL {i}" for i in range(50)] + ["[ar] eniL 0"]
+    assert translator.session_stats['duplicate_cues'] == 1
+
+def test_batch_fallback_on_split_mismatch(tmp_path):
+    translator = make_translator(tmp_path, batch_translation=True, batch_size=10,
+                                 stub_engine={"max_batch_size": 3})
+    texts = [f"Line {i}" for i in range(10)]
+    results = translator.translate_many(texts, 'ar')
+    assert results == [f"[ar] eniL {i}" for i in range(10)]
+    assert translator.session_stats['batch_fallbacks'] == 1
+
+def test_unusable_secondary_engine_is_skipped(tmp_path):
+    translator = make_translator(tmp_path, secondary_engine="broken", hedging_enabled=True)
+    factory = translator.engine_pool.factory
+    
+    def create(engine, source_lang, target_lang):
+        if engine == "broken":
+            raise ValueError("missing api_key")
+        return factory(engine, source_lang, target_lang)
+    
+    translator.engine_pool.factory = create
+    assert translator.translate_text("Hello", 'ar') == "[ar] olleH"
+    assert "broken" not in translator.session_stats['breaker_states']
+    assert translator.session_stats['failovers'] == 0
+
+def test_async_translate_text_uses_breaker(tmp_path):
+    import asyncio
+    
+    translator = make_translator(tmp_path, max_retries=1, breaker_failure_threshold=2,
+                                 stub_engine={"error_rate": 1.0})
+    from async_translator import AsyncSubtitleTranslator
+    async_translator = AsyncSubtitleTranslator(translator)
+    
+    async def run():
+        results = [await async_translator.translate_text(f"Line {i}", 'ar') for i in range(5)]
+        await async_translator.close()
+        return results
+    
+    assert asyncio.run(run()) == [f"Line {i}" for i in range(5)]
+    assert translator.session_stats['breaker_states']['stub'] == 'open'
+    assert translator.session_stats['translation_errors'] == 5
+
+def test_stream_reuses_repeats_across_chunks(tmp_path):
+    translator = make_translator(tmp_path, stream_chunk_size=2)
+    input_path = tmp_path / "repeats.srt"
+    input_path.write_text("".join(f"{i}\n00:00:0{i},000 --> 00:00:0{i},500\n{text}\n\n"
+                                  for i, text in enumerate(["Hi", "Bye", "Hi", "Bye", "Hi"], 1)),
+                          encoding='utf-8')
+    output_path = translator.translate_srt_file(str(input_path), str(tmp_path / "out.srt"), 'ar')
+    
+    assert [cue['text'] for cue in translator.parse_srt_file(output_path)] == \
+        ["[ar] iH", "[ar] eyB", "[ar] iH", "[ar] eyB", "[ar] iH"]
+    assert translator.session_stats['unique_texts'] == 2
+    assert translator.session_stats['duplicate_cues'] == 3
+
+def test_translate_many_plans_on_classifier_bodies(tmp_path):
+    from cache import TranslationCache
+    
+    translator = make_translator(tmp_path)
+    translator.cache = TranslationCache(str(tmp_path / "cache.db"), write_batch_size=1)
+    translator.cache.save_translation("Hi there", "مرحبا", "en", "ar")
+    
+    results = translator.translate_many(["JOHN: Hi there", "♪ Hi there ♪", "Hi there", "12:30"], 'ar')
+    assert results == ["JOHN: مرحبا", "♪ مرحبا ♪", "مرحبا", "12:30"]
+    assert translator.session_stats['cache_hits'] == 1
+    assert translator.session_stats['unique_texts'] == 1
+    assert translator.session_stats['skipped_cues'] == 1
+    translator.cache.close()
+
+def test_find_srt_files_skips_outputs(tmp_path):
+    translator = make_translator(tmp_path, output_suffix="_translated")
+    for name in ["movie.srt", "movie_translated.srt", "movie_translated.fr.srt",
+                 "movie_translated.zh-CN.srt", "old_arabic.srt"]:
+        (tmp_path / name).write_text("", encoding='utf-8')
+    
+    assert [os.path.basename(f) for f in translator.find_srt_files(str(tmp_path))] == ["movie.srt"]
+    assert translator._output_path(str(tmp_path / "movie.srt"), "fr") == str(tmp_path / "movie_translated.fr.srt")
+
+def test_translate_subtitles_keeps_list_api(tmp_path):
+    translator = make_translator(tmp_path)
+    subtitles = [{'number': '1', 'timestamp': "00:00:01,000 --> 00:00:02,000", 'text': "Hi"},
+                 {'number': '2', 'timestamp': "00:00:03,000 --> 00:00:04,000", 'text': "Hi"}]
+    
+    assert translator.translate_subtitles(subtitles, 'ar') == [
+        {'number': '1', 'timestamp': "00:00:01,000 --> 00:00:02,000", 'text': "[ar] iH"},
+        {'number': '2', 'timestamp': "00:00:03,000 --> 00:00:04,000", 'text': "[ar] iH"}]
+    assert translator.session_stats['unique_texts'] == 1
+
+def test_hedger_latency_excludes_rate_limiter_wait(tmp_path, monkeypatch):
+    translator = make_translator(tmp_path, hedging_enabled=True)
+    import translate_subtitles
+    
+    class SlowLimiter:
+        def acquire(self):
+            time.sleep(0.2)
+        
+        def on_success(self):
+            pass
+        
+        def on_throttle(self, retry_after=None):
+            pass
+    
+    monkeypatch.setattr(translate_subtitles, 'get_rate_limiter', lambda engine, config: SlowLimiter())
+    assert translator.translate_text("Hello", 'ar') == "[ar] olleH"
+    assert translator.hedger.trackers['stub'].percentile(100) < 0.1
+
+def test_async_translate_many_uses_bulk_cache_and_flushes(tmp_path):
+    import asyncio
+    from cache import TranslationCache
+    
+    translator = make_translator(tmp_path)
+    translator.cache = TranslationCache(str(tmp_path / "cache.db"), write_batch_size=1000)
+    translator.cache.save_translation("Hi there", "مرحبا", "en", "ar")
+    from async_translator import AsyncSubtitleTranslator
+    async_translator = AsyncSubtitleTranslator(translator)
+    
+    async def run():
+        results = await async_translator.translate_many(["JOHN: Hi there", "♪ Hi there ♪", "Bye", "12:30"], 'ar')
+        await async_translator.close()
+        return results
+    
+    assert asyncio.run(run()) == ["JOHN: مرحبا", "♪ مرحبا ♪", "[ar] eyB", "12:30"]
+    assert translator.session_stats['cache_hits'] == 1
+    assert translator.session_stats['unique_texts'] == 2
+    assert translator.session_stats['skipped_cues'] == 1
+    
+    # الترجمة الجديدة كُتبت قبل إغلاق المترجم غير المتزامن
+    assert translator.cache._pending == {}
+    reopened = TranslationCache(str(tmp_path / "cache.db"))
+    assert reopened.get_cached_translation("Bye", "en", "ar") == "[ar] eyB"
+    reopened.close()
+    translator.cache.close()
+
+def test_sentence_granularity_reuses_lines_across_cues(tmp_path):
+    translator = make_translator(tmp_path, cache_granularity="sentence")
+    results = translator.translate_many(["Hi. Go!", "- Go!\n- Hi."], 'ar')
+    assert results == ["[ar] iH. [ar] oG!", "- [ar] oG!\n- [ar] iH."]
+    assert translator.session_stats['cue_segments'] == 4
+    assert translator.session_stats['unique_texts'] == 2
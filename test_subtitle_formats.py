@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات معالج تنسيقات الترجمة
+Tests for streaming subtitle parsing and writing
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from subtitle_formats import SubtitleFormatHandler
+
+SRT = ("\ufeff1\n00:00:01,000 --> 00:00:02,000\nHello\nthere\n\n\n"
+       "not a cue\n\n"
+       "2\n00:00:03,000 --> 00:00:04,500\nBye\n")
+
+def test_srt_is_parsed_lazily_block_by_block(tmp_path):
+    path = tmp_path / "in.srt"
+    path.write_text(SRT, encoding='utf-8')
+    handler = SubtitleFormatHandler()
+    
+    cues = handler.iter_srt(str(path))
+    assert next(cues) == {'number': 1, 'timestamp': "00:00:01,000 --> 00:00:02,000",
+                          'text': "Hello\nthere", 'format': 'srt'}
+    assert [cue['text'] for cue in cues] == ["Bye"]
+
+def test_srt_round_trip(tmp_path):
+    path = tmp_path / "in.srt"
+    path.write_text(SRT, encoding='utf-8')
+    handler = SubtitleFormatHandler()
+    cues = handler.parse_srt(str(path))
+    
+    handler.save_srt(cues, str(tmp_path / "out.srt"))
+    assert handler.parse_srt(str(tmp_path / "out.srt")) == cues
+
+def test_vtt_and_ass_round_trip_through_srt_timestamps(tmp_path):
+    path = tmp_path / "in.vtt"
+    path.write_text("WEBVTT\n\nintro\n00:00:01.000 --> 00:00:02.500\n<i>Hi</i>\n\n"
+                    "00:00:03.000 --> 00:00:04.000\nBye\n", encoding='utf-8')
+    handler = SubtitleFormatHandler()
+    cues = list(handler.iter_file(str(path)))
+    assert [(cue['timestamp'], cue['text']) for cue in cues] == [
+        ("00:00:01,000 --> 00:00:02,500", "Hi"), ("00:00:03,000 --> 00:00:04,000", "Bye")]
+    
+    for ext in ('.vtt', '.ass'):
+        output_path = str(tmp_path / f"out{ext}")
+        with handler.open_writer(output_path) as writer:
+            writer.write_all(cues)
+        assert writer.count == 2
+        assert [(cue['timestamp'], cue['text']) for cue in handler.parse_file(output_path)] == \
+            [(cue['timestamp'], cue['text']) for cue in cues]
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات مصنف النصوص غير القابلة للترجمة
+Tests for the untranslatable text classifier
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from text_classifier import TextClassifier, create_text_classifier
+
+def test_categories():
+    classifier = TextClassifier()
+    assert classifier.classify("♪") == 'skip'
+    assert classifier.classify("12:30 PM") == 'timestamps'
+    assert classifier.classify("00:01:02,500 --> 00:01:04,000") == 'timestamps'
+    assert classifier.classify(" 1,250 ") == 'numbers'
+    assert classifier.classify("https://example.com/page") == 'urls'
+    assert classifier.classify("?!…") == 'symbols'
+    assert classifier.classify("JOHN:") == 'speaker_tags'
+    assert classifier.classify("Hello there.") is None
+    assert classifier.classify("Room 12") is None
+
+def test_split_peels_speaker_tags_and_music_notes():
+    classifier = TextClassifier()
+    assert classifier.split("JOHN: Hi there") == ("JOHN: ", "Hi there", "")
+    assert classifier.split("♪ La la love ♪") == ("♪ ", "La la love", " ♪")
+    assert classifier.split("♪ MARY: Sing ♪") == ("♪ MARY: ", "Sing", " ♪")
+    assert classifier.split("JOHN: 42") == ("", "", "")
+    assert classifier.split("Hi there") == ("", "Hi there", "")
+
+def test_config_selects_categories_and_extra_patterns():
+    classifier = create_text_classifier({'untranslatable_categories': ['urls'],
+                                         'untranslatable_patterns': [r'SCENE \d+']})
+    assert classifier.classify("SCENE 4") == 'custom'
+    assert classifier.classify("12:30") is None
+    assert classifier.split("JOHN: Hi") == ("", "JOHN: Hi", "")
+    
+    disabled = create_text_classifier({'skip_untranslatable': False})
+    assert disabled.classify("12:30") is None
+    assert disabled.classify("...") == 'skip'
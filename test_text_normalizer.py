@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبارات توحيد النصوص
+Tests for cache key canonicalization and sentence segmentation
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from text_normalizer import canonicalize, join_segments, make_template, restore, split_segments
+
+def test_canonical_key_drops_tags_spacing_and_numbers():
+    canonical = canonicalize("<i>Wait  5 minutes ,  then 10 more.</i>")
+    assert canonical.key_text == "Wait ⟦0⟧ minutes, then ⟦1⟧ more."
+    assert (canonical.prefix, canonical.suffix, canonical.numbers) == ("<i>", "</i>", ["5", "10"])
+    assert canonicalize("Hello there.") is None
+
+def test_template_restores_other_tags_and_numbers():
+    canonical = canonicalize("<i>Wait 5 minutes, then 10 more.</i>")
+    template = make_template("<i>انتظر 5 دقائق، ثم 10 أخرى.</i>", canonical)
+    assert template == "انتظر ⟦0⟧ دقائق، ثم ⟦1⟧ أخرى."
+    
+    other = canonicalize("<b>Wait 2 minutes, then 30 more.</b>")
+    assert other.key_text == canonical.key_text
+    assert restore(template, other) == "<b>انتظر 2 دقائق، ثم 30 أخرى.</b>"
+
+def test_unsafe_translations_are_not_templated():
+    canonical = canonicalize("<i>Room 12</i>")
+    assert make_template("غرفة 12", canonical) is None
+    assert make_template("<i>غرفة 13</i>", canonical) is None
+    
+    # أرقام مكررة تبقى كما هي في المفتاح
+    assert canonicalize("<i>7 by 7</i>").key_text == "7 by 7"
+    assert restore("⟦0⟧ و ⟦1⟧", canonicalize("<i>Room 12</i>")) is None
+
+def test_segments_split_on_lines_and_sentences():
+    text = "- Hi. How are you?\n<i>- Mr. Smith said no!</i>"
+    segments, layout = split_segments(text)
+    assert segments == ["Hi.", "How are you?", "Mr. Smith said no!"]
+    assert join_segments(segments, layout) == text
+    assert join_segments(["مرحبا.", "كيف حالك؟", "قال السيد سميث لا!"], layout) == \
+        "- مرحبا. كيف حالك؟\n<i>- قال السيد سميث لا!</i>"
+
+def test_segments_keep_lines_without_text():
+    text = "♪\nWait... what?"
+    segments, layout = split_segments(text)
+    assert segments == ["♪", "Wait... what?"]
+    assert join_segments(segments, layout) == text
+    assert split_segments("<i></i>") == ([], ["<i></i>"])
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تصنيف النصوص التي لا تحتاج إلى ترجمة
+Fast classifier for untranslatable cue text: numbers, timestamps, URLs,
+symbols/emoji, speaker tags and music-note lyric markers
+"""
+
+import re
+
+# نصوص لا تحتاج إلى ترجمة
+SKIP_TEXTS = ['', '-', '--', '...', '♪', '♫']
+
+# أنماط النصوص التي تمر كما هي
+UNTRANSLATABLE_PATTERNS = {
+    'timestamps': r'\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d{1,3})?(?:\s*[AaPp]\.?[Mm]\.?)?'
+                  r'(?:\s*(?:-->|-|–)\s*\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d{1,3})?(?:\s*[AaPp]\.?[Mm]\.?)?)?',
+    'numbers': r'[-+#]?\d[\d\s.,:/%+\-]*',
+    'urls': r'(?:https?://|www\.)\S+|[\w.+-]+@[\w-]+\.[\w.-]+',
+    # لا حروف ولا أرقام: علامات ترقيم، رموز موسيقية، إيموجي
+    'symbols': r'[\W_]+',
+    'speaker_tags': r'[A-Z][A-Z0-9 .\'-]*:|\[[^\[\]]+\]:|\([^()]+\):',
+}
+
+# أجزاء تحيط بالنص القابل للترجمة وتبقى كما هي
+SPEAKER_TAG = re.compile(r'^\s*(?:[A-Z][A-Z0-9 .\'-]*|\[[^\[\]]+\]|\([^()]+\)):\s+')
+MUSIC_PREFIX = re.compile(r'^\s*[♪♫]+\s*')
+MUSIC_SUFFIX = re.compile(r'\s*[♪♫]+\s*$')
+
+DEFAULT_CATEGORIES = ('timestamps', 'numbers', 'urls', 'symbols', 'speaker_tags', 'music')
+
+class TextClassifier:
+    """مصنف النصوص غير القابلة للترجمة
+    
+    All enabled patterns are compiled once into a single anchored regex,
+    so a cue is classified with one match call. split() also peels a
+    leading speaker tag ("JOHN: ...") and wrapping music notes off a
+    translatable cue, so only the text in between goes to the engine.
+    """
+    
+    def __init__(self, categories=DEFAULT_CATEGORIES, extra_patterns=None):
+        self.categories = set(categories)
+        patterns = [f'(?P<{name}>{pattern})' for name, pattern in UNTRANSLATABLE_PATTERNS.items()
+                    if name in self.categories]
+        patterns.extend(f'(?:{pattern})' for pattern in extra_patterns or [])
+        self._pattern = re.compile(rf"\s*(?:{'|'.join(patterns)})\s*") if patterns else None
+        self._skip_texts = set(SKIP_TEXTS)
+    
+    def classify(self, text):
+        """اسم فئة النص إذا كان لا يحتاج إلى ترجمة، وإلا None"""
+        stripped = text.strip()
+        if stripped in self._skip_texts:
+            return 'skip'
+        if self._pattern is None:
+            return None
+        match = self._pattern.fullmatch(stripped)
+        if match is None:
+            return None
+        return match.lastgroup or 'custom'
+    
+    def split(self, text):
+        """تقسيم النص إلى (بادئة، الجزء القابل للترجمة، لاحقة)
+        
+        The translatable part is '' when the whole text should pass through
+        unchanged.
+        """
+        if self.classify(text):
+            return '', '', ''
+        
+        prefix = ''
+        suffix = ''
+        body = text
+        if 'music' in self.categories:
+            match = MUSIC_PREFIX.match(body)
+            if match:
+                prefix, body = match.group(0), body[match.end():]
+            match = MUSIC_SUFFIX.search(body)
+            if match:
+                body, suffix = body[:match.start()], match.group(0)
+        if 'speaker_tags' in self.categories:
+            match = SPEAKER_TAG.match(body)
+            if match:
+                prefix, body = prefix + match.group(0), body[match.end():]
+        
+        if (prefix or suffix) and self.classify(body):
+            return '', '', ''
+        return prefix, body, suffix
+
+def create_text_classifier(config):
+    """إنشاء المصنف من الإعدادات، أو مصنف SKIP_TEXTS فقط إذا كان التصنيف معطلاً"""
+    if not config.get('skip_untranslatable', True):
+        return TextClassifier(categories=())
+    return TextClassifier(config.get('untranslatable_categories', list(DEFAULT_CATEGORIES)),
+                          config.get('untranslatable_patterns', []))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+توحيد النصوص قبل البحث في الذاكرة المؤقتة
+Cache key canonicalization: wrapping tags, whitespace and number templating
+"""
+
+import re
+
+# وسوم HTML (<i>, <font ...>) وكتل تنسيق ASS ({\an8})
+TAG = r'(?:<[^<>]+>|\{\\[^{}]*\})'
+LEADING_TAGS = re.compile(rf'^(?:{TAG}\s*)+')
+TRAILING_TAGS = re.compile(rf'(?:\s*{TAG})+$')
+NUMBER_PATTERN = re.compile(r'\d+(?:[.,:]\d+)*')
+SPACE_BEFORE_PUNCTUATION = re.compile(r'[ \t]+([!?.,;:])')
+
+# علامة موضع الرقم في النص الموحد والترجمة المخزنة
+PLACEHOLDER = '⟦{}⟧'
+PLACEHOLDER_PATTERN = re.compile(r'⟦(\d+)⟧')
+
+# ما يسبق النص في السطر (وسوم، شرطة الحوار) ويتبعه، ونهايات الجمل داخل السطر
+LINE_PREFIX = re.compile(rf'^\s*(?:{TAG}\s*)*(?:[-‐–—]+\s*)?(?:{TAG}\s*)*')
+LINE_SUFFIX = re.compile(rf'(?:\s*{TAG})*\s*$')
+SENTENCE_BREAK = re.compile(r'[.!?…]+["\'”’»)\]]*(\s+)')
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'st', 'jr', 'sr', 'vs', 'etc', 'prof', 'lt', 'sgt', 'capt', 'col', 'gen'}
+
+class CanonicalText:
+    """نص موحد مع ما يلزم لاستعادة الترجمة الأصلية
+    
+    key_text is the text used as the cache key: wrapping tags removed,
+    whitespace collapsed and every number replaced by a placeholder. prefix,
+    suffix and numbers are what was taken out, in order.
+    """
+    
+    def __init__(self, key_text, prefix='', suffix='', numbers=None):
+        self.key_text = key_text
+        self.prefix = prefix
+        self.suffix = suffix
+        self.numbers = numbers or []
+
+def normalize_whitespace(text):
+    """دمج المسافات في كل سطر وحذف المسافة قبل علامات الترقيم"""
+    lines = (' '.join(line.split()) for line in text.strip().split('\n'))
+    return SPACE_BEFORE_PUNCTUATION.sub(r'\1', '\n'.join(line for line in lines if line))
+
+def canonicalize(text):
+    """توحيد النص، ويرجع None إذا لم يتغير شيء"""
+    stripped = text.strip()
+    body = stripped
+    
+    prefix = ''
+    match = LEADING_TAGS.match(body)
+    if match:
+        prefix = match.group(0)
+        body = body[match.end():]
+    
+    suffix = ''
+    match = TRAILING_TAGS.search(body)
+    if match:
+        suffix = match.group(0)
+        body = body[:match.start()]
+    
+    body = normalize_whitespace(body)
+    if not body:
+        return None
+    
+    numbers = NUMBER_PATTERN.findall(body)
+    if len(set(numbers)) != len(numbers):
+        # أرقام مكررة لا يمكن ربطها بمواضعها في الترجمة
+        numbers = []
+    else:
+        index = iter(range(len(numbers)))
+        body = NUMBER_PATTERN.sub(lambda m: PLACEHOLDER.format(next(index)), body)
+    
+    if body == stripped:
+        return None
+    return CanonicalText(body, prefix, suffix, numbers)
+
+def make_template(translated_text, canonical):
+    """تحويل ترجمة النص الأصلي إلى قالب قابل لإعادة الاستخدام
+    
+    Returns None when the translation cannot be templated safely: the
+    wrapping tags did not survive unchanged, or the numbers in the
+    translation are not exactly the numbers of the original.
+    """
+    body = translated_text.strip()
+    if canonical.prefix:
+        if not body.startswith(canonical.prefix):
+            return None
+        body = body[len(canonical.prefix):]
+    if canonical.suffix:
+        if not body.endswith(canonical.suffix):
+            return None
+        body = body[:-len(canonical.suffix)]
+    
+    if sorted(NUMBER_PATTERN.findall(body)) != sorted(canonical.numbers):
+        return None
+    
+    positions = {number: i for i, number in enumerate(canonical.numbers)}
+    body = NUMBER_PATTERN.sub(lambda m: PLACEHOLDER.format(positions[m.group(0)]), body)
+    return body.strip() or None
+
+def restore(template, canonical):
+    """ملء القالب بأرقام النص الحالي وإعادة الوسوم المحيطة به"""
+    numbers = canonical.numbers
+    
+    def fill(match):
+        index = int(match.group(1))
+        return numbers[index] if index < len(numbers) else match.group(0)
+    
+    body = PLACEHOLDER_PATTERN.sub(fill, template)
+    if PLACEHOLDER_PATTERN.search(body):
+        return None
+    return f"{canonical.prefix}{body}{canonical.suffix}"
+
+def _split_sentences(body):
+    """تقسيم سطر إلى جمل، مع إرجاع المسافات بين الجمل"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_BREAK.finditer(body):
+        end = match.end()
+        if end >= len(body) or body[end].islower():
+            continue
+        words = body[start:match.start()].split()
+        last_word = words[-1].lower() if words else ''
+        if last_word in ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+            continue
+        sentences.append((body[start:match.start(1)], match.group(1)))
+        start = end
+    sentences.append((body[start:], ''))
+    return sentences
+
+def split_segments(text):
+    """تقسيم نص الترجمة إلى أسطر وجمل تُترجم وتُخزن كل منها على حدة
+    
+    Returns (segments, layout): segments are the sentence texts to
+    translate, layout is a list of literal strings (line breaks, dialogue
+    dashes, wrapping tags, spacing) and segment indexes that join_segments
+    fills back in, keeping the original line structure of the cue.
+    """
+    segments = []
+    layout = []
+    for line_number, line in enumerate(text.split('\n')):
+        if line_number:
+            layout.append('\n')
+        
+        prefix = LINE_PREFIX.match(line).group(0)
+        body = line[len(prefix):]
+        suffix = LINE_SUFFIX.search(body).group(0)
+        body = body[:len(body) - len(suffix)]
+        if not body:
+            layout.append(line)
+            continue
+        
+        layout.append(prefix)
+        for sentence, spacing in _split_sentences(body):
+            layout.append(len(segments))
+            segments.append(sentence)
+            layout.append(spacing)
+        layout.append(suffix)
+    return segments, layout
+
+def join_segments(translated_segments, layout):
+    """إعادة تجميع النص من ترجمات الجمل حسب القالب"""
+    return ''.join(part if isinstance(part, str) else translated_segments[part] for part in layout)
@@ -17,21 +17,72 @@ import argparse
 import shutil
 from datetime import datetime
 import concurrent.futures
+import itertools
 import threading
+from collections import OrderedDict
 from config import Config
-from cache import TranslationCache
+from subtitle_formats import SubtitleFormatHandler
+from cache import create_cache_from_config
+from rate_limiter import get_rate_limiter, is_throttling_error
+from stub_engine import create_stub_translator
+from engines import EnginePool, RequestHedger, CircuitBreaker, CircuitOpenError
+from retry_policy import decorrelated_jitter, get_retry_after, get_retry_budget
+from text_normalizer import split_segments, join_segments
+from text_classifier import create_text_classifier
+
+# فاصل بين الترجمات المجمعة في طلب واحد - لا يغيره محرك الترجمة
+# Separator placed between cues packed into one engine request
+BATCH_SEPARATOR = "\n|||\n"
+BATCH_SPLIT_PATTERN = re.compile(r'\s*\|\s*\|\s*\|\s*')
+
+class DedupeMemo:
+    """ترجمات النصوص المكررة عبر دفعات ملف واحد
+    
+    Maps normalized text to its translation so a line repeated in a later
+    chunk is reused even with the cache disabled. Holds at most max_entries
+    texts, dropping the least recently used, and counts the texts planned
+    and reused for the file's deduplication summary. One stream uses it
+    from one thread.
+    """
+    
+    def __init__(self, max_entries=20000):
+        self.max_entries = max(1, int(max_entries))
+        self.translations = OrderedDict()
+        self.texts = 0
+        self.reused = 0
+    
+    def get(self, key):
+        translated = self.translations.get(key)
+        if translated is not None:
+            self.translations.move_to_end(key)
+        return translated
+    
+    def put(self, key, translated):
+        self.translations[key] = translated
+        self.translations.move_to_end(key)
+        if len(self.translations) > self.max_entries:
+            self.translations.popitem(last=False)
 
 class SubtitleTranslator:
     def __init__(self, config_file="config.json"):
         # تحميل الإعدادات
         self.config = Config(config_file)
+        self._stats_lock = threading.Lock()
+        self._breakers = {}
+        
+        # نسخ المحركات لكل (محرك، لغة المصدر، اللغة الهدف) تُستعار لكل طلب
+        self.engine_pool = EnginePool(self._create_engine)
+        self.format_handler = SubtitleFormatHandler()
+        
+        # النصوص التي تمر دون ترجمة (أرقام، توقيتات، روابط، رموز، أسماء المتحدثين)
+        self.classifier = create_text_classifier(self.config)
         
         # إعداد محرك الترجمة
         self.setup_translator()
         
         # إعداد نظام التخزين المؤقت
         if self.config.get('cache_enabled'):
-            self.cache = TranslationCache()
+            self.cache = self._create_cache()
         else:
             self.cache = None
         
@@ -41,24 +92,66 @@ class SubtitleTranslator:
             'subtitles_translated': 0,
             'cache_hits': 0,
             'translation_errors': 0,
+            'batch_requests': 0,
+            'batch_fallbacks': 0,
+            'throttled_requests': 0,
+            'unique_texts': 0,
+            'duplicate_cues': 0,
+            'hedged_requests': 0,
+            'hedge_wins': 0,
+            'failovers': 0,
+            'retries': 0,
+            'retry_budget_exhausted': 0,
+            'memory_cache_hits': 0,
+            'memory_cache_misses': 0,
+            'memory_cache_evictions': 0,
+            'normalized_cache_hits': 0,
+            'bloom_skipped_lookups': 0,
+            'cue_segments': 0,
+            'skipped_cues': 0,
+            'cache_evictions': 0,
+            'breaker_transitions': 0,
+            'breaker_states': {},
             'start_time': datetime.now()
         }
     
+    def _increment_stat(self, key, amount=1):
+        """زيادة عداد في إحصائيات الجلسة بشكل آمن بين الخيوط"""
+        with self._stats_lock:
+            self.session_stats[key] = self.session_stats.get(key, 0) + amount
+    
+    def _create_cache(self):
+        """إنشاء الذاكرة المؤقتة: ملف SQLite محلي أو خادم الذاكرة المشتركة"""
+        if self.config.get('cache_backend', 'sqlite') == 'server':
+            host = self.config.get('cache_server_host', '127.0.0.1')
+            port = self.config.get('cache_server_port', 8765)
+            try:
+                from cache_server import RemoteTranslationCache
+                return RemoteTranslationCache(
+                    host, port,
+                    pool_size=self.config.get('cache_server_pool_size', 8),
+                    memory_entries=self.config.get('cache_memory_entries', 10000),
+                    memory_mb=self.config.get('cache_memory_mb', 32),
+                    stats_callback=self._increment_stat,
+                    token=self.config.get('cache_server_token') or None
+                )
+            except OSError as e:
+                print(f"⚠️ Cache server {host}:{port} is unreachable ({e}), using the local cache file")
+        
+        return create_cache_from_config(self.config, stats_callback=self._increment_stat)
+    
     def setup_translator(self):
         """إعداد محرك الترجمة حسب الإعدادات"""
         engine = self.config.get('translation_engine', 'google')
         source_lang = self.config.get('default_source_language', 'en')
         target_lang = self.config.get('default_target_language', 'ar')
         
+        # إعدادات المحرك ربما تغيرت - لا نعيد استخدام النسخ القديمة
+        self.engine_pool.clear()
+        self._secondary_available = {}
+        
         try:
-            if engine == 'google':
-                self.translator = GoogleTranslator(source=source_lang, target=target_lang)
-            elif engine == 'microsoft':
-                self.translator = MicrosoftTranslator(source=source_lang, target=target_lang)
-            else:
-                # Default to Google
-                self.translator = GoogleTranslator(source=source_lang, target=target_lang)
-            
+            self.translator = self._create_engine(engine, source_lang, target_lang)
             self.current_engine = engine
             print(f"Translation engine setup: {engine}")
             
@@ -67,45 +160,71 @@ class SubtitleTranslator:
             # Fall back to Google Translator
             self.translator = GoogleTranslator(source=source_lang, target=target_lang)
             self.current_engine = 'google'
+        
+        # محدد المعدل مشترك بين كل من يستخدم نفس المحرك
+        self.rate_limiter = get_rate_limiter(self.current_engine, self.config)
+        
+        # التحوط: إرسال الطلب البطيء إلى المحرك الثاني أيضاً
+        if getattr(self, 'hedger', None):
+            self.hedger.shutdown()
+        self.hedger = None
+        if self.config.get('hedging_enabled', False):
+            self.hedger = RequestHedger(
+                hedge_percentile=self.config.get('hedge_percentile', 95),
+                min_samples=self.config.get('hedge_min_samples', 20),
+                min_delay=self.config.get('hedge_min_delay_ms', 50) / 1000.0,
+                stats_callback=self._increment_stat
+            )
+    
+    def _create_engine(self, engine, source_lang, target_lang):
+        """إنشاء نسخة جديدة من محرك الترجمة"""
+        if engine == 'google':
+            return GoogleTranslator(source=source_lang, target=target_lang)
+        elif engine == 'microsoft':
+            return MicrosoftTranslator(source=source_lang, target=target_lang)
+        elif engine == 'stub':
+            # محرك وهمي لقياس الأداء دون اتصال
+            return create_stub_translator(source_lang, target_lang, self.config.get('stub_engine'), BATCH_SEPARATOR)
+        else:
+            # Default to Google
+            return GoogleTranslator(source=source_lang, target=target_lang)
     
     def find_srt_files(self, directory="."):
-        """Find all SRT files in the specified directory"""
+        """Find all SRT files in the specified directory, skipping our own outputs"""
         srt_files = glob.glob(os.path.join(directory, "*.srt"))
-        return [f for f in srt_files if not f.endswith("_arabic.srt")]
+        return [f for f in srt_files if not self._is_output_file(f)]
+    
+    def _output_path(self, input_path, lang=None):
+        """مسار الملف المترجم: <name><output_suffix>.srt، أو <name><output_suffix>.<lang>.srt لعدة لغات"""
+        base_name = os.path.splitext(input_path)[0]
+        suffix = self.config.get('output_suffix', '_arabic')
+        return f"{base_name}{suffix}.{lang}.srt" if lang else f"{base_name}{suffix}.srt"
+    
+    def _is_output_file(self, file_path):
+        """هل الملف ترجمة كتبها البرنامج؟ (حتى لا يُترجم مرة أخرى مع --all)"""
+        name = os.path.basename(file_path)
+        suffix = self.config.get('output_suffix', '_arabic')
+        if name.endswith("_arabic.srt"):
+            return True
+        if not suffix:
+            return False
+        # اللاحقة وحدها، أو متبوعة برمز لغة مثل .fr أو .zh-CN
+        return re.search(re.escape(suffix) + r'(?:\.[A-Za-z]{2,3}(?:-[A-Za-z]{2,4})?)?\.srt$', name) is not None
         
     def parse_srt_file(self, file_path):
         """Parse SRT file and extract subtitle entries"""
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Split by double newlines to separate subtitle blocks
-        blocks = re.split(r'\n\s*\n', content.strip())
-        
-        subtitles = []
-        for block in blocks:
-            lines = block.strip().split('\n')
-            if len(lines) >= 3:
-                # Extract subtitle number
-                try:
-                    number = int(lines[0])
-                except ValueError:
-                    continue
-                
-                # Extract timestamp
-                timestamp = lines[1]
-                
-                # Extract text (may be multiple lines)
-                text = '\n'.join(lines[2:])
-                
-                subtitles.append({
-                    'number': number,
-                    'timestamp': timestamp,
-                    'text': text
-                })
-        
-        return subtitles
+        return list(self.iter_srt_file(file_path))
+    
+    def iter_srt_file(self, file_path):
+        """قراءة ملف SRT سطراً بسطر وإرجاع ترجمة واحدة في كل مرة"""
+        for subtitle in self.format_handler.iter_srt(file_path):
+            yield {
+                'number': subtitle['number'],
+                'timestamp': subtitle['timestamp'],
+                'text': subtitle['text']
+            }
     
-    def translate_text(self, text, target_lang=None, max_retries=None):
+    def translate_text(self, text, target_lang=None, max_retries=None, source_lang=None):
         """ترجمة النص مع دعم الذاكرة المؤقتة وإعادة المحاولة"""
         if not text.strip():
             return text
@@ -117,81 +236,489 @@ class SubtitleTranslator:
         if max_retries is None:
             max_retries = self.config.get('max_retries', 3)
         
-        source_lang = self.config.get('default_source_language', 'en')
+        if source_lang is None:
+            source_lang = self.config.get('default_source_language', 'en')
         
-        # تخطي الأسطر الفارغة أو الرموز الخاصة فقط
-        if text.strip() in ['', '-', '--', '...', '♪', '♫']:
+        # تخطي النصوص التي لا تحتاج إلى ترجمة، أو ترجمة الجزء القابل للترجمة فقط
+        prefix, body, suffix = self.classifier.split(text)
+        if not body:
+            self._increment_stat('skipped_cues')
             return text
+        if prefix or suffix:
+            return f"{prefix}{self.translate_text(body, target_lang, max_retries, source_lang)}{suffix}"
         
         # البحث في الذاكرة المؤقتة أولاً
         if self.cache:
             cached_result = self.cache.get_cached_translation(text, source_lang, target_lang)
             if cached_result:
-                self.session_stats['cache_hits'] += 1
+                self._increment_stat('cache_hits')
                 return cached_result
         
         # محاولة الترجمة مع إعادة المحاولة
+        try:
+            result, engine = self._request_translation(text, target_lang, max_retries, source_lang)
+        except Exception:
+            self._increment_stat('translation_errors')
+            print(f"Translation failed for: '{text[:50]}...'" + ("" if len(text) <= 50 else ""))
+            return text  # Return original text if translation fails
+        
+        # حفظ في الذاكرة المؤقتة
+        if self.cache and result:
+            self.cache.save_translation(text, result, source_lang, target_lang, engine)
+        
+        return result if result else text
+    
+    def _get_breaker(self, engine):
+        """قاطع الدائرة الخاص بمحرك الترجمة"""
+        with self._stats_lock:
+            if engine not in self._breakers:
+                self._breakers[engine] = CircuitBreaker(
+                    engine,
+                    failure_threshold=self.config.get('breaker_failure_threshold', 5),
+                    cooldown=self.config.get('breaker_cooldown', 30),
+                    on_state_change=self._on_breaker_state_change
+                )
+                self.session_stats['breaker_states'][engine] = CircuitBreaker.CLOSED
+            return self._breakers[engine]
+    
+    def _on_breaker_state_change(self, engine, old_state, new_state):
+        """تسجيل تغير حالة قاطع الدائرة في إحصائيات الجلسة"""
+        with self._stats_lock:
+            self.session_stats['breaker_states'][engine] = new_state
+            self.session_stats['breaker_transitions'] += 1
+        print(f"\n⚠️  Circuit breaker for {engine}: {old_state} → {new_state}")
+    
+    def _get_secondary_engine(self, primary, source_lang, target_lang):
+        """المحرك الثاني للتحويل والتحوط إذا كان مضبوطاً ويمكن إنشاؤه، وإلا None"""
+        secondary = self.config.get('secondary_engine')
+        if not secondary or secondary == primary:
+            return None
+        
+        key = (secondary, source_lang, target_lang)
+        available = self._secondary_available.get(key)
+        if available is None:
+            # مثلاً Microsoft بدون api_key - لا نرسل إليه طلبات تفشل دائماً وتفتح قاطعه
+            try:
+                with self.engine_pool.lease(secondary, source_lang, target_lang):
+                    pass
+                available = True
+            except Exception as e:
+                print(f"⚠️  Secondary engine {secondary} is unavailable, failover and hedging are off: {e}")
+                available = False
+            self._secondary_available[key] = available
+        return secondary if available else None
+    
+    def _select_engines(self, primary, secondary):
+        """اختيار المحركات المتاحة حسب حالة قواطع الدائرة
+        
+        Returns the list of engines to use for this attempt: the primary (and
+        the secondary, if any, for hedging) while the primary's breaker
+        allows it, otherwise the secondary alone. Raises CircuitOpenError
+        when no engine may be called.
+        """
+        engines = [primary, secondary] if secondary else [primary]
+        if not self.config.get('circuit_breaker_enabled', True):
+            return engines
+        
+        if self._get_breaker(primary).allow_request():
+            return engines
+        
+        if secondary and self._get_breaker(secondary).allow_request():
+            self._increment_stat('failovers')
+            return [secondary]
+        
+        raise CircuitOpenError(f"Circuit open for {primary}" + (f" and {secondary}" if secondary else ""))
+    
+    def _call_engine(self, engine, text, source_lang, target_lang):
+        """طلب واحد إلى محرك محدد عبر محدد المعدل وقاطع الدائرة الخاصين به"""
+        rate_limiter = get_rate_limiter(engine, self.config)
+        breaker = self._get_breaker(engine) if self.config.get('circuit_breaker_enabled', True) else None
+        
+        # لا يُحتسب من المعدل إلا الطلبات الفعلية للمحرك
+        rate_limiter.acquire()
+        try:
+            with self.engine_pool.lease(engine, source_lang, target_lang) as translator:
+                start = time.monotonic()
+                result = translator.translate(text)
+                elapsed = time.monotonic() - start
+        except Exception as e:
+            if is_throttling_error(e):
+                self._increment_stat('throttled_requests')
+                rate_limiter.on_throttle(get_retry_after(e, self.config.get('retry_max_delay', 30.0)))
+            if breaker:
+                breaker.record_failure()
+            raise
+        
+        rate_limiter.on_success()
+        if breaker:
+            breaker.record_success()
+        if self.hedger:
+            self.hedger.record_latency(engine, elapsed)
+        return result
+    
+    def _request_translation(self, text, target_lang, max_retries, source_lang):
+        """إرسال طلب واحد إلى محرك الترجمة مع إعادة المحاولة، ويرفع آخر خطأ عند الفشل
+        
+        Returns (result, engine) where engine is the name of the engine that
+        answered, which differs from current_engine when a hedge won.
+        """
+        primary = self.current_engine
+        secondary = self._get_secondary_engine(primary, source_lang, target_lang)
+        
+        retry_budget = get_retry_budget(self.config)
+        base_delay = self.config.get('retry_base_delay', 0.5)
+        max_delay = self.config.get('retry_max_delay', 30.0)
+        backoff = base_delay
+        
+        retry_budget.record_request()
         for attempt in range(max_retries):
             try:
-                # تحديث محرك الترجمة إذا تغيرت اللغة المستهدفة
-                if hasattr(self.translator, 'target') and self.translator.target != target_lang:
-                    self.translator.target = target_lang
-                
-                result = self.translator.translate(text)
+                engines = self._select_engines(primary, secondary)
+                if self.hedger and len(engines) == 2:
+                    # قاطع المحرك الثاني يُسأل فقط عند إرسال الطلب الاحتياطي فعلاً
+                    allow_secondary = (self._get_breaker(secondary).allow_request
+                                       if self.config.get('circuit_breaker_enabled', True) else None)
+                    return self.hedger.translate(
+                        primary, lambda: self._call_engine(primary, text, source_lang, target_lang),
+                        secondary, lambda: self._call_engine(secondary, text, source_lang, target_lang),
+                        allow_secondary)
                 
-                # حفظ في الذاكرة المؤقتة
-                if self.cache and result:
-                    self.cache.save_translation(text, result, source_lang, target_lang, self.current_engine)
-                
-                return result if result else text
+                return self._call_engine(engines[0], text, source_lang, target_lang), engines[0]
                 
+            except CircuitOpenError:
+                # لا فائدة من إعادة المحاولة والدائرة مفتوحة
+                raise
             except Exception as e:
                 print(f"خطأ في المحاولة {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    # انتظار متزايد بين المحاولات
-                    time.sleep(0.5 * (attempt + 1))
-                else:
-                    self.session_stats['translation_errors'] += 1
-                    print(f"Translation failed for: '{text[:50]}...'" + ("" if len(text) <= 50 else ""))
-                    return text  # Return original text if translation fails
+                if attempt >= max_retries - 1:
+                    raise
+                if not retry_budget.try_acquire_retry():
+                    # نفدت ميزانية إعادة المحاولة - لا نضاعف الحمل أثناء الانقطاع
+                    self._increment_stat('retry_budget_exhausted')
+                    raise
+                
+                # انتظار أُسي مع تشتيت عشوائي، مع احترام Retry-After
+                backoff = decorrelated_jitter(backoff, base_delay, max_delay)
+                time.sleep(max(backoff, get_retry_after(e, max_delay) or 0))
+                self._increment_stat('retries')
+        
+        return None, primary
     
-    def translate_subtitles(self, subtitles, target_lang='ar', delay=0.1):
-        """Translate all subtitle entries"""
-        translated_subtitles = []
-        total = len(subtitles)
+    def translate_batch(self, texts, target_lang=None, max_retries=None, source_lang=None):
+        """ترجمة عدة نصوص بطلبات مجمعة حتى batch_size نص في كل طلب
+        
+        Cues are joined with BATCH_SEPARATOR and sent as one request; any
+        batch whose result does not split back into the same number of
+        parts is translated again cue by cue.
+        """
+        if target_lang is None:
+            target_lang = self.config.get('default_target_language', 'ar')
+        
+        if max_retries is None:
+            max_retries = self.config.get('max_retries', 3)
+        
+        if source_lang is None:
+            source_lang = self.config.get('default_source_language', 'en')
+        
+        results = list(texts)
         
-        print(f"Translating {total} subtitle entries...")
+        # يُرسل إلى المحرك الجزء القابل للترجمة فقط، وتُعاد البادئة واللاحقة بعده
+        pieces = [self.classifier.split(text) for text in texts]
+        bodies = [body for _, body, _ in pieces]
         
-        for i, subtitle in enumerate(subtitles):
-            print(f"Progress: {i+1}/{total} ({((i+1)/total)*100:.1f}%)", end='\r')
+        def wrap(i, translated):
+            return f"{pieces[i][0]}{translated}{pieces[i][2]}"
+        
+        # البحث في الذاكرة المؤقتة وتحديد النصوص التي تحتاج إلى ترجمة
+        pending = []
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            if not bodies[i]:
+                self._increment_stat('skipped_cues')
+                continue
+            if self.cache:
+                cached_result = self.cache.get_cached_translation(bodies[i], source_lang, target_lang)
+                if cached_result:
+                    self._increment_stat('cache_hits')
+                    results[i] = wrap(i, cached_result)
+                    continue
+            pending.append(i)
+        
+        for batch in self._make_batches(pending, bodies):
+            if len(batch) == 1:
+                results[batch[0]] = self.translate_text(texts[batch[0]], target_lang, max_retries, source_lang)
+                continue
             
-            # Translate the text
-            translated_text = self.translate_text(subtitle['text'], target_lang)
+            batch_texts = [bodies[i] for i in batch]
+            parts = None
+            try:
+                self._increment_stat('batch_requests')
+                result, engine = self._request_translation(BATCH_SEPARATOR.join(batch_texts), target_lang, max_retries, source_lang)
+                if result:
+                    parts = [part.strip() for part in BATCH_SPLIT_PATTERN.split(result.strip())]
+            except Exception as e:
+                print(f"Batch translation failed: {e}")
             
-            translated_subtitles.append({
-                'number': subtitle['number'],
-                'timestamp': subtitle['timestamp'],
-                'text': translated_text
-            })
+            if not parts or len(parts) != len(batch) or not all(parts):
+                # عدد الأجزاء لا يطابق - ترجمة كل نص على حدة
+                self._increment_stat('batch_fallbacks')
+                for i in batch:
+                    results[i] = self.translate_text(texts[i], target_lang, max_retries, source_lang)
+                continue
             
-            # Add delay to avoid rate limiting
-            if delay > 0:
-                time.sleep(delay)
+            for i, translated in zip(batch, parts):
+                results[i] = wrap(i, translated)
+                if self.cache:
+                    self.cache.save_translation(bodies[i], translated, source_lang, target_lang, engine)
+        
+        return results
+    
+    def _make_batches(self, indices, texts):
+        """تقسيم النصوص إلى دفعات حسب batch_size والحد الأقصى لعدد الأحرف"""
+        batch_size = max(1, self.config.get('batch_size', 10))
+        max_chars = self.config.get('max_batch_chars', 4500)
+        
+        batch = []
+        batch_chars = 0
+        for i in indices:
+            text_chars = len(texts[i]) + len(BATCH_SEPARATOR)
+            if batch and (len(batch) >= batch_size or batch_chars + text_chars > max_chars):
+                yield batch
+                batch = []
+                batch_chars = 0
+            batch.append(i)
+            batch_chars += text_chars
+        
+        if batch:
+            yield batch
+    
+    def _normalize_text(self, text):
+        """توحيد النص لاكتشاف الترجمات المكررة داخل الملف"""
+        return '\n'.join(' '.join(line.split()) for line in text.strip().split('\n'))
+    
+    def _plan_unique_texts(self, texts):
+        """جمع النصوص الفريدة وتحديد موقع كل نص في قائمة النصوص الفريدة"""
+        unique_texts = []
+        positions = {}
+        slots = []
+        for text in texts:
+            key = self._normalize_text(text)
+            if key not in positions:
+                positions[key] = len(unique_texts)
+                unique_texts.append(text)
+            slots.append(positions[key])
+        return unique_texts, slots
+    
+    def translate_many(self, texts, target_lang=None, progress_callback=None, source_lang=None,
+                       memo=None, executor=None):
+        """ترجمة قائمة من النصوص مع الحفاظ على ترتيبها الأصلي
+        
+        Repeated texts ("Yeah.", choruses, names) are translated once and the
+        result is fanned out to every cue that uses them. Planning works on
+        the classifier's body of each text, so "JOHN: Yeah." and "Yeah."
+        share one translation and cache entry, and untranslatable texts
+        pass through without a lookup. Cache hits for the
+        whole list are resolved with one bulk lookup before any engine work,
+        and only the misses are sent to the engine. With max_workers > 1
+        the unique texts (or batches of them in batched mode) are translated
+        on a bounded thread pool and written back by index, so the returned
+        list always matches the order of texts.
+        progress_callback, if given, is called as (done, total) over the
+        unique texts. With cache_granularity 'sentence' the unit of work is a
+        sentence of a cue line rather than the whole cue (see _segment_cues).
+        A DedupeMemo carries translations over from earlier calls (chunks of
+        the same file), and a caller-owned executor is used instead of a new
+        thread pool per call.
+        """
+        if target_lang is None:
+            target_lang = self.config.get('default_target_language', 'ar')
+        
+        if source_lang is None:
+            source_lang = self.config.get('default_source_language', 'en')
+        
+        texts, layouts = self._segment_cues(texts)
+        
+        # خطوة التخطيط: كل نص فريد يُترجم مرة واحدة، ودون اسم المتحدث أو علامات الموسيقى
+        unique_texts, slots = self._plan_unique_texts(texts)
+        bodies, plan = self._plan_bodies(unique_texts)
+        total = len(bodies)
+        results = list(bodies)
+        
+        # النصوص التي لا تحتاج إلى ترجمة تبقى كما هي دون بحث أو طلب
+        skipped = sum(1 for slot in slots if plan[slot] is None and unique_texts[slot].strip())
+        if skipped:
+            self._increment_stat('skipped_cues', skipped)
+        translatable = sum(1 for slot in slots if plan[slot] is not None)
+        pending = list(range(len(bodies)))
+        
+        # نصوص تُرجمت في دفعة سابقة من نفس الملف
+        reused = set()
+        if memo is not None:
+            keys = [self._normalize_text(body) for body in bodies]
+            remaining = []
+            for i in pending:
+                translated = memo.get(keys[i])
+                if translated is not None:
+                    results[i] = translated
+                    reused.add(i)
+                else:
+                    remaining.append(i)
+            pending = remaining
+        
+        planned = len(bodies) - len(reused)
+        self._increment_stat('unique_texts', planned)
+        self._increment_stat('duplicate_cues', translatable - planned)
+        if memo is not None:
+            memo.texts += translatable
+            memo.reused += translatable - planned
+        
+        # كل ما في الذاكرة المؤقتة يُحل باستعلام واحد قبل أي طلب للمحرك
+        if self.cache and pending:
+            cached = self.cache.get_many([bodies[i] for i in pending], source_lang, target_lang)
+            if cached:
+                self._increment_stat('cache_hits', len(cached))
+                remaining = []
+                for i in pending:
+                    if bodies[i] in cached:
+                        results[i] = cached[bodies[i]]
+                    else:
+                        remaining.append(i)
+                pending = remaining
+        
+        # Batched mode sends up to batch_size cues per engine request
+        step = 1
+        if self.config.get('batch_translation', False):
+            step = max(1, self.config.get('batch_size', 10))
+        units = [pending[start:start + step] for start in range(0, len(pending), step)]
+        
+        def translate_unit(unit):
+            if len(unit) > 1:
+                translated = self.translate_batch([bodies[i] for i in unit], target_lang, source_lang=source_lang)
+            else:
+                translated = [self.translate_text(bodies[unit[0]], target_lang, source_lang=source_lang)]
+            return translated
+        
+        done = total - len(pending)
+        if done and progress_callback:
+            progress_callback(done, total)
+        
+        own_executor = executor is None and self._max_workers() > 1
+        if own_executor:
+            executor = self._create_executor()
+        futures = {}
+        if executor is None:
+            completed = ((unit, translate_unit(unit)) for unit in units)
+        else:
+            futures = {executor.submit(translate_unit, unit): unit for unit in units}
+            completed = ((futures[future], future.result())
+                         for future in concurrent.futures.as_completed(futures))
+        
+        try:
+            for unit, translated in completed:
+                for i, translated_text in zip(unit, translated):
+                    results[i] = translated_text
+                done += len(unit)
+                if progress_callback:
+                    progress_callback(done, total)
+        finally:
+            for future in futures:
+                future.cancel()
+            if own_executor:
+                executor.shutdown(wait=True)
+        
+        # الترجمات الفاشلة تعود بالنص الأصلي ولا تُحفظ لتُعاد محاولتها لاحقاً
+        if memo is not None:
+            for i, key in enumerate(keys):
+                if i not in reused and results[i] != bodies[i]:
+                    memo.put(key, results[i])
+        
+        # إعادة اسم المتحدث وعلامات الموسيقى، ثم توزيع النتائج على كل الترجمات المطابقة
+        translated_texts = [text if parts is None else f"{parts[0]}{results[parts[1]]}{parts[2]}"
+                            for text, parts in zip(unique_texts, plan)]
+        return self._join_cues([translated_texts[slot] for slot in slots], layouts)
+    
+    def _plan_bodies(self, unique_texts):
+        """فصل الجزء القابل للترجمة من كل نص فريد وتوحيد المكرر منه
+        
+        Returns the unique bodies and, per unique text, (prefix, index of its
+        body, suffix), or None when the text passes through unchanged.
+        """
+        bodies = []
+        positions = {}
+        plan = []
+        for text in unique_texts:
+            prefix, body, suffix = self.classifier.split(text)
+            if not body.strip():
+                plan.append(None)
+                continue
+            key = self._normalize_text(body)
+            if key not in positions:
+                positions[key] = len(bodies)
+                bodies.append(body)
+            plan.append((prefix, positions[key], suffix))
+        return bodies, plan
+    
+    def _max_workers(self):
+        return max(1, int(self.config.get('max_workers', 1)))
+    
+    def _create_executor(self):
+        """مجمع خيوط للترجمة، أو None عندما تكون max_workers = 1"""
+        max_workers = self._max_workers()
+        return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    
+    def _segment_cues(self, texts):
+        """تقسيم الترجمات إلى جمل عندما تكون cache_granularity = 'sentence'
+        
+        Each cue is split into lines and sentences so a line seen in an
+        earlier cue is a cache hit even when the rest of the cue differs.
+        Returns the flat list of segments and, per cue, where its segments
+        start, how many there are and the layout to rebuild it; with the
+        default 'cue' granularity the texts are returned unchanged.
+        """
+        if self.config.get('cache_granularity', 'cue') != 'sentence':
+            return texts, None
+        
+        segments = []
+        layouts = []
+        for text in texts:
+            cue_segments, layout = split_segments(text)
+            layouts.append((len(segments), len(cue_segments), layout))
+            segments.extend(cue_segments)
+        self._increment_stat('cue_segments', len(segments))
+        return segments, layouts
+    
+    def _join_cues(self, translated_segments, layouts):
+        """إعادة بناء كل ترجمة من جملها المترجمة بنفس تقسيم الأسطر"""
+        if layouts is None:
+            return translated_segments
+        return [join_segments(translated_segments[start:start + count], layout)
+                for start, count, layout in layouts]
+    
+    def translate_subtitles(self, subtitles, target_lang='ar', delay=0.1, source_lang=None):
+        """Translate all subtitle entries
+        
+        Kept for callers of the list-based API; the work is done by
+        translate_many. delay is ignored, since pacing now comes from the
+        rate limiter.
+        """
+        print(f"Translating {len(subtitles)} subtitle entries...")
+        translated_texts = self.translate_many(
+            [subtitle['text'] for subtitle in subtitles], target_lang,
+            lambda done, total: print(f"Progress: {done}/{total} ({done / max(total, 1) * 100:.1f}%)", end='\r'),
+            source_lang)
         
         print(f"\nTranslation completed!")
-        return translated_subtitles
+        return [{'number': subtitle['number'], 'timestamp': subtitle['timestamp'], 'text': translated_text}
+                for subtitle, translated_text in zip(subtitles, translated_texts)]
     
     def save_srt_file(self, subtitles, output_path):
         """Save translated subtitles to SRT file"""
-        with open(output_path, 'w', encoding='utf-8') as file:
-            for subtitle in subtitles:
-                file.write(f"{subtitle['number']}\n")
-                file.write(f"{subtitle['timestamp']}\n")
-                file.write(f"{subtitle['text']}\n\n")
+        self.format_handler.save_srt(subtitles, output_path)
         
         print(f"Translated subtitles saved to: {os.path.basename(output_path)}")
     
-    def translate_srt_file(self, input_path, output_path=None, target_lang=None):
+    def translate_srt_file(self, input_path, output_path=None, target_lang=None, source_lang=None):
         """الدالة الرئيسية لترجمة ملف SRT مع التحسينات الجديدة"""
         if not os.path.exists(input_path):
             print(f"خطأ: الملف '{input_path}' غير موجود")
@@ -208,46 +735,110 @@ class SubtitleTranslator:
         
         # تحديد مسار الملف المترجم
         if output_path is None:
-            base_name = os.path.splitext(input_path)[0]
-            suffix = self.config.get('output_suffix', '_arabic')
-            output_path = f"{base_name}{suffix}.srt"
+            output_path = self._output_path(input_path)
         
         # استخدام اللغة المستهدفة من الإعدادات إذا لم تُحدد
         if target_lang is None:
             target_lang = self.config.get('default_target_language', 'ar')
         
-        print(f"📖 قراءة ملف الترجمة: {os.path.basename(input_path)}")
-        subtitles = self.parse_srt_file(input_path)
-        print(f"✅ تم العثور على {len(subtitles)} ترجمة")
-        
         # إحصائيات قبل البدء
         if self.cache:
             cache_stats = self.cache.get_cache_stats()
             print(f"💾 الذاكرة المؤقتة: {cache_stats.get('total_translations', 0)} ترجمة محفوظة")
         
-        # بدء الترجمة
+        # بدء الترجمة أثناء القراءة دون تمرير مسبق على الملف
+        print(f"📖 قراءة وترجمة ملف الترجمة: {os.path.basename(input_path)}")
+        memo = DedupeMemo(self.config.get('stream_dedupe_entries', 20000))
         start_time = datetime.now()
-        translated_subtitles = self.translate_subtitles(subtitles, target_lang)
+        count = self.translate_subtitle_stream(self.iter_srt_file(input_path), output_path, target_lang,
+                                               source_lang, memo=memo)
         end_time = datetime.now()
+        print(f"\n✅ تمت ترجمة {count} ترجمة")
+        if memo.reused:
+            print(f"♻️  Deduplication: {memo.reused} duplicate entries reused "
+                  f"({memo.reused / memo.texts * 100:.1f}% of file)")
+        print(f"Translated subtitles saved to: {os.path.basename(output_path)}")
         
-        # حفظ الملف المترجم
-        self.save_srt_file(translated_subtitles, output_path)
+        # كتابة الترجمات المؤجلة حتى لا يضيع عمل ملف مكتمل
+        if self.cache:
+            self.cache.flush()
         
         # تحديث الإحصائيات
-        self.session_stats['files_processed'] += 1
-        self.session_stats['subtitles_translated'] += len(subtitles)
+        self._increment_stat('files_processed')
+        self._increment_stat('subtitles_translated', count)
         
         # عرض الإحصائيات
         duration = (end_time - start_time).total_seconds()
         print(f"\n⏱️  وقت الترجمة: {duration:.1f} ثانية")
-        print(f"🎯 معدل الترجمة: {len(subtitles)/duration:.1f} ترجمة/ثانية")
+        print(f"🎯 معدل الترجمة: {count/max(duration, 0.001):.1f} ترجمة/ثانية")
         if self.session_stats['cache_hits'] > 0:
             print(f"⚡ استفادة من الذاكرة المؤقتة: {self.session_stats['cache_hits']} ترجمة")
         
         return output_path
     
-    def translate_all_srt_files(self, directory="."):
-        """Translate all SRT files in specified directory"""
+    def translate_subtitle_stream(self, cues, output_path, target_lang=None, source_lang=None, output_format='.srt',
+                                  memo=None, total=None):
+        """ترجمة الترجمات على دفعات أثناء قراءتها وكتابة كل دفعة فور ترجمتها
+        
+        cues is any iterable of subtitle entries, typically a lazy parser
+        such as iter_srt_file. They are translated stream_chunk_size at a time
+        with translate_many, so memory stays flat for files of any size and
+        translation starts before parsing finishes. Repeats are reused
+        within a chunk and, through a bounded DedupeMemo, across chunks;
+        one thread pool serves the whole stream. total, if known, adds a
+        percentage to the progress line. Output goes to a .part file that
+        replaces output_path only once it is complete. Returns the number
+        of cues written.
+        """
+        chunk_size = max(1, int(self.config.get('stream_chunk_size', 500)))
+        if memo is None:
+            memo = DedupeMemo(self.config.get('stream_dedupe_entries', 20000))
+        temp_path = f"{output_path}.part"
+        count = 0
+        
+        def show_progress(done):
+            if total:
+                print(f"Progress: {done}/{total} ({min(done / total, 1) * 100:.1f}%)", end='\r')
+            else:
+                print(f"Progress: {done} entries translated", end='\r')
+        
+        executor = self._create_executor()
+        try:
+            with self.format_handler.open_writer(temp_path, output_format) as writer:
+                cues = iter(cues)
+                while True:
+                    chunk = list(itertools.islice(cues, chunk_size))
+                    if not chunk:
+                        break
+                    
+                    translated_texts = self.translate_many(
+                        [cue['text'] for cue in chunk], target_lang,
+                        lambda done, unique: show_progress(count + len(chunk) * done // max(unique, 1)),
+                        source_lang, memo, executor)
+                    for cue, translated_text in zip(chunk, translated_texts):
+                        cue['text'] = translated_text
+                    writer.write_all(chunk)
+                    count += len(chunk)
+                    show_progress(count)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        
+        return count
+    
+    def translate_all_srt_files(self, directory=".", target_langs=None):
+        """Translate all SRT files in specified directory
+        
+        With several target languages each file is written once per language
+        as <name><output_suffix>.<lang>.srt. Up to max_parallel_files files (or languages)
+        are translated at the same time; each one leases its own engine
+        instances from the pool, so they never share engine state.
+        """
         srt_files = self.find_srt_files(directory)
         
         if not srt_files:
@@ -259,20 +850,38 @@ class SubtitleTranslator:
         for i, file_path in enumerate(srt_files, 1):
             print(f"{i}. {os.path.basename(file_path)}")
         
-        translated_files = []
-        for i, file_path in enumerate(srt_files, 1):
+        # ملف واحد لكل (ملف، لغة هدف)
+        if not target_langs:
+            jobs = [(file_path, None, None) for file_path in srt_files]
+        else:
+            jobs = []
+            for file_path in srt_files:
+                for lang in target_langs:
+                    output_path = None
+                    if len(target_langs) > 1:
+                        output_path = self._output_path(file_path, lang)
+                    jobs.append((file_path, output_path, lang))
+        
+        def translate_job(number, job):
+            file_path, output_path, lang = job
             print(f"\n{'='*60}")
-            print(f"Translating file {i}/{len(srt_files)}: {os.path.basename(file_path)}")
+            print(f"Translating file {number}/{len(jobs)}: {os.path.basename(file_path)}" + (f" -> {lang}" if lang else ""))
             print(f"{'='*60}")
             
             try:
-                output_file = self.translate_srt_file(file_path)
-                if output_file:
-                    translated_files.append(output_file)
+                return self.translate_srt_file(file_path, output_path, lang)
             except Exception as e:
                 print(f"Error translating file {os.path.basename(file_path)}: {e}")
+                return None
+        
+        max_parallel = max(1, int(self.config.get('max_parallel_files', 1)))
+        if max_parallel == 1:
+            output_files = [translate_job(i, job) for i, job in enumerate(jobs, 1)]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                output_files = list(executor.map(translate_job, range(1, len(jobs) + 1), jobs))
         
-        return translated_files
+        return [output_file for output_file in output_files if output_file]
     
     def interactive_mode(self):
         """Enhanced interactive mode with multi-language support"""
@@ -454,8 +1063,9 @@ class SubtitleTranslator:
     def validate_srt_file(self, file_path):
         """Validate SRT file format"""
         try:
+            # يكفي فحص بداية الملف - الملفات الكبيرة لا تُقرأ كاملة
             with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+                content = file.read(64 * 1024)
             
             # Basic format check
             if not content.strip():
@@ -490,10 +1100,42 @@ class SubtitleTranslator:
         print(f"⚡ {self.config.get_ui_text('cache_hits')}: {self.session_stats['cache_hits']}")
         print(f"❌ {self.config.get_ui_text('translation_errors')}: {self.session_stats['translation_errors']}")
         
+        for engine, state in self.session_stats['breaker_states'].items():
+            if state != CircuitBreaker.CLOSED:
+                print(f"⚠️  {engine}: {state} ({self.session_stats['failovers']} failovers)")
+        
+        planned = self.session_stats['unique_texts'] + self.session_stats['duplicate_cues']
+        if planned:
+            dedupe_ratio = self.session_stats['duplicate_cues'] / planned * 100
+            print(f"♻️  {self.config.get_ui_text('duplicate_cues')}: {self.session_stats['duplicate_cues']} ({dedupe_ratio:.1f}%)")
+        
+        if self.session_stats['skipped_cues']:
+            print(f"⏭️  {self.config.get_ui_text('skipped_cues')}: {self.session_stats['skipped_cues']}")
+        
+        if self.session_stats['cue_segments']:
+            print(f"✂️  {self.config.get_ui_text('cue_segments')}: {self.session_stats['cue_segments']}")
+        
         if self.cache:
             cache_stats = self.cache.get_cache_stats()
             print(f"💾 {self.config.get_ui_text('cache_size')}: {cache_stats.get('database_size_mb', 0)} MB")
             print(f"🎯 {self.config.get_ui_text('cache_hit_rate')}: {cache_stats.get('cache_hit_potential', 0)}%")
+            
+            memory_lookups = self.session_stats['memory_cache_hits'] + self.session_stats['memory_cache_misses']
+            if memory_lookups:
+                memory_rate = self.session_stats['memory_cache_hits'] / memory_lookups * 100
+                print(f"🧠 {self.config.get_ui_text('memory_cache_hits')}: {self.session_stats['memory_cache_hits']} "
+                      f"({memory_rate:.1f}%, {self.session_stats['memory_cache_evictions']} evictions)")
+            
+            if self.session_stats['cache_evictions']:
+                print(f"🧹 {self.config.get_ui_text('cache_evictions')}: {self.session_stats['cache_evictions']}")
+            
+            if self.session_stats['normalized_cache_hits']:
+                normalized_share = self.session_stats['normalized_cache_hits'] / max(self.session_stats['cache_hits'], 1) * 100
+                print(f"🧩 {self.config.get_ui_text('normalized_cache_hits')}: {self.session_stats['normalized_cache_hits']} "
+                      f"({normalized_share:.1f}% of cache hits)")
+            
+            if self.session_stats['bloom_skipped_lookups']:
+                print(f"🌸 {self.config.get_ui_text('bloom_skipped_lookups')}: {self.session_stats['bloom_skipped_lookups']}")
         
         print("="*50)
 
@@ -578,14 +1220,15 @@ class SubtitleTranslator:
         """Change translation engine - Always display in English"""
         engines = {
             '1': ('google', 'Google Translate'),
-            '2': ('microsoft', 'Microsoft Translator')
+            '2': ('microsoft', 'Microsoft Translator'),
+            '3': ('stub', 'Stub engine (offline testing)')
         }
         
         print("\nSelect translation engine:")
         for key, (code, name) in engines.items():
             print(f"{key}. {name}")
         
-        choice = input("\nChoose [1-2]: ").strip()
+        choice = input("\nChoose [1-3]: ").strip()
         if choice in engines:
             engine_code, engine_name = engines[choice]
             self.config.set('translation_engine', engine_code)
@@ -638,6 +1281,33 @@ class SubtitleTranslator:
             else:
                 print("❌ Invalid choice")
 
+    def transfer_cache(self, export_path=None, import_path=None, pair=None, since=None):
+        """تصدير الذاكرة المؤقتة أو استيرادها من سطر الأوامر"""
+        if not self.cache:
+            print("❌ Cache is disabled (cache_enabled is false in config)")
+            return None
+        
+        try:
+            if import_path:
+                print(f"📥 Importing cache from {import_path}...")
+                summary = self.cache.import_entries(import_path)
+                print(f"✅ Imported {summary['entries']} entries in {summary['seconds']}s "
+                      f"({summary['entries_per_second']} entries/s)")
+                if summary['skipped']:
+                    print(f"⚠️ Skipped {summary['skipped']} malformed records")
+            
+            if export_path:
+                source_lang, _, target_lang = (pair or '').partition(':')
+                print(f"📤 Exporting cache to {export_path}...")
+                summary = self.cache.export_entries(export_path, source_lang or None, target_lang or None, since)
+                print(f"✅ Exported {summary['entries']} entries ({summary['file_size_mb']} MB) in "
+                      f"{summary['seconds']}s ({summary['entries_per_second']} entries/s)")
+            return summary
+            
+        except Exception as e:
+            print(f"❌ Cache transfer failed: {e}")
+            return None
+    
     def reset_settings(self):
         """Reset settings to defaults - Always display in English"""
         confirm = input("\n⚠️  Are you sure you want to reset all settings to defaults? (y/N): ").strip().lower()
@@ -652,18 +1322,31 @@ def main():
     parser = argparse.ArgumentParser(description='Translate SRT subtitle files')
     parser.add_argument('input_file', nargs='?', help='Input SRT file path')
     parser.add_argument('-o', '--output', help='Output SRT file path')
-    parser.add_argument('-l', '--lang', default='ar', help='Target language code (default: ar for Arabic)')
+    parser.add_argument('-l', '--lang', help='Target language code (default: default_target_language from config); with --all, a comma-separated list such as ar,fr')
     parser.add_argument('-i', '--interactive', action='store_true', help='Run interactive mode')
     parser.add_argument('-a', '--all', action='store_true', help='Translate all SRT files in current directory')
+    parser.add_argument('-w', '--workers', type=int, help='Number of concurrent translation workers (default: max_workers from config)')
+    parser.add_argument('--export-cache', metavar='PATH', help='Export the translation cache to PATH (.jsonl, .jsonl.gz or .jsonl.zst)')
+    parser.add_argument('--import-cache', metavar='PATH', help='Merge a cache export from PATH into the translation cache')
+    parser.add_argument('--pair', metavar='SRC:TGT', help='With --export-cache, export only this language pair (e.g. en:ar; either side may be empty)')
+    parser.add_argument('--since', metavar='YYYY-MM-DD', help='With --export-cache, export only entries used on or after this date')
+    parser.add_argument('-p', '--parallel-files', type=int, help='Number of files translated at the same time with --all (default: max_parallel_files from config)')
     
     args = parser.parse_args()
     
     translator = SubtitleTranslator()
+    if args.workers:
+        translator.config.set('max_workers', args.workers)
+    if args.parallel_files:
+        translator.config.set('max_parallel_files', args.parallel_files)
     
-    if args.interactive:
+    if args.export_cache or args.import_cache:
+        translator.transfer_cache(args.export_cache, args.import_cache, args.pair, args.since)
+    elif args.interactive:
         translator.interactive_mode()
     elif args.all:
-        translator.translate_all_srt_files(".")
+        target_langs = [lang.strip() for lang in args.lang.split(',') if lang.strip()] if args.lang else None
+        translator.translate_all_srt_files(".", target_langs)
     elif args.input_file:
         translator.translate_srt_file(args.input_file, args.output, args.lang)
     else: